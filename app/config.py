@@ -13,10 +13,14 @@ class Settings(BaseSettings):
     # Line Bot 設定
     line_channel_access_token: str = Field(..., env="LINE_CHANNEL_ACCESS_TOKEN")
     line_channel_secret: str = Field(..., env="LINE_CHANNEL_SECRET")
+    line_max_connections: int = Field(20, env="LINE_MAX_CONNECTIONS")
+    line_keepalive_timeout: float = Field(30.0, env="LINE_KEEPALIVE_TIMEOUT")
+    line_api_endpoint: str = Field("https://api.line.me", env="LINE_API_ENDPOINT")
     
     # Notion API 設定
     notion_api_token: str = Field(..., env="NOTION_API_TOKEN")
     notion_database_id: str = Field(..., env="NOTION_DATABASE_ID")
+    notion_base_url: str = Field("https://api.notion.com", env="NOTION_BASE_URL")
     
     # GCP 設定
     gcp_project_id: str = Field(..., env="GCP_PROJECT_ID")
@@ -26,10 +30,82 @@ class Settings(BaseSettings):
     port: int = Field(8080, env="PORT")
     environment: str = Field("development", env="ENVIRONMENT")
     debug: bool = Field(False, env="DEBUG")
+    log_queue_size: int = Field(10000, env="LOG_QUEUE_SIZE")
+    log_format: str = Field("auto", env="LOG_FORMAT")
+    log_level: Optional[str] = Field(None, env="LOG_LEVEL")
+    log_info_sample_rate: float = Field(1.0, env="LOG_INFO_SAMPLE_RATE")
     
     # API 設定
     max_search_results: int = Field(5, env="MAX_SEARCH_RESULTS")
     response_timeout: int = Field(30, env="RESPONSE_TIMEOUT")
+    notion_max_concurrency: int = Field(3, env="NOTION_MAX_CONCURRENCY")
+    notion_speculative_search: bool = Field(False, env="NOTION_SPECULATIVE_SEARCH")
+    # 單一 Notion 請求的逾時（需小於 RESPONSE_TIMEOUT，逾時才會計入斷路器失敗）
+    notion_request_timeout: float = Field(10.0, env="NOTION_REQUEST_TIMEOUT")
+    
+    # Notion 速率限制設定
+    notion_rate_limit: float = Field(3.0, env="NOTION_RATE_LIMIT")
+    notion_rate_burst: int = Field(5, env="NOTION_RATE_BURST")
+    notion_max_retries: int = Field(3, env="NOTION_MAX_RETRIES")
+    notion_retry_base_delay: float = Field(0.5, env="NOTION_RETRY_BASE_DELAY")
+    
+    # Notion 請求對沖設定（超過近期延遲百分位數仍未回應時送出重複請求）
+    notion_hedging_enabled: bool = Field(False, env="NOTION_HEDGING_ENABLED")
+    notion_hedge_percentile: float = Field(95.0, env="NOTION_HEDGE_PERCENTILE")
+    notion_hedge_min_samples: int = Field(20, env="NOTION_HEDGE_MIN_SAMPLES")
+    notion_latency_window: int = Field(200, env="NOTION_LATENCY_WINDOW")
+    
+    # Notion 斷路器設定
+    notion_breaker_failure_threshold: int = Field(5, env="NOTION_BREAKER_FAILURE_THRESHOLD")
+    notion_breaker_recovery_timeout: float = Field(30.0, env="NOTION_BREAKER_RECOVERY_TIMEOUT")
+    search_stale_cache_size: int = Field(1024, env="SEARCH_STALE_CACHE_SIZE")
+    search_stale_ttl: int = Field(86400, env="SEARCH_STALE_TTL")
+    
+    # Notion HTTP 連線池設定
+    notion_http2: bool = Field(True, env="NOTION_HTTP2")
+    notion_max_connections: int = Field(20, env="NOTION_MAX_CONNECTIONS")
+    notion_max_keepalive_connections: int = Field(10, env="NOTION_MAX_KEEPALIVE_CONNECTIONS")
+    notion_keepalive_expiry: float = Field(30.0, env="NOTION_KEEPALIVE_EXPIRY")
+    
+    # 搜尋結果快取設定
+    search_cache_size: int = Field(256, env="SEARCH_CACHE_SIZE")
+    search_cache_ttl: int = Field(300, env="SEARCH_CACHE_TTL")
+    page_content_cache_bytes: int = Field(16 * 1024 * 1024, env="PAGE_CONTENT_CACHE_BYTES")
+    
+    # 事件處理設定
+    event_workers: int = Field(8, env="EVENT_WORKERS")
+    event_queue_size: int = Field(256, env="EVENT_QUEUE_SIZE")
+    event_enqueue_timeout: float = Field(0.5, env="EVENT_ENQUEUE_TIMEOUT")
+    shutdown_drain_timeout: float = Field(8.0, env="SHUTDOWN_DRAIN_TIMEOUT")
+    
+    # 回覆期限設定（Line 回覆 token 的有效時間有限，期限將至時改用推送訊息）
+    reply_token_ttl: float = Field(55.0, env="REPLY_TOKEN_TTL")
+    reply_deadline_margin: float = Field(3.0, env="REPLY_DEADLINE_MARGIN")
+    
+    # Webhook 事件去重設定
+    seen_event_store_size: int = Field(10000, env="SEEN_EVENT_STORE_SIZE")
+    seen_event_ttl: int = Field(3600, env="SEEN_EVENT_TTL")
+    
+    # 准入控制設定（預估等待時間超過預算時降級或拒絕事件）
+    admission_enabled: bool = Field(True, env="ADMISSION_ENABLED")
+    admission_wait_budget: float = Field(20.0, env="ADMISSION_WAIT_BUDGET")
+    admission_titles_only_ratio: float = Field(0.5, env="ADMISSION_TITLES_ONLY_RATIO")
+    admission_cache_only_ratio: float = Field(0.75, env="ADMISSION_CACHE_ONLY_RATIO")
+    admission_notion_calls_per_event: int = Field(3, env="ADMISSION_NOTION_CALLS_PER_EVENT")
+    
+    # 請求效能分析設定（未設定 PROFILING_ENABLED 時僅在非生產環境啟用）
+    profiling_enabled: Optional[bool] = Field(None, env="PROFILING_ENABLED")
+    profiling_admin_token: str = Field("", env="PROFILING_ADMIN_TOKEN")
+    profiling_sample_rate: float = Field(0.0, env="PROFILING_SAMPLE_RATE")
+    profiling_max_profiles: int = Field(20, env="PROFILING_MAX_PROFILES")
+    profiling_interval: float = Field(0.001, env="PROFILING_INTERVAL")
+    
+    # Notion 本地鏡像同步設定
+    notion_sync_enabled: bool = Field(True, env="NOTION_SYNC_ENABLED")
+    notion_sync_interval: int = Field(60, env="NOTION_SYNC_INTERVAL")
+    notion_full_sync_interval: int = Field(3600, env="NOTION_FULL_SYNC_INTERVAL")
+    notion_sync_max_staleness: int = Field(600, env="NOTION_SYNC_MAX_STALENESS")
+    notion_index_fallback_on_miss: bool = Field(True, env="NOTION_INDEX_FALLBACK_ON_MISS")
     
     class Config:
         env_file = ".env"
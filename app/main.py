@@ -2,15 +2,26 @@
 Line Bot 串接 Notion API 主應用程式
 """
 import asyncio
+import hmac
 from typing import Dict, Any
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from contextlib import asynccontextmanager
 from .config import get_settings, is_production
 from .services.line_service import LineService
 from .services.notion_service import NotionService
+from .services.notion_sync import NotionSyncService
+from .services.event_dispatcher import EventDispatcher
+from .services.admission import AdmissionController, AdmissionDecision
+from .services.seen_events import SeenEventStore, InMemorySeenEventStore
 from .models.line_models import ErrorResponse
-from .utils.logger import get_logger
+from .utils.deadline import Deadline
+from .utils.profiler import RequestProfiler
+from .utils.metrics import registry, EVENT_QUEUE_DEPTH, SIGNATURE_VERIFICATION_DURATION, EVENT_PARSING_DURATION
+from .utils.logger import (
+    get_logger, shutdown_logging, dropped_log_count,
+    new_correlation_id, get_correlation_id, set_correlation_id, reset_correlation_id
+)
 
 logger = get_logger(__name__)
 
@@ -18,12 +29,21 @@ logger = get_logger(__name__)
 # 全域服務實例
 line_service: LineService = None
 notion_service: NotionService = None
+notion_sync_service: NotionSyncService = None
+event_dispatcher: EventDispatcher = None
+admission_controller: AdmissionController = None
+seen_event_store: SeenEventStore = None
+request_profiler: RequestProfiler = None
+
+# 背景回覆任務（保留參考避免被回收）
+_background_tasks = set()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """應用程式生命週期管理"""
-    global line_service, notion_service
+    global line_service, notion_service, notion_sync_service, event_dispatcher, admission_controller, \
+        seen_event_store, request_profiler
     
     logger.info("正在啟動 Line Bot 應用程式...")
     
@@ -38,15 +58,68 @@ async def lifespan(app: FastAPI):
         else:
             logger.warning("Notion API 連線測試失敗，但應用程式將繼續運行")
         
+        # 啟動 Notion 本地鏡像同步
+        settings = get_settings()
+        if settings.notion_sync_enabled:
+            notion_sync_service = NotionSyncService(notion_service)
+            await notion_sync_service.start()
+        
+        # 啟動事件分派器
+        event_dispatcher = EventDispatcher(
+            handle_line_event,
+            workers=settings.event_workers,
+            queue_size=settings.event_queue_size
+        )
+        await event_dispatcher.start()
+        EVENT_QUEUE_DEPTH.set_function(lambda: event_dispatcher.queue_depth)
+        
+        # 重複事件過濾（多個實例時可替換為共用的儲存區）
+        seen_event_store = InMemorySeenEventStore(
+            maxsize=settings.seen_event_store_size,
+            ttl=settings.seen_event_ttl
+        )
+        
+        # 啟用准入控制
+        if settings.admission_enabled:
+            admission_controller = AdmissionController(
+                wait_budget=settings.admission_wait_budget,
+                titles_only_ratio=settings.admission_titles_only_ratio,
+                cache_only_ratio=settings.admission_cache_only_ratio,
+                notion_calls_per_event=settings.admission_notion_calls_per_event
+            )
+        
+        # 啟用請求效能分析（生產環境預設停用）
+        if _profiling_enabled(settings):
+            request_profiler = RequestProfiler(
+                max_profiles=settings.profiling_max_profiles,
+                sample_rate=settings.profiling_sample_rate,
+                interval=settings.profiling_interval
+            )
+            logger.info("請求效能分析已啟用，分析器：%s", request_profiler.engine)
+        
         logger.info("Line Bot 應用程式啟動完成")
         
         yield
-        
+    
     except Exception as e:
         logger.error("應用程式啟動時發生錯誤", error=e)
         raise
     finally:
         logger.info("正在關閉 Line Bot 應用程式...")
+        
+        # 先處理完佇列中的事件，再關閉各服務的連線
+        if event_dispatcher:
+            await event_dispatcher.stop(timeout=get_settings().shutdown_drain_timeout)
+        if notion_sync_service:
+            await notion_sync_service.stop()
+        if notion_service:
+            await notion_service.aclose()
+        if line_service:
+            await line_service.aclose()
+        
+        # 最後寫出佇列中剩餘的日誌
+        logger.info("Line Bot 應用程式已關閉")
+        shutdown_logging()
 
 
 # 建立 FastAPI 應用程式
@@ -72,14 +145,33 @@ async def root():
 async def health_check():
     """健康檢查端點"""
     try:
-        # 檢查 Notion 連線
-        notion_status = await notion_service.test_connection()
+        # 檢查 Notion 連線（不與使用者請求爭用速率限制）
+        notion_status = await notion_service.probe_connection()
         
         return {
             "status": "healthy",
             "services": {
-                "notion": "ok" if notion_status else "error",
+                "notion": notion_status,
                 "line": "ok"
+            },
+            "search_index": {
+                "ready": notion_service.search_index.is_ready,
+                "pages": len(notion_service.search_index),
+                "last_synced_at": notion_service.search_index.last_synced_at
+            },
+            "search_cache": notion_service.search_cache.stats(),
+            "content_cache": notion_service.content_cache.stats(),
+            "search_flights": notion_service.search_flights.stats(),
+            "notion_rate_limiter": notion_service.rate_limiter.stats(),
+            "notion_circuit_breaker": notion_service.circuit_breaker.stats(),
+            "notion_hedging": notion_service.hedging_stats(),
+            "event_dispatcher": event_dispatcher.stats(),
+            "line_replies": line_service.stats(),
+            "seen_events": seen_event_store.stats(),
+            "admission": admission_controller.stats() if admission_controller else None,
+            "profiling": request_profiler.stats() if request_profiler else None,
+            "logging": {
+                "dropped": dropped_log_count()
             }
         }
     except Exception as e:
@@ -93,62 +185,229 @@ async def health_check():
         )
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 指標端點"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    """列出保存的效能分析結果"""
+    _require_profiling_admin(request)
+    return {
+        "profiles": request_profiler.list(),
+        "stats": request_profiler.stats()
+    }
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: int, request: Request):
+    """下載指定的效能分析結果"""
+    _require_profiling_admin(request)
+    record = request_profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    extension = "html" if record.media_type == "text/html" else "txt"
+    return Response(
+        content=record.content,
+        media_type=record.media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile-{record.profile_id}.{extension}"'}
+    )
+
+
+def _profiling_enabled(settings) -> bool:
+    """是否啟用請求效能分析（未設定時僅在非生產環境啟用）"""
+    if settings.profiling_enabled is None:
+        return not is_production()
+    return settings.profiling_enabled
+
+
+def _matches_profiling_token(value: str) -> bool:
+    """檢查是否為效能分析管理 token（未設定 token 時一律拒絕）"""
+    token = get_settings().profiling_admin_token
+    return bool(token) and bool(value) and hmac.compare_digest(value.encode("utf-8"), token.encode("utf-8"))
+
+
+def _require_profiling_admin(request: Request):
+    """確認效能分析已啟用且請求帶有正確的管理 token"""
+    if request_profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling disabled")
+    if not _matches_profiling_token(request.headers.get("X-Admin-Token", "")):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
 @app.post("/webhook")
-async def webhook(request: Request, background_tasks: BackgroundTasks):
+async def webhook(request: Request):
     """Line Bot Webhook 端點"""
+    # 以關聯 ID 串連同一個請求的日誌
+    correlation_token = set_correlation_id(new_correlation_id())
     try:
-        # 取得請求內容
+        # 取得請求內容（僅讀取一次，簽名驗證與解析共用同一份位元組）
         body = await request.body()
         signature = request.headers.get("X-Line-Signature", "")
         
         # 驗證簽名
-        if not line_service.verify_signature(body, signature):
+        with SIGNATURE_VERIFICATION_DURATION.time():
+            signature_valid = line_service.verify_signature(body, signature)
+        if not signature_valid:
             logger.warning("Webhook 簽名驗證失敗")
             raise HTTPException(status_code=400, detail="Invalid signature")
         
-        # 解析請求體
+        # 解析並驗證事件
         try:
-            body_json = await request.json()
-        except Exception as e:
+            with EVENT_PARSING_DURATION.time():
+                events = line_service.parse_webhook_bytes(body)
+        except ValueError as e:
             logger.error("解析 JSON 請求體失敗", error=e)
             raise HTTPException(status_code=400, detail="Invalid JSON")
         
-        # 解析事件
-        events = line_service.parse_webhook_body(body_json)
+        # 帶有正確 X-Debug-Profile 標頭的請求，其事件一律進行效能分析
+        profile = request_profiler is not None and _matches_profiling_token(
+            request.headers.get("X-Debug-Profile", "")
+        )
         
-        # 處理事件（背景任務）
+        # 將事件加入佇列（佇列已滿時短暫等待以產生背壓，預估等待過久時降級或直接回覆忙碌）
         for event in events:
-            background_tasks.add_task(process_line_event, event)
+            await _dispatch_event(event, profile=profile)
         
         return {"status": "ok"}
-        
+    
     except HTTPException:
         raise
     except Exception as e:
         logger.error("處理 Webhook 請求時發生錯誤", error=e)
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        reset_correlation_id(correlation_token)
+
+
+async def _dispatch_event(event, profile: bool = False):
+    """過濾重複事件、進行准入控制並將事件加入佇列"""
+    # 事件的關聯 ID 會隨佇列傳給處理事件的工作者
+    correlation_token = set_correlation_id(event.webhook_event_id or new_correlation_id())
+    try:
+        # Line 重新傳送的事件在進行任何 Notion 查詢前就略過
+        if not await seen_event_store.check_and_mark(event):
+            return
+        
+        # 事件送出前發生錯誤時取消已接收紀錄，讓 Line 重新傳送的事件可以再次處理
+        try:
+            admission = _admit_event(event)
+            if admission == AdmissionDecision.SHED:
+                _reply_busy_in_background(event)
+                return
+            
+            accepted = await event_dispatcher.submit(
+                event,
+                timeout=get_settings().event_enqueue_timeout,
+                admission=admission,
+                profile=profile
+            )
+        except Exception:
+            await seen_event_store.unmark(event)
+            raise
+        
+        if not accepted:
+            logger.warning("事件未被處理：%s", event.type)
+            _reply_busy_in_background(event)
+    finally:
+        reset_correlation_id(correlation_token)
+
+
+def _admit_event(event) -> AdmissionDecision:
+    """依佇列深度與近期延遲決定訊息事件的處理方式"""
+    if admission_controller is None or not event.is_message_event:
+        return AdmissionDecision.ACCEPT
+    
+    if notion_service.is_index_available():
+        # 本地索引可用時搜尋不經過 Notion，只依實際處理時間估算，不計入速率限制器的排隊時間
+        service_time = event_dispatcher.service_time.ewma
+        limiter_wait = 0.0
+    else:
+        service_time = admission_controller.estimate_service_time(
+            event_dispatcher.service_time.ewma,
+            notion_service.latency.ewma
+        )
+        limiter = notion_service.rate_limiter
+        # 所有佇列中的事件都會排在同一個速率限制器前
+        limiter_wait = admission_controller.estimate_limiter_wait(
+            limiter.queue_depth,
+            limiter.rate,
+            pending_events=event_dispatcher.queue_depth
+        )
+    
+    # 同一來源固定分派到同一工作者，只需考慮該工作者佇列中的事件
+    return admission_controller.decide(
+        event_dispatcher.shard_depth(event),
+        1,
+        service_time,
+        limiter_wait=limiter_wait
+    )
+
+
+def _reply_busy_in_background(event):
+    """於背景回覆忙碌訊息（不延遲 Webhook 回應）"""
+    if not event.is_message_event or not event.reply_token:
+        return
+    if not line_service.is_valid_reply_token(event.reply_token):
+        return
+    
+    task = asyncio.create_task(line_service.reply_busy_message(
+        event.reply_token,
+        user_id=event.user_id,
+        deadline=_reply_deadline(event)
+    ))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _reply_deadline(event) -> Deadline:
+    """依事件時間戳計算回覆 token 的有效期限"""
+    return Deadline.from_timestamp(event.timestamp, get_settings().reply_token_ttl)
 
 
-async def process_line_event(event):
+def _processing_deadline(event) -> Deadline:
+    """依事件時間戳與 response_timeout 計算搜尋的處理期限"""
+    return Deadline.from_timestamp(event.timestamp, get_settings().response_timeout)
+
+
+async def handle_line_event(event, admission: AdmissionDecision = AdmissionDecision.ACCEPT,
+                            profile: bool = False):
+    """事件分派器的處理函式（依請求標頭或取樣率以效能分析器包裝事件處理）"""
+    if request_profiler is not None and request_profiler.should_profile(profile):
+        await request_profiler.run(
+            process_line_event(event, admission),
+            label=event.type,
+            admission=admission.value,
+            correlation_id=get_correlation_id()
+        )
+    else:
+        await process_line_event(event, admission)
+
+
+async def process_line_event(event, admission: AdmissionDecision = AdmissionDecision.ACCEPT):
     """處理 Line 事件"""
+    deadline = _reply_deadline(event)
     try:
-        logger.info(f"處理 Line 事件：{event.type}")
+        logger.info("處理 Line 事件：%s", event.type)
         
         # 只處理訊息事件
         if not event.is_message_event:
-            logger.info(f"忽略非訊息事件：{event.type}")
+            logger.info("忽略非訊息事件：%s", event.type)
             return
         
         # 只處理文字訊息
         if not event.is_text_message:
-            await _reply_unsupported_message(event)
+            await _reply_unsupported_message(event, deadline)
             return
         
         # 處理文字訊息
-        await process_text_message(event)
-        
+        await process_text_message(event, admission, deadline)
+    
     except Exception as e:
-        logger.error(f"處理 Line 事件時發生錯誤", error=e)
+        logger.error("處理 Line 事件時發生錯誤", error=e)
         
         # 嘗試回覆錯誤訊息
         if event.reply_token and line_service.is_valid_reply_token(event.reply_token):
@@ -157,56 +416,111 @@ async def process_line_event(event):
                 message=f"處理訊息時發生錯誤: {str(e)}",
                 user_message="抱歉，處理您的訊息時發生錯誤，請稍後再試。"
             )
-            await line_service.reply_error(event.reply_token, error_response)
+            await line_service.reply_error(
+                event.reply_token,
+                error_response,
+                user_id=event.user_id,
+                deadline=deadline
+            )
 
 
-async def process_text_message(event):
-    """處理文字訊息"""
+async def process_text_message(event, admission: AdmissionDecision = AdmissionDecision.ACCEPT,
+                               deadline: Deadline = None):
+    """處理文字訊息（回覆期限將至時改以推送訊息回覆）"""
+    if deadline is None:
+        deadline = _reply_deadline(event)
+    
     try:
         text_content = event.text_content
         if not text_content:
             return
         
-        logger.info(f"收到文字訊息：{text_content}")
+        # 使用者輸入只在 DEBUG 等級記錄
+        logger.info("收到文字訊息", message_length=len(text_content))
+        logger.debug("文字訊息內容：%s", text_content)
         
         # 檢查是否為幫助指令
         if text_content.lower().strip() in ["help", "幫助", "說明", "?"]:
-            await line_service.reply_help_message(event.reply_token)
+            await line_service.reply_help_message(
+                event.reply_token,
+                user_id=event.user_id,
+                deadline=deadline
+            )
             return
         
         # 提取搜尋查詢
         search_query = line_service.extract_search_query(text_content)
         
         if not search_query:
-            await _reply_invalid_query(event)
+            await _reply_invalid_query(event, deadline)
             return
         
-        # 執行搜尋
-        logger.info(f"執行搜尋：{search_query}")
-        search_response = await notion_service.search_database(search_query)
+        # 執行搜尋（處理期限由 response_timeout 決定，超過時回傳部分結果）
+        logger.info("執行搜尋", admission=admission.value, query_length=len(search_query))
+        if admission == AdmissionDecision.CACHE_ONLY:
+            # 負載過高時僅使用快取或本地索引回答
+            search_response = notion_service.search_cached(search_query)
+            if search_response is None:
+                await line_service.reply_busy_message(
+                    event.reply_token,
+                    user_id=event.user_id,
+                    deadline=deadline
+                )
+                return
+        else:
+            search_response = await notion_service.search_database(
+                search_query,
+                hydrate=admission != AdmissionDecision.TITLES_ONLY,
+                deadline=_processing_deadline(event)
+            )
+            
+            # 逾時或 Notion 無法使用時沒有任何結果，請使用者稍後再試，而非回覆「沒有找到相關內容」
+            if search_response.partial and not search_response.results:
+                logger.warning("搜尋未能在處理期限內取得結果")
+                await line_service.reply_busy_message(
+                    event.reply_token,
+                    user_id=event.user_id,
+                    deadline=deadline
+                )
+                return
         
         # 回覆搜尋結果
-        await line_service.reply_search_results(event.reply_token, search_response)
+        await line_service.reply_search_results(
+            event.reply_token,
+            search_response,
+            user_id=event.user_id,
+            deadline=deadline
+        )
         
         # 記錄搜尋統計
-        logger.info(f"搜尋完成 - 查詢：{search_query}，結果數：{search_response.total_count}")
-        
+        logger.info(
+            "搜尋完成，結果數：%s",
+            search_response.total_count,
+            result_count=search_response.total_count,
+            partial=search_response.partial
+        )
+    
     except Exception as e:
-        logger.error(f"處理文字訊息時發生錯誤", error=e)
+        logger.error("處理文字訊息時發生錯誤", error=e)
         raise
 
 
-async def _reply_unsupported_message(event):
+async def _reply_unsupported_message(event, deadline: Deadline = None):
     """回覆不支援的訊息類型"""
     try:
         if event.reply_token and line_service.is_valid_reply_token(event.reply_token):
             message = "抱歉，我目前只支援文字訊息。請輸入您想搜尋的關鍵字。"
-            await line_service.reply_message(event.reply_token, [message])
+            await line_service.reply_message(
+                event.reply_token,
+                [message],
+                user_id=event.user_id,
+                deadline=deadline
+            )
     except Exception as e:
-        logger.error(f"回覆不支援訊息時發生錯誤", error=e)
+        logger.error("回覆不支援訊息時發生錯誤", error=e)
 
 
-async def _reply_invalid_query(event):
+async def _reply_invalid_query(event, deadline: Deadline = None):
     """回覆無效的查詢"""
     try:
         if event.reply_token and line_service.is_valid_reply_token(event.reply_token):
@@ -218,15 +532,20 @@ async def _reply_invalid_query(event):
 • 資料庫
 
 輸入「幫助」查看詳細使用說明。"""
-            await line_service.reply_message(event.reply_token, [message])
+            await line_service.reply_message(
+                event.reply_token,
+                [message],
+                user_id=event.user_id,
+                deadline=deadline
+            )
     except Exception as e:
-        logger.error(f"回覆無效查詢時發生錯誤", error=e)
+        logger.error("回覆無效查詢時發生錯誤", error=e)
 
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """全域例外處理器"""
-    logger.error(f"未處理的例外：{str(exc)}", error=exc)
+    logger.error("未處理的例外：%s", exc, error=exc)
     
     return JSONResponse(
         status_code=500,
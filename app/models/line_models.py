@@ -2,7 +2,7 @@
 Line Bot 訊息模型
 """
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class LineUser(BaseModel):
@@ -33,12 +33,16 @@ class TextMessage(LineMessage):
 
 class LineEvent(BaseModel):
     """Line 事件模型"""
+    model_config = ConfigDict(populate_by_name=True)
+    
     type: str
     mode: str
     timestamp: int
     source: Dict[str, Any]
-    reply_token: Optional[str] = None
+    reply_token: Optional[str] = Field(None, alias="replyToken")
     message: Optional[Dict[str, Any]] = None
+    webhook_event_id: Optional[str] = Field(None, alias="webhookEventId")
+    delivery_context: Optional[Dict[str, Any]] = Field(None, alias="deliveryContext")
     
     @property
     def user_id(self) -> Optional[str]:
@@ -63,6 +67,11 @@ class LineEvent(BaseModel):
         if self.is_text_message:
             return self.message.get("text")
         return None
+    
+    @property
+    def is_redelivery(self) -> bool:
+        """檢查是否為 Line 重新傳送的事件"""
+        return bool((self.delivery_context or {}).get("isRedelivery"))
 
 
 class SearchResult(BaseModel):
@@ -98,6 +107,7 @@ class SearchResponse(BaseModel):
     query: str
     results: List[SearchResult] = Field(default_factory=list)
     total_count: int = 0
+    partial: bool = False
     
     def to_line_messages(self) -> List[str]:
         """轉換為 Line 訊息列表"""
@@ -0,0 +1,78 @@
+"""
+Webhook 事件准入控制模組
+"""
+from enum import Enum
+from typing import Dict, Any
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AdmissionDecision(str, Enum):
+    """准入決策"""
+    ACCEPT = "accept"
+    TITLES_ONLY = "titles_only"
+    CACHE_ONLY = "cache_only"
+    SHED = "shed"
+
+
+class AdmissionController:
+    """依佇列深度與近期處理延遲預估等待時間，決定接受、降級或拒絕事件"""
+    
+    def __init__(self, wait_budget: float, titles_only_ratio: float = 0.5, cache_only_ratio: float = 0.75,
+                 notion_calls_per_event: int = 3):
+        self.wait_budget = wait_budget
+        self.notion_calls_per_event = max(1, notion_calls_per_event)
+        self.titles_only_ratio = titles_only_ratio
+        self.cache_only_ratio = cache_only_ratio
+        self.last_predicted_wait = 0.0
+        self.decisions: Dict[str, int] = {decision.value: 0 for decision in AdmissionDecision}
+    
+    @property
+    def shed_count(self) -> int:
+        """被拒絕的事件數"""
+        return self.decisions[AdmissionDecision.SHED.value]
+    
+    def estimate_service_time(self, handler_time: float, notion_latency: float) -> float:
+        """估算單一事件的處理時間（取實際處理時間與 Notion 近期延遲推估值的較大者）"""
+        return max(handler_time, notion_latency * self.notion_calls_per_event)
+    
+    def estimate_limiter_wait(self, limiter_depth: int, rate: float, pending_events: int = 0) -> float:
+        """估算 Notion 速率限制器的排隊時間（佇列中事件換算的呼叫數、限制器中等待的請求與本事件所需的呼叫數 ÷ 每秒可發出的請求數）"""
+        if rate <= 0:
+            return 0.0
+        pending_calls = pending_events * self.notion_calls_per_event + limiter_depth
+        return (pending_calls + self.notion_calls_per_event) / rate
+    
+    def predict_wait(self, queue_depth: int, workers: int, service_time: float,
+                     limiter_wait: float = 0.0) -> float:
+        """預估新事件的等待時間（佇列中每個工作者前方的事件數 × 每個事件的處理時間 + 速率限制器的排隊時間）"""
+        return (queue_depth / max(1, workers)) * service_time + limiter_wait
+    
+    def decide(self, queue_depth: int, workers: int, service_time: float,
+               limiter_wait: float = 0.0) -> AdmissionDecision:
+        """決定事件的處理方式"""
+        predicted = self.predict_wait(queue_depth, workers, service_time, limiter_wait)
+        self.last_predicted_wait = predicted
+        
+        if predicted > self.wait_budget:
+            decision = AdmissionDecision.SHED
+        elif predicted > self.wait_budget * self.cache_only_ratio:
+            decision = AdmissionDecision.CACHE_ONLY
+        elif predicted > self.wait_budget * self.titles_only_ratio:
+            decision = AdmissionDecision.TITLES_ONLY
+        else:
+            decision = AdmissionDecision.ACCEPT
+        
+        self.decisions[decision.value] += 1
+        if decision != AdmissionDecision.ACCEPT:
+            logger.warning("准入控制：預估等待 %.2f 秒，決策為 %s", predicted, decision.value)
+        return decision
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得統計資訊"""
+        return {
+            "wait_budget": self.wait_budget,
+            "last_predicted_wait": self.last_predicted_wait,
+            "decisions": dict(self.decisions)
+        }
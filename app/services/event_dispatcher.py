@@ -0,0 +1,176 @@
+"""
+Line 事件分派模組
+"""
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ..models.line_models import LineEvent
+from ..utils.latency import LatencyTracker
+from ..utils.metrics import QUEUE_WAIT_DURATION
+from ..utils.logger import get_logger, get_correlation_id, set_correlation_id, reset_correlation_id
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class WorkItem:
+    """佇列中的事件"""
+    event: LineEvent
+    context: Dict[str, Any] = field(default_factory=dict)
+    correlation_id: Optional[str] = field(default_factory=get_correlation_id)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class EventDispatcher:
+    """以有界佇列與固定數量工作者處理 Line 事件（同一來源的事件依序處理）"""
+    
+    def __init__(self, handler: Callable[..., Awaitable[None]], workers: int, queue_size: int):
+        self._handler = handler
+        self.worker_count = max(1, workers)
+        self.queue_size = max(self.worker_count, queue_size)
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+        self.submitted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped_on_shutdown = 0
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self.wait_time_ewma = 0.0
+        self.service_time = LatencyTracker()
+    
+    @property
+    def queue_depth(self) -> int:
+        """佇列中等待處理的事件數"""
+        return sum(queue.qsize() for queue in self._queues)
+    
+    def shard_depth(self, event: LineEvent) -> int:
+        """事件會被分派到的佇列中等待處理的事件數"""
+        if not self._queues:
+            return 0
+        return self._queues[self._shard(event)].qsize()
+    
+    @property
+    def is_running(self) -> bool:
+        """分派器是否正在接受事件"""
+        return self._accepting
+    
+    async def start(self):
+        """啟動工作者"""
+        if self._tasks:
+            return
+        
+        # 每個工作者有自己的佇列，同一來源固定分派到同一佇列以維持順序
+        shard_size = math.ceil(self.queue_size / self.worker_count)
+        self._queues = [asyncio.Queue(maxsize=shard_size) for _ in range(self.worker_count)]
+        self._tasks = [
+            asyncio.create_task(self._worker(queue))
+            for queue in self._queues
+        ]
+        self._accepting = True
+        logger.info("事件分派器已啟動，工作者數量：%s，佇列容量：%s", self.worker_count, self.queue_size)
+    
+    async def submit(self, event: LineEvent, timeout: float = 0, **context) -> bool:
+        """將事件加入佇列（佇列已滿時最多等待 timeout 秒），回傳是否成功；context 會傳給處理函式"""
+        if not self._accepting:
+            self.rejected += 1
+            return False
+        
+        queue = self._queues[self._shard(event)]
+        item = WorkItem(event=event, context=context)
+        
+        try:
+            if timeout > 0:
+                await asyncio.wait_for(queue.put(item), timeout=timeout)
+            else:
+                queue.put_nowait(item)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.rejected += 1
+            logger.warning("事件佇列已滿，拒絕事件（佇列深度：%s）", self.queue_depth)
+            return False
+        
+        self.submitted += 1
+        return True
+    
+    def _shard(self, event: LineEvent) -> int:
+        """依事件來源決定分派的佇列"""
+        source = event.source or {}
+        key = source.get("userId") or source.get("groupId") or source.get("roomId") or ""
+        return hash(key) % self.worker_count
+    
+    async def _worker(self, queue: asyncio.Queue):
+        """工作者迴圈"""
+        while True:
+            item: WorkItem = await queue.get()
+            # 沿用加入佇列時的關聯 ID
+            correlation_token = set_correlation_id(item.correlation_id)
+            try:
+                started_at = time.monotonic()
+                self._record_wait(started_at - item.enqueued_at)
+                await self._handler(item.event, **item.context)
+                self.processed += 1
+                self.service_time.observe(time.monotonic() - started_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error("處理佇列事件時發生錯誤", error=e)
+            finally:
+                reset_correlation_id(correlation_token)
+                queue.task_done()
+    
+    def _record_wait(self, wait: float):
+        """記錄事件在佇列中的等待時間"""
+        QUEUE_WAIT_DURATION.observe(wait)
+        self._wait_count += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        self.wait_time_ewma = wait if self._wait_count == 1 else 0.8 * self.wait_time_ewma + 0.2 * wait
+    
+    async def stop(self, timeout: float):
+        """停止接受事件，並在期限內處理完佇列中的事件"""
+        if not self._tasks:
+            return
+        
+        self._accepting = False
+        logger.info("正在關閉事件分派器，等待 %s 個事件處理完成", self.queue_depth)
+        
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            self.dropped_on_shutdown = self.queue_depth
+            logger.warning("事件分派器關閉逾時，捨棄 %s 個未處理事件", self.dropped_on_shutdown)
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+        logger.info("事件分派器已關閉")
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得統計資訊"""
+        return {
+            "workers": self.worker_count,
+            "queue_size": self.queue_size,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped_on_shutdown": self.dropped_on_shutdown,
+            "wait_time": {
+                "avg": self._wait_total / self._wait_count if self._wait_count else 0.0,
+                "max": self._wait_max,
+                "ewma": self.wait_time_ewma
+            },
+            "service_time": self.service_time.stats()
+        }
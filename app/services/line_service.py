@@ -1,30 +1,80 @@
 """
 Line Bot 服務模組
 """
+import asyncio
 import hashlib
 import hmac
 import base64
+import json
+from enum import Enum
 from typing import List, Optional, Dict, Any
-from linebot import LineBotApi, WebhookHandler
+import aiohttp
+from linebot import LineBotApi, AsyncLineBotApi, WebhookHandler
+from linebot.aiohttp_async_http_client import AiohttpAsyncHttpClient
 from linebot.exceptions import InvalidSignatureError, LineBotApiError
+from pydantic import TypeAdapter
 from linebot.models import (
     MessageEvent, TextMessage, TextSendMessage,
     QuickReply, QuickReplyButton, MessageAction
 )
 from ..config import get_settings
 from ..models.line_models import LineEvent, SearchResponse, ErrorResponse
+from ..utils.deadline import Deadline, wait_with_deadline
 from ..utils.logger import get_logger
+from ..utils.metrics import MESSAGE_RENDERING_DURATION, REPLY_MESSAGE_DURATION
 
 logger = get_logger(__name__)
 
+# 一次驗證整個事件陣列
+_EVENTS_ADAPTER = TypeAdapter(List[LineEvent])
+
+
+class ReplyOutcome(str, Enum):
+    """回覆結果"""
+    SENT = "sent"
+    FAILED = "failed"
+    INVALID_TOKEN = "invalid_token"
+
 
 class LineService:
     """Line Bot 服務類別"""
     
     def __init__(self):
         self.settings = get_settings()
-        self.line_bot_api = LineBotApi(self.settings.line_channel_access_token)
+        self.line_bot_api = LineBotApi(
+            self.settings.line_channel_access_token,
+            endpoint=self.settings.line_api_endpoint
+        )
         self.handler = WebhookHandler(self.settings.line_channel_secret)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._async_line_bot_api: Optional[AsyncLineBotApi] = None
+        self.replies_sent = 0
+        self.reply_failures = 0
+        self.late_replies = 0
+        self.push_fallbacks = 0
+        self.push_fallback_failures = 0
+    
+    def _get_async_api(self) -> AsyncLineBotApi:
+        """取得非同步 Line API 客戶端（首次使用時建立共用連線池）"""
+        if self._async_line_bot_api is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.settings.line_max_connections,
+                keepalive_timeout=self.settings.line_keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._async_line_bot_api = AsyncLineBotApi(
+                self.settings.line_channel_access_token,
+                AiohttpAsyncHttpClient(self._session),
+                endpoint=self.settings.line_api_endpoint
+            )
+        return self._async_line_bot_api
+    
+    async def aclose(self):
+        """關閉 Line API 連線池"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._async_line_bot_api = None
     
     def verify_signature(self, body: bytes, signature: str) -> bool:
         """驗證 Line Webhook 簽名"""
@@ -40,31 +90,72 @@ class LineService:
             return hmac.compare_digest(signature, expected_signature)
             
         except Exception as e:
-            logger.error(f"驗證簽名時發生錯誤", error=e)
+            logger.error("驗證簽名時發生錯誤", error=e)
             return False
     
     def parse_webhook_body(self, body: Dict[str, Any]) -> List[LineEvent]:
         """解析 Webhook 請求體"""
         try:
-            events = []
+            events = _EVENTS_ADAPTER.validate_python(body.get("events", []))
             
-            for event_data in body.get("events", []):
-                event = LineEvent(**event_data)
-                events.append(event)
-            
-            logger.info(f"解析到 {len(events)} 個事件")
+            logger.info("解析到 %s 個事件", len(events))
             return events
             
         except Exception as e:
-            logger.error(f"解析 Webhook 請求體時發生錯誤", error=e)
+            logger.error("解析 Webhook 請求體時發生錯誤", error=e)
             return []
     
-    async def reply_message(self, reply_token: str, messages: List[str]) -> bool:
-        """回覆訊息"""
+    def parse_webhook_bytes(self, body: bytes) -> List[LineEvent]:
+        """由原始位元組解析 Webhook 請求體（json.loads 解碼後一次驗證整個事件陣列）"""
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            raise ValueError("Invalid JSON") from e
+        
+        if not isinstance(payload, dict):
+            logger.error("Webhook 請求體不是 JSON 物件")
+            return []
+        return self.parse_webhook_body(payload)
+    
+    async def reply_message(self, reply_token: str, messages: List[str],
+                            user_id: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
+        """回覆訊息（提供 user_id 時，回覆期限將至或回覆 token 已失效會改為推送訊息）"""
+        # 回覆 token 即將過期時不再嘗試回覆
+        if deadline is not None and deadline.remaining() <= self.settings.reply_deadline_margin:
+            self.late_replies += 1
+            logger.warning("回覆期限即將結束（剩餘 %.2f 秒），改用推送訊息", deadline.remaining())
+            return await self._push_fallback(user_id, messages)
+        
+        outcome = await self._send_reply(reply_token, messages, deadline)
+        if outcome == ReplyOutcome.SENT:
+            self.replies_sent += 1
+            return True
+        
+        self.reply_failures += 1
+        # 其他錯誤或回覆中途被取消時 Line 可能已收到回覆，不再推送以免重複訊息並浪費推送額度
+        if outcome == ReplyOutcome.INVALID_TOKEN:
+            return await self._push_fallback(user_id, messages)
+        return False
+    
+    async def _push_fallback(self, user_id: Optional[str], messages: List[str]) -> bool:
+        """以推送訊息取代回覆"""
+        if not user_id:
+            return False
+        
+        if await self.push_message(user_id, messages):
+            self.push_fallbacks += 1
+            return True
+        
+        self.push_fallback_failures += 1
+        return False
+    
+    async def _send_reply(self, reply_token: str, messages: List[str],
+                          deadline: Optional[Deadline] = None) -> ReplyOutcome:
+        """使用回覆 token 發送訊息（回覆 token 過期前未完成視為失敗）"""
         try:
             if not reply_token:
                 logger.warning("回覆 token 為空，無法回覆訊息")
-                return False
+                return ReplyOutcome.INVALID_TOKEN
             
             # 轉換為 Line 訊息格式
             line_messages = []
@@ -78,58 +169,87 @@ class LineService:
             
             if not line_messages:
                 logger.warning("沒有有效的訊息內容可回覆")
-                return False
+                return ReplyOutcome.FAILED
             
             # Line API 一次最多可發送 5 則訊息
             if len(line_messages) > 5:
                 line_messages = line_messages[:5]
             
             # 發送回覆
-            self.line_bot_api.reply_message(reply_token, line_messages)
+            with REPLY_MESSAGE_DURATION.time():
+                await wait_with_deadline(
+                    self._get_async_api().reply_message(reply_token, line_messages),
+                    deadline
+                )
             
-            logger.info(f"成功回覆 {len(line_messages)} 則訊息")
-            return True
+            logger.info("成功回覆 %s 則訊息", len(line_messages))
+            return ReplyOutcome.SENT
             
         except LineBotApiError as e:
-            logger.error(f"Line API 錯誤", error=e)
-            return False
+            logger.error("Line API 錯誤", error=e)
+            if self._is_invalid_reply_token(e):
+                return ReplyOutcome.INVALID_TOKEN
+            return ReplyOutcome.FAILED
+        except asyncio.TimeoutError:
+            logger.warning("回覆訊息超過回覆 token 期限")
+            return ReplyOutcome.FAILED
         except Exception as e:
-            logger.error(f"回覆訊息時發生錯誤", error=e)
-            return False
+            logger.error("回覆訊息時發生錯誤", error=e)
+            return ReplyOutcome.FAILED
     
-    async def reply_search_results(self, reply_token: str, search_response: SearchResponse) -> bool:
+    def _is_invalid_reply_token(self, error: LineBotApiError) -> bool:
+        """檢查 Line API 錯誤是否為回覆 token 已過期或已使用（400 Invalid reply token）"""
+        message = getattr(error.error, "message", None) or ""
+        return error.status_code == 400 and "reply token" in message.lower()
+    
+    async def reply_search_results(self, reply_token: str, search_response: SearchResponse,
+                                   user_id: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
         """回覆搜尋結果"""
         try:
-            messages = search_response.to_line_messages()
-            
-            # 如果沒有結果，提供搜尋建議
-            if not search_response.results:
-                messages.append(self._get_search_suggestions())
+            with MESSAGE_RENDERING_DURATION.time():
+                messages = search_response.to_line_messages()
+                
+                # 如果沒有結果，提供搜尋建議
+                if not search_response.results:
+                    messages.append(self._get_search_suggestions())
             
-            return await self.reply_message(reply_token, messages)
+            return await self.reply_message(reply_token, messages, user_id=user_id, deadline=deadline)
             
         except Exception as e:
-            logger.error(f"回覆搜尋結果時發生錯誤", error=e)
+            logger.error("回覆搜尋結果時發生錯誤", error=e)
             return False
     
-    async def reply_error(self, reply_token: str, error_response: ErrorResponse) -> bool:
+    async def reply_error(self, reply_token: str, error_response: ErrorResponse,
+                          user_id: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
         """回覆錯誤訊息"""
         try:
             message = error_response.to_line_message()
-            return await self.reply_message(reply_token, [message.text])
+            return await self.reply_message(reply_token, [message.text], user_id=user_id, deadline=deadline)
             
         except Exception as e:
-            logger.error(f"回覆錯誤訊息時發生錯誤", error=e)
+            logger.error("回覆錯誤訊息時發生錯誤", error=e)
             return False
     
-    async def reply_help_message(self, reply_token: str) -> bool:
+    async def reply_help_message(self, reply_token: str,
+                                 user_id: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
         """回覆幫助訊息"""
         try:
             help_text = self._get_help_message()
-            return await self.reply_message(reply_token, [help_text])
+            return await self.reply_message(reply_token, [help_text], user_id=user_id, deadline=deadline)
+            
+        except Exception as e:
+            logger.error("回覆幫助訊息時發生錯誤", error=e)
+            return False
+    
+    async def reply_busy_message(self, reply_token: str,
+                                 user_id: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
+        """回覆系統忙碌訊息"""
+        try:
+            message = "抱歉，目前查詢人數較多，請稍後再試一次。"
+            return await self.reply_message(reply_token, [message], user_id=user_id, deadline=deadline)
             
         except Exception as e:
-            logger.error(f"回覆幫助訊息時發生錯誤", error=e)
+            logger.error("回覆忙碌訊息時發生錯誤", error=e)
             return False
     
     def _get_help_message(self) -> str:
@@ -181,7 +301,7 @@ class LineService:
             return QuickReply(items=buttons)
             
         except Exception as e:
-            logger.error(f"建立快速回覆按鈕時發生錯誤", error=e)
+            logger.error("建立快速回覆按鈕時發生錯誤", error=e)
             return None
     
     async def push_message(self, user_id: str, messages: List[str]) -> bool:
@@ -200,18 +320,28 @@ class LineService:
             if len(line_messages) > 5:
                 line_messages = line_messages[:5]
             
-            self.line_bot_api.push_message(user_id, line_messages)
+            await self._get_async_api().push_message(user_id, line_messages)
             
-            logger.info(f"成功推送 {len(line_messages)} 則訊息給用戶 {user_id}")
+            logger.info("成功推送 %s 則訊息給用戶 %s", len(line_messages), user_id)
             return True
             
         except LineBotApiError as e:
-            logger.error(f"推送訊息時發生 Line API 錯誤", error=e)
+            logger.error("推送訊息時發生 Line API 錯誤", error=e)
             return False
         except Exception as e:
-            logger.error(f"推送訊息時發生錯誤", error=e)
+            logger.error("推送訊息時發生錯誤", error=e)
             return False
     
+    def stats(self) -> Dict[str, Any]:
+        """取得回覆統計資訊"""
+        return {
+            "replies_sent": self.replies_sent,
+            "reply_failures": self.reply_failures,
+            "late_replies": self.late_replies,
+            "push_fallbacks": self.push_fallbacks,
+            "push_fallback_failures": self.push_fallback_failures
+        }
+    
     def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         """取得用戶資料"""
         try:
@@ -225,10 +355,10 @@ class LineService:
             }
             
         except LineBotApiError as e:
-            logger.error(f"取得用戶資料時發生 Line API 錯誤", error=e)
+            logger.error("取得用戶資料時發生 Line API 錯誤", error=e)
             return None
         except Exception as e:
-            logger.error(f"取得用戶資料時發生錯誤", error=e)
+            logger.error("取得用戶資料時發生錯誤", error=e)
             return None
     
     def is_valid_reply_token(self, reply_token: str) -> bool:
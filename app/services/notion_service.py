@@ -2,166 +2,583 @@
 Notion API 服務模組
 """
 import asyncio
-from typing import List, Optional, Dict, Any
-from notion_client import Client
-from notion_client.errors import APIResponseError, RequestTimeoutError
+import importlib.util
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
+from notion_client import AsyncClient
+from notion_client.errors import APIErrorCode, APIResponseError, HTTPResponseError, RequestTimeoutError
 from ..config import get_settings
 from ..models.line_models import SearchResult, SearchResponse
+from ..utils.cache import TTLCache, PageContentCache, PageContent
+from ..utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from ..utils.deadline import Deadline, wait_with_deadline
+from ..utils.latency import LatencyTracker
 from ..utils.logger import get_logger
+from ..utils.metrics import (
+    NOTION_REQUEST_DURATION, NOTION_ERRORS, NOTION_RATE_LIMITED,
+    SEARCH_CACHE_HITS, SEARCH_CACHE_MISSES, CONTENT_CACHE_HITS, CONTENT_CACHE_MISSES
+)
+from ..utils.rate_limiter import Priority, PriorityRateLimiter
+from ..utils.singleflight import SingleFlight
+from ..utils.text import normalize_text
+from .search_index import SearchIndex, IndexedPage, MAX_CONTENT_LENGTH, match_score
 
 logger = get_logger(__name__)
 
+# 延遲長尾明顯、重複送出也不會產生副作用的唯讀操作
+HEDGED_OPERATIONS = ("databases.query", "blocks.children.list")
+
 
 class NotionService:
     """Notion API 服務類別"""
     
     def __init__(self):
         self.settings = get_settings()
-        self.client = Client(auth=self.settings.notion_api_token)
+        self.client = AsyncClient(
+            auth=self.settings.notion_api_token,
+            client=self._build_http_client(),
+            base_url=self.settings.notion_base_url,
+            # notion-client 預設逾時為 60 秒，長於處理期限時卡住的請求只會被期限取消而不計入斷路器
+            timeout_ms=int(self.settings.notion_request_timeout * 1000)
+        )
         self.database_id = self.settings.notion_database_id
+        self.search_index = SearchIndex()
+        self.search_cache = TTLCache(
+            maxsize=self.settings.search_cache_size,
+            ttl=self.settings.search_cache_ttl
+        )
+        self.content_cache = PageContentCache(max_bytes=self.settings.page_content_cache_bytes)
+        self.stale_results = TTLCache(
+            maxsize=self.settings.search_stale_cache_size,
+            ttl=self.settings.search_stale_ttl
+        )
+        self.search_flights = SingleFlight()
+        self.circuit_breaker = CircuitBreaker(
+            name="notion",
+            failure_threshold=self.settings.notion_breaker_failure_threshold,
+            recovery_timeout=self.settings.notion_breaker_recovery_timeout
+        )
+        self._background_tasks = set()
+        self.rate_limiter = PriorityRateLimiter(
+            rate=self.settings.notion_rate_limit,
+            burst=self.settings.notion_rate_burst
+        )
+        self.latency = LatencyTracker()
+        self.operation_latency: Dict[str, LatencyTracker] = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+        
+        # 限制同時進行的 Notion 內容請求數量（Notion API 平均限制約每秒 3 次請求）
+        self._content_semaphore = asyncio.Semaphore(max(1, self.settings.notion_max_concurrency))
+    
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """建立共用的 HTTP 連線池（有安裝 h2 時使用 HTTP/2）"""
+        limits = httpx.Limits(
+            max_connections=self.settings.notion_max_connections,
+            max_keepalive_connections=self.settings.notion_max_keepalive_connections,
+            keepalive_expiry=self.settings.notion_keepalive_expiry
+        )
+        http2 = self.settings.notion_http2 and importlib.util.find_spec("h2") is not None
+        
+        return httpx.AsyncClient(limits=limits, http2=http2)
+    
+    async def _call_notion(self, priority: Priority, func: Callable[..., Awaitable[Any]],
+                           operation: Optional[str] = None, **kwargs) -> Any:
+        """經速率限制器呼叫 Notion API，遇到 429/503 時依 Retry-After 加上抖動重試（operation 用於延遲統計與對沖）"""
+        attempt = 0
+        while True:
+            # 斷路器開啟時立即失敗，不等待上游逾時
+            self.circuit_breaker.check()
+            try:
+                await self.rate_limiter.acquire(priority)
+                started_at = time.monotonic()
+                hedge_won = False
+                if operation and self._should_hedge(priority, operation):
+                    result, hedge_won = await self._call_with_hedge(operation, func, kwargs)
+                else:
+                    result = await func(**kwargs)
+                elapsed = time.monotonic() - started_at
+                self.latency.observe(elapsed)
+                if operation:
+                    # 對沖請求勝出時無法得知原請求的延遲，不計入決定對沖延遲的統計（避免百分位數被拉低而越來越常對沖）
+                    if not hedge_won:
+                        self._latency_tracker(operation).observe(elapsed)
+                    NOTION_REQUEST_DURATION.labels(operation=operation).observe(elapsed)
+            except asyncio.CancelledError:
+                self.circuit_breaker.release()
+                raise
+            except Exception as e:
+                self._record_error_metrics(e)
+                if self._is_upstream_failure(e):
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
+                
+                if (not isinstance(e, APIResponseError) or not self._is_retryable(e) or
+                        attempt >= self.settings.notion_max_retries):
+                    raise
+                
+                delay = self._retry_delay(e, attempt)
+                if e.code == APIErrorCode.RateLimited:
+                    self.rate_limiter.pause(delay)
+                attempt += 1
+                logger.warning("Notion API 請求受限（%s），%.2f 秒後進行第 %s 次重試", e.code, delay, attempt)
+                await asyncio.sleep(delay)
+            else:
+                self.circuit_breaker.record_success()
+                return result
+    
+    def _record_error_metrics(self, error: Exception):
+        """記錄 Notion API 錯誤指標"""
+        if isinstance(error, APIResponseError):
+            NOTION_ERRORS.labels(code=getattr(error.code, "value", error.code)).inc()
+            if error.code == APIErrorCode.RateLimited:
+                NOTION_RATE_LIMITED.inc()
+        else:
+            NOTION_ERRORS.labels(code=type(error).__name__).inc()
+    
+    def _latency_tracker(self, operation: str) -> LatencyTracker:
+        """取得指定 API 操作的延遲統計"""
+        tracker = self.operation_latency.get(operation)
+        if tracker is None:
+            tracker = LatencyTracker(window=self.settings.notion_latency_window)
+            self.operation_latency[operation] = tracker
+        return tracker
     
-    async def search_database(self, query: str) -> SearchResponse:
-        """搜尋 Notion 資料庫"""
+    def _should_hedge(self, priority: Priority, operation: str) -> bool:
+        """檢查是否對此請求啟用對沖（僅限使用者等待中的請求，且需有足夠的延遲樣本）"""
+        if not self.settings.notion_hedging_enabled or priority > Priority.HYDRATION:
+            return False
+        if operation not in HEDGED_OPERATIONS:
+            return False
+        return self._latency_tracker(operation).sample_count >= self.settings.notion_hedge_min_samples
+    
+    async def _call_with_hedge(self, operation: str, func: Callable[..., Awaitable[Any]],
+                               kwargs: Dict[str, Any]) -> Tuple[Any, bool]:
+        """請求超過近期延遲百分位數仍未回應時送出重複請求，採用最先成功的結果（回傳結果與是否由對沖請求勝出）"""
+        delay = self._latency_tracker(operation).percentile(self.settings.notion_hedge_percentile)
+        primary = asyncio.ensure_future(func(**kwargs))
+        primary.add_done_callback(lambda task: task.cancelled() or task.exception())
+        hedge = None
+        
         try:
-            logger.info(f"開始搜尋 Notion 資料庫，查詢：{query}")
-            
-            # 執行搜尋
-            search_results = await self._perform_search(query)
-            
-            # 處理搜尋結果
-            results = []
-            for item in search_results.get("results", []):
-                result = await self._process_search_result(item)
-                if result:
-                    results.append(result)
-            
-            total_count = len(results)
-            
-            # 限制結果數量
-            max_results = self.settings.max_search_results
-            if len(results) > max_results:
-                results = results[:max_results]
-            
-            logger.info(f"搜尋完成，找到 {total_count} 個結果，返回前 {len(results)} 個")
-            
-            return SearchResponse(
-                query=query,
-                results=results,
-                total_count=total_count
-            )
-            
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result(), False
+            
+            # 對沖請求同樣需要速率限制的 token，沒有餘裕時繼續等待原請求
+            if not self.rate_limiter.try_acquire():
+                return await primary, False
+            
+            self.hedges += 1
+            logger.debug("Notion %s 超過 %.2f 秒未回應，送出對沖請求", operation, delay)
+            hedge = asyncio.ensure_future(func(**kwargs))
+            hedge.add_done_callback(lambda task: task.cancelled() or task.exception())
+            
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result(), task is hedge
+                    error = task.exception()
+            raise error
+        finally:
+            # 取消尚未完成的請求（包含呼叫者被取消時）
+            for task in (primary, hedge):
+                if task is not None:
+                    task.cancel()
+    
+    def hedging_stats(self) -> Dict[str, Any]:
+        """取得請求對沖與各 API 操作延遲的統計資訊"""
+        return {
+            "enabled": self.settings.notion_hedging_enabled,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency": {
+                operation: tracker.stats()
+                for operation, tracker in self.operation_latency.items()
+            }
+        }
+    
+    def _is_upstream_failure(self, error: Exception) -> bool:
+        """檢查錯誤是否代表 Notion 服務異常（用於斷路器判斷）"""
+        if isinstance(error, APIResponseError):
+            # 429 由速率限制器處理，不視為服務異常
+            return error.code in (APIErrorCode.InternalServerError, APIErrorCode.ServiceUnavailable)
+        if isinstance(error, HTTPResponseError):
+            return error.status >= 500
+        return isinstance(error, (RequestTimeoutError, httpx.TransportError, asyncio.TimeoutError))
+    
+    def _is_retryable(self, error: APIResponseError) -> bool:
+        """檢查 Notion API 錯誤是否可以重試"""
+        return error.code in (APIErrorCode.RateLimited, APIErrorCode.ServiceUnavailable)
+    
+    def _retry_delay(self, error: APIResponseError, attempt: int) -> float:
+        """計算重試延遲（優先使用 Retry-After，並加上隨機抖動）"""
+        backoff = self.settings.notion_retry_base_delay * (2 ** attempt)
+        retry_after = None
+        try:
+            retry_after = float(error.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+        
+        base = retry_after if retry_after is not None else backoff
+        return base + random.uniform(0, backoff)
+    
+    async def search_database(self, query: str, hydrate: bool = True,
+                              deadline: Optional[Deadline] = None) -> SearchResponse:
+        """搜尋 Notion 資料庫（hydrate 為 False 時不取得頁面內容；超過 deadline 時回傳已取得的部分結果）"""
+        try:
+            # 以正規化後的查詢作為快取鍵（大小寫、全半形、空白差異視為相同查詢）
+            cache_key = normalize_text(query)
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                SEARCH_CACHE_HITS.inc()
+                logger.debug("搜尋快取命中：%s", query)
+                return cached.model_copy(update={"query": query})
+            SEARCH_CACHE_MISSES.inc()
+            
+            # Notion 異常期間直接回傳最後一次成功的結果，半開時於背景更新
+            if (self.circuit_breaker.state != CircuitState.CLOSED and
+                    not self.is_index_available()):
+                stale = self.stale_results.get(cache_key)
+                if stale is not None:
+                    if self.circuit_breaker.state == CircuitState.HALF_OPEN:
+                        self._refresh_in_background(cache_key, query)
+                    logger.info("Notion 斷路器未關閉，回傳過期的搜尋結果")
+                    return stale.model_copy(update={"query": query})
+            
+            # 相同查詢同時進行時共用同一次 Notion 搜尋（僅標題的結果不寫入快取，避免覆蓋完整結果）
+            if hydrate:
+                response = await self._search_shared(cache_key, query, deadline)
+            else:
+                response = await self.search_flights.do(
+                    (cache_key, "titles_only"),
+                    lambda: self._search_uncached(query, hydrate=False, deadline=deadline)
+                )
+            if response.query != query:
+                response = response.model_copy(update={"query": query})
+            return response
+        
+        except asyncio.TimeoutError:
+            logger.warning("搜尋超過處理期限")
+            return self._fallback_response(query)
         except Exception as e:
-            logger.error(f"搜尋 Notion 資料庫時發生錯誤", error=e)
-            return SearchResponse(query=query, results=[], total_count=0)
+            logger.error("搜尋 Notion 資料庫時發生錯誤", error=e)
+            return self._fallback_response(query)
+    
+    async def _search_shared(self, cache_key: str, query: str,
+                             deadline: Optional[Deadline] = None) -> SearchResponse:
+        """共用進行中的相同搜尋；因第一個呼叫者的期限而逾時或只取得部分結果時，依自己的期限重新搜尋"""
+        try:
+            response = await self.search_flights.do(
+                cache_key,
+                lambda: self._search_and_cache(cache_key, query, deadline)
+            )
+        except asyncio.TimeoutError:
+            if deadline is not None and deadline.expired:
+                raise
+            response = None
+        
+        if response is not None and not response.partial:
+            return response
+        if deadline is not None and deadline.expired:
+            return response
+        
+        # 同一批後到者共用一次重新搜尋，避免 Notion 變慢時每個後到者各自搜尋
+        logger.debug("共用的搜尋結果受其他請求期限影響，依自己的期限重新搜尋：%s", query)
+        return await self.search_flights.do(
+            (cache_key, "retry"),
+            lambda: self._search_and_cache(cache_key, query, deadline)
+        )
+    
+    def _fallback_response(self, query: str) -> SearchResponse:
+        """搜尋失敗時回傳最後一次成功的結果（沒有時回傳標記為部分結果的空結果，與真的沒有找到內容區分）"""
+        stale = self.stale_results.get(normalize_text(query))
+        if stale is not None:
+            return stale.model_copy(update={"query": query})
+        return SearchResponse(query=query, results=[], total_count=0, partial=True)
+    
+    def search_cached(self, query: str) -> Optional[SearchResponse]:
+        """僅使用快取、本地索引或過期結果回答查詢（不呼叫 Notion API），沒有可用結果時回傳 None"""
+        cache_key = normalize_text(query)
+        response = self.search_cache.get(cache_key)
+        if response is None and self.is_index_available():
+            response = self._search_index(query)
+        if response is None:
+            response = self.stale_results.get(cache_key)
+        
+        if response is None:
+            return None
+        return response.model_copy(update={"query": query})
+    
+    def _refresh_in_background(self, cache_key: str, query: str):
+        """於背景重新搜尋並更新快取"""
+        async def refresh():
+            try:
+                await self.search_flights.do(cache_key, lambda: self._search_and_cache(cache_key, query))
+            except Exception as e:
+                logger.warning("背景更新搜尋結果失敗：%s", e)
+        
+        task = asyncio.create_task(refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    def invalidate_search_cache(self):
+        """清除搜尋結果快取"""
+        self.search_cache.clear()
     
-    async def _perform_search(self, query: str) -> Dict[str, Any]:
-        """執行 Notion 搜尋"""
+    async def _search_and_cache(self, cache_key: str, query: str,
+                                deadline: Optional[Deadline] = None) -> SearchResponse:
+        """搜尋並寫入快取（部分結果不寫入快取）"""
+        response = await self._search_uncached(query, deadline=deadline)
+        if not response.partial:
+            self.search_cache.set(cache_key, response)
+            self.stale_results.set(cache_key, response)
+        return response
+    
+    async def _search_uncached(self, query: str, hydrate: bool = True,
+                               deadline: Optional[Deadline] = None) -> SearchResponse:
+        """不經快取搜尋 Notion 資料庫"""
+        # 優先使用本地鏡像索引，Notion 即時搜尋僅作為備援
+        if self.is_index_available():
+            response = self._search_index(query)
+            if response.results or not self.settings.notion_index_fallback_on_miss:
+                return response
+            logger.info("本地索引沒有找到結果，改用 Notion 即時搜尋")
+        
+        logger.info("開始搜尋 Notion 資料庫", query_length=len(query))
+        logger.debug("Notion 搜尋查詢：%s", query)
+        
+        # 執行搜尋
+        search_results = await self._perform_search(query, deadline)
+        
+        # 第一階段：以查詢回應中的中繼資料排序並篩選
+        candidates = self._rank_search_items(query, search_results.get("results", []))
+        total_count = len(candidates)
+        
+        # 第二階段：僅對要回傳的結果取得內容（並行取得並保持順序）
+        max_results = self.settings.max_search_results
+        if hydrate:
+            processed = await self._process_search_results(candidates[:max_results], deadline)
+        else:
+            processed = [self._build_search_result(item) for item in candidates[:max_results]]
+        results = [result for result in processed if result]
+        
+        # 超過期限時部分結果沒有內容
+        partial = not hydrate or (deadline is not None and deadline.expired)
+        
+        logger.info("搜尋完成，找到 %s 個結果，返回前 %s 個", total_count, len(results))
+        
+        return SearchResponse(
+            query=query,
+            results=results,
+            total_count=total_count,
+            partial=partial
+        )
+    
+    def is_index_available(self) -> bool:
+        """檢查本地鏡像索引是否可用"""
+        return (self.search_index.is_ready and
+                self.search_index.is_fresh(self.settings.notion_sync_max_staleness))
+    
+    def _search_index(self, query: str) -> SearchResponse:
+        """使用本地鏡像索引搜尋"""
+        pages, total_count = self.search_index.search(query, self.settings.max_search_results)
+        results = [page.to_search_result() for page in pages]
+        
+        logger.info("本地索引搜尋完成，找到 %s 個結果，返回前 %s 個", total_count, len(results))
+        
+        return SearchResponse(
+            query=query,
+            results=results,
+            total_count=total_count
+        )
+    
+    async def _perform_search(self, query: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """執行 Notion 搜尋（全域搜尋超過期限時只回傳資料庫搜尋結果）"""
         try:
-            # 使用 asyncio 執行同步的 Notion API 調用
-            loop = asyncio.get_event_loop()
+            if self.settings.notion_speculative_search:
+                return await self._perform_speculative_search(query, deadline)
             
             # 先嘗試在資料庫中搜尋
-            database_results = await loop.run_in_executor(
-                None,
-                lambda: self.client.databases.query(
-                    database_id=self.database_id,
-                    filter={
-                        "or": [
-                            {
-                                "property": "Name",
-                                "title": {
-                                    "contains": query
-                                }
-                            },
-                            {
-                                "property": "Tags",
-                                "multi_select": {
-                                    "contains": query
-                                }
-                            }
-                        ]
-                    },
-                    sorts=[
-                        {
-                            "property": "Last edited time",
-                            "direction": "descending"
-                        }
-                    ]
-                )
-            )
+            database_results = await wait_with_deadline(self._query_database(query), deadline)
             
             # 如果資料庫搜尋結果不足，再進行全域搜尋
             if len(database_results.get("results", [])) < self.settings.max_search_results:
-                global_results = await loop.run_in_executor(
-                    None,
-                    lambda: self.client.search(
-                        query=query,
-                        filter={
-                            "property": "object",
-                            "value": "page"
-                        },
-                        sort={
-                            "direction": "descending",
-                            "timestamp": "last_edited_time"
-                        }
-                    )
-                )
-                
-                # 合併結果並去重
-                all_results = database_results.get("results", [])
-                existing_ids = {result["id"] for result in all_results}
-                
-                for result in global_results.get("results", []):
-                    if result["id"] not in existing_ids:
-                        all_results.append(result)
-                
-                database_results["results"] = all_results
+                try:
+                    global_results = await wait_with_deadline(self._search_pages(query), deadline)
+                except asyncio.TimeoutError:
+                    logger.warning("全域搜尋超過處理期限，只使用資料庫搜尋結果")
+                else:
+                    self._merge_results(database_results, global_results)
             
             return database_results
-            
+        
+        except asyncio.TimeoutError:
+            logger.warning("Notion 資料庫搜尋超過處理期限")
+            raise
+        except CircuitOpenError as e:
+            logger.warning("略過 Notion 搜尋：%s", e)
+            raise
         except APIResponseError as e:
-            logger.error(f"Notion API 回應錯誤", error=e)
+            logger.error("Notion API 回應錯誤", error=e)
             raise
         except RequestTimeoutError as e:
-            logger.error(f"Notion API 請求超時", error=e)
+            logger.error("Notion API 請求超時", error=e)
             raise
         except Exception as e:
-            logger.error(f"執行 Notion 搜尋時發生未知錯誤", error=e)
+            logger.error("執行 Notion 搜尋時發生未知錯誤", error=e)
             raise
     
-    async def _process_search_result(self, item: Dict[str, Any]) -> Optional[SearchResult]:
-        """處理單個搜尋結果"""
-        try:
-            # 取得頁面標題
+    def _rank_search_items(self, query: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """依標題、標籤與 last_edited_time 排序搜尋結果（不需額外的 API 呼叫）"""
+        normalized = normalize_text(query)
+        ranked = []
+        
+        for item in items:
             title = self._extract_title(item)
             if not title:
+                continue
+            
+            tags = [normalize_text(tag) for tag in self._extract_tags(item)]
+            score = match_score(normalized, normalize_text(title), tags)
+            ranked.append((score, item.get("last_edited_time") or "", item))
+        
+        # 穩定排序：分數與時間皆相同時保留 Notion 回傳的順序
+        ranked.sort(key=lambda entry: (entry[0], entry[1]), reverse=True)
+        return [item for _, _, item in ranked]
+    
+    async def _perform_speculative_search(self, query: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """同時執行資料庫查詢與全域搜尋，資料庫結果已足夠時取消全域搜尋"""
+        global_task = asyncio.create_task(self._search_pages(query))
+        # 避免被取消或未使用的任務產生「例外未被取得」警告
+        global_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        
+        try:
+            database_results = await wait_with_deadline(self._query_database(query), deadline)
+        except BaseException:
+            global_task.cancel()
+            raise
+        
+        if len(database_results.get("results", [])) >= self.settings.max_search_results:
+            global_task.cancel()
+            return database_results
+        
+        try:
+            global_results = await wait_with_deadline(global_task, deadline)
+        except asyncio.TimeoutError:
+            logger.warning("全域搜尋超過處理期限，只使用資料庫搜尋結果")
+            return database_results
+        
+        self._merge_results(database_results, global_results)
+        return database_results
+    
+    async def _query_database(self, query: str) -> Dict[str, Any]:
+        """在資料庫中搜尋標題或標籤符合的頁面"""
+        return await self._call_notion(
+            Priority.INTERACTIVE,
+            self.client.databases.query,
+            operation="databases.query",
+            database_id=self.database_id,
+            filter={
+                "or": [
+                    {
+                        "property": "Name",
+                        "title": {
+                            "contains": query
+                        }
+                    },
+                    {
+                        "property": "Tags",
+                        "multi_select": {
+                            "contains": query
+                        }
+                    }
+                ]
+            },
+            sorts=[
+                {
+                    "property": "Last edited time",
+                    "direction": "descending"
+                }
+            ]
+        )
+    
+    async def _search_pages(self, query: str) -> Dict[str, Any]:
+        """在整個工作區中搜尋頁面"""
+        return await self._call_notion(
+            Priority.INTERACTIVE,
+            self.client.search,
+            operation="search",
+            query=query,
+            filter={
+                "property": "object",
+                "value": "page"
+            },
+            sort={
+                "direction": "descending",
+                "timestamp": "last_edited_time"
+            }
+        )
+    
+    def _merge_results(self, database_results: Dict[str, Any], global_results: Dict[str, Any]):
+        """合併資料庫與全域搜尋結果並去重"""
+        all_results = database_results.get("results", [])
+        existing_ids = {result["id"] for result in all_results}
+        
+        for result in global_results.get("results", []):
+            if result["id"] not in existing_ids:
+                all_results.append(result)
+        
+        database_results["results"] = all_results
+    
+    async def _process_search_results(self, items: List[Dict[str, Any]],
+                                      deadline: Optional[Deadline] = None) -> List[Optional[SearchResult]]:
+        """以有限並行數處理多個搜尋結果（回傳順序與輸入相同）"""
+        async def process(item: Dict[str, Any]) -> Optional[SearchResult]:
+            async with self._content_semaphore:
+                return await self._process_search_result(item, deadline)
+        
+        return await asyncio.gather(*(process(item) for item in items))
+    
+    async def _process_search_result(self, item: Dict[str, Any],
+                                     deadline: Optional[Deadline] = None) -> Optional[SearchResult]:
+        """處理單個搜尋結果"""
+        try:
+            # 沒有標題的頁面不需要取得內容
+            if not self._extract_title(item):
                 return None
             
             # 取得頁面內容
-            content = await self._extract_content(item["id"])
-            
-            # 取得頁面 URL
-            url = item.get("url")
-            
-            # 取得時間資訊
-            created_time = item.get("created_time")
-            last_edited_time = item.get("last_edited_time")
-            
-            # 取得標籤
-            tags = self._extract_tags(item)
-            
-            return SearchResult(
-                title=title,
-                content=content,
-                url=url,
-                created_time=created_time,
-                last_edited_time=last_edited_time,
-                tags=tags
-            )
+            content = await self._extract_content(item["id"], item.get("last_edited_time"), deadline)
             
+            return self._build_search_result(item, content)
+        
         except Exception as e:
-            logger.error(f"處理搜尋結果時發生錯誤", error=e)
+            logger.error("處理搜尋結果時發生錯誤", error=e)
+            return None
+    
+    def _build_search_result(self, item: Dict[str, Any], content: Optional[str] = None) -> Optional[SearchResult]:
+        """將 Notion 頁面轉換為搜尋結果"""
+        title = self._extract_title(item)
+        if not title:
             return None
+        
+        return SearchResult(
+            title=title,
+            content=content,
+            url=item.get("url"),
+            created_time=item.get("created_time"),
+            last_edited_time=item.get("last_edited_time"),
+            tags=self._extract_tags(item)
+        )
     
     def _extract_title(self, item: Dict[str, Any]) -> Optional[str]:
         """提取頁面標題"""
@@ -187,39 +604,97 @@ class NotionService:
                         return "".join([t.get("plain_text", "") for t in text_array])
             
             return "無標題"
-            
+        
         except Exception as e:
-            logger.error(f"提取標題時發生錯誤", error=e)
+            logger.error("提取標題時發生錯誤", error=e)
             return "無標題"
     
-    async def _extract_content(self, page_id: str) -> Optional[str]:
-        """提取頁面內容"""
+    async def _extract_content(self, page_id: str, last_edited_time: Optional[str] = None,
+                               deadline: Optional[Deadline] = None) -> Optional[str]:
+        """提取頁面內容（超過期限時回傳 None）"""
         try:
-            loop = asyncio.get_event_loop()
+            content = await wait_with_deadline(
+                self._fetch_page_text(
+                    page_id,
+                    max_length=MAX_CONTENT_LENGTH,
+                    last_edited_time=last_edited_time
+                ),
+                deadline
+            )
+            
+            # 限制內容長度
+            if len(content) > MAX_CONTENT_LENGTH:
+                content = content[:MAX_CONTENT_LENGTH] + "..."
+            
+            return content if content else None
+        
+        except asyncio.TimeoutError:
+            logger.warning("取得頁面內容超過處理期限：%s", page_id)
+            return None
+        except Exception as e:
+            logger.error("提取頁面內容時發生錯誤", error=e)
+            return None
+    
+    async def _fetch_page_text(self, page_id: str, max_length: Optional[int] = None,
+                               last_edited_time: Optional[str] = None,
+                               priority: Priority = Priority.HYDRATION) -> str:
+        """取得頁面區塊文字（依 start_cursor 分頁，達到 max_length 即停止）"""
+        # 頁面未變動（last_edited_time 相同）時直接使用快取內容
+        if last_edited_time:
+            cached = self.content_cache.get(page_id, last_edited_time)
+            if cached is not None and (cached.complete or max_length is not None):
+                CONTENT_CACHE_HITS.inc()
+                return cached.text
+            CONTENT_CACHE_MISSES.inc()
+        
+        content_parts = []
+        length = 0
+        start_cursor = None
+        complete = True
+        
+        while True:
+            kwargs = {"block_id": page_id}
+            if start_cursor:
+                kwargs["start_cursor"] = start_cursor
             
             # 取得頁面區塊
-            blocks = await loop.run_in_executor(
-                None,
-                lambda: self.client.blocks.children.list(block_id=page_id)
+            blocks = await self._call_notion(
+                priority,
+                self.client.blocks.children.list,
+                operation="blocks.children.list",
+                **kwargs
             )
             
-            content_parts = []
             for block in blocks.get("results", []):
                 text = self._extract_block_text(block)
                 if text:
                     content_parts.append(text)
-            
-            content = "\n".join(content_parts)
-            
-            # 限制內容長度
-            if len(content) > 500:
-                content = content[:500] + "..."
-            
-            return content if content else None
-            
-        except Exception as e:
-            logger.error(f"提取頁面內容時發生錯誤", error=e)
-            return None
+                    length += len(text) + 1
+            
+            start_cursor = blocks.get("next_cursor")
+            if not blocks.get("has_more") or not start_cursor:
+                break
+            
+            if max_length is not None and length > max_length:
+                complete = False
+                break
+        
+        text = "\n".join(content_parts)
+        if last_edited_time:
+            self.content_cache.set(page_id, last_edited_time, PageContent(text=text, complete=complete))
+        return text
+    
+    def _build_indexed_page(self, item: Dict[str, Any], content: str) -> IndexedPage:
+        """將 Notion 頁面轉換為鏡像頁面"""
+        return IndexedPage(
+            page_id=item["id"],
+            title=self._extract_title(item) or "無標題",
+            tags=self._extract_tags(item),
+            content=content,
+            url=item.get("url"),
+            created_time=item.get("created_time"),
+            last_edited_time=item.get("last_edited_time")
+        )
     
     def _extract_block_text(self, block: Dict[str, Any]) -> Optional[str]:
         """提取區塊文字"""
@@ -236,9 +711,9 @@ class NotionService:
                 return "".join([t.get("plain_text", "") for t in rich_text])
             
             return None
-            
+        
         except Exception as e:
-            logger.error(f"提取區塊文字時發生錯誤", error=e)
+            logger.error("提取區塊文字時發生錯誤", error=e)
             return None
     
     def _extract_tags(self, item: Dict[str, Any]) -> List[str]:
@@ -257,9 +732,9 @@ class NotionService:
                             tags.append(tag_name)
             
             return tags
-            
+        
         except Exception as e:
-            logger.error(f"提取標籤時發生錯誤", error=e)
+            logger.error("提取標籤時發生錯誤", error=e)
             return []
     
     async def test_connection(self) -> bool:
@@ -267,17 +742,34 @@ class NotionService:
         try:
             logger.info("測試 Notion API 連線")
             
-            loop = asyncio.get_event_loop()
-            
             # 嘗試取得資料庫資訊
-            await loop.run_in_executor(
-                None,
-                lambda: self.client.databases.retrieve(database_id=self.database_id)
+            await self._call_notion(
+                Priority.HEALTH_CHECK,
+                self.client.databases.retrieve,
+                database_id=self.database_id
             )
             
             logger.info("Notion API 連線測試成功")
             return True
-            
+        
+        except Exception as e:
+            logger.error("Notion API 連線測試失敗", error=e)
+            return False
+    
+    async def probe_connection(self) -> str:
+        """健康檢查用的連線探測（不排入速率限制器佇列，沒有空閒 token 或斷路器開啟時只回報狀態）"""
+        if self.circuit_breaker.state == CircuitState.OPEN:
+            return "circuit_open"
+        if not self.rate_limiter.try_acquire():
+            return "throttled"
+        
+        try:
+            await self.client.databases.retrieve(database_id=self.database_id)
+            return "ok"
         except Exception as e:
-            logger.error(f"Notion API 連線測試失敗", error=e)
-            return False
\ No newline at end of file
+            logger.warning("Notion API 連線探測失敗：%s", e)
+            return "error"
+    
+    async def aclose(self):
+        """關閉 Notion API 連線池"""
+        await self.client.aclose()
\ No newline at end of file
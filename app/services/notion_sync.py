@@ -0,0 +1,190 @@
+"""
+Notion 資料庫本地鏡像同步服務模組
+"""
+import asyncio
+import time
+from typing import Optional, Dict, Any, Set
+from ..config import get_settings
+from ..utils.logger import get_logger
+from ..utils.rate_limiter import Priority
+from .notion_service import NotionService
+
+logger = get_logger(__name__)
+
+# databases.query 單次最多可取得的頁面數
+QUERY_PAGE_SIZE = 100
+
+
+class NotionSyncService:
+    """將 Notion 資料庫鏡像至本地倒排索引的同步服務"""
+    
+    def __init__(self, notion_service: NotionService):
+        self.settings = get_settings()
+        self.notion_service = notion_service
+        self.index = notion_service.search_index
+        self._watermark: Optional[str] = None
+        self._last_full_sync: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """啟動背景同步"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("Notion 本地鏡像同步已啟動")
+    
+    async def stop(self):
+        """停止背景同步"""
+        if self._task is None:
+            return
+        
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Notion 本地鏡像同步已停止")
+    
+    async def _run(self):
+        """背景同步迴圈"""
+        while True:
+            try:
+                if self._needs_full_sync():
+                    await self.full_sync()
+                else:
+                    await self.incremental_sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("同步 Notion 資料庫時發生錯誤", error=e)
+            
+            await asyncio.sleep(self.settings.notion_sync_interval)
+    
+    def _needs_full_sync(self) -> bool:
+        """檢查是否需要完整同步"""
+        if self._last_full_sync is None or self._watermark is None:
+            return True
+        return time.time() - self._last_full_sync >= self.settings.notion_full_sync_interval
+    
+    async def full_sync(self) -> int:
+        """完整同步資料庫（同時移除已刪除或封存的頁面）"""
+        logger.info("開始完整同步 Notion 資料庫")
+        
+        seen_ids: Set[str] = set()
+        updated = await self._sync_pages(None, seen_ids)
+        
+        removed_ids = self.index.page_ids() - seen_ids
+        for page_id in removed_ids:
+            self.index.remove(page_id)
+        
+        self._last_full_sync = time.time()
+        self.index.mark_synced()
+        if updated or removed_ids:
+            self.notion_service.invalidate_search_cache()
+        
+        logger.info("完整同步完成，共 %s 個頁面，更新 %s 個，移除 %s 個", len(seen_ids), updated, len(removed_ids))
+        return updated
+    
+    async def incremental_sync(self) -> int:
+        """增量同步（僅重新取得 last_edited_time 有變動的頁面）"""
+        if self._watermark is None:
+            return await self.full_sync()
+        
+        updated = await self._sync_pages(self._watermark, set())
+        self.index.mark_synced()
+        if updated:
+            self.notion_service.invalidate_search_cache()
+        
+        if updated:
+            logger.info("增量同步完成，更新 %s 個頁面", updated)
+        return updated
+    
+    async def _sync_pages(self, since: Optional[str], seen_ids: Set[str]) -> int:
+        """分頁取得資料庫頁面並更新索引"""
+        updated = 0
+        start_cursor = None
+        earliest_failure: Optional[str] = None
+        
+        while True:
+            response = await self._query_database(since, start_cursor)
+            
+            for item in response.get("results", []):
+                seen_ids.add(item["id"])
+                try:
+                    if await self._sync_page(item, since):
+                        updated += 1
+                except Exception as e:
+                    logger.error("同步頁面內容時發生錯誤：%s", item['id'], error=e)
+                    failed_time = item.get("last_edited_time")
+                    if failed_time and (earliest_failure is None or failed_time < earliest_failure):
+                        earliest_failure = failed_time
+            
+            start_cursor = response.get("next_cursor")
+            if not response.get("has_more") or not start_cursor:
+                break
+        
+        # 有頁面同步失敗時，水位退回該頁面的時間以便下次重試
+        if earliest_failure and self._watermark and earliest_failure < self._watermark:
+            self._watermark = earliest_failure
+        
+        return updated
+    
+    async def _sync_page(self, item: Dict[str, Any], since: Optional[str]) -> bool:
+        """同步單一頁面，回傳是否有更新"""
+        page_id = item["id"]
+        last_edited_time = item.get("last_edited_time")
+        
+        if item.get("archived") or item.get("in_trash"):
+            removed = page_id in self.index
+            self.index.remove(page_id)
+            return removed
+        
+        existing = self.index.get(page_id)
+        same_timestamp = existing is not None and existing.last_edited_time == last_edited_time
+        if same_timestamp and last_edited_time != since:
+            return False
+        
+        # Notion 的 last_edited_time 以分鐘為單位，與水位相同的頁面仍需重新取得（同一分鐘內的修改不能使用內容快取）
+        content = await self.notion_service._fetch_page_text(
+            page_id,
+            last_edited_time=None if same_timestamp else last_edited_time,
+            priority=Priority.BACKGROUND
+        )
+        page = self.notion_service._build_indexed_page(item, content)
+        
+        if last_edited_time and (self._watermark is None or last_edited_time > self._watermark):
+            self._watermark = last_edited_time
+        
+        # 只有標題、標籤、內容等實際變動時才視為更新（避免每次增量同步都清除搜尋快取）
+        if page == existing:
+            return False
+        self.index.upsert(page)
+        return True
+    
+    async def _query_database(self, since: Optional[str], start_cursor: Optional[str]) -> Dict[str, Any]:
+        """查詢資料庫頁面（依 last_edited_time 遞增排序）"""
+        kwargs: Dict[str, Any] = {
+            "database_id": self.notion_service.database_id,
+            "page_size": QUERY_PAGE_SIZE,
+            "sorts": [
+                {
+                    "timestamp": "last_edited_time",
+                    "direction": "ascending"
+                }
+            ]
+        }
+        if since:
+            kwargs["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {
+                    "on_or_after": since
+                }
+            }
+        if start_cursor:
+            kwargs["start_cursor"] = start_cursor
+        
+        return await self.notion_service._call_notion(
+            Priority.BACKGROUND,
+            self.notion_service.client.databases.query,
+            **kwargs
+        )
@@ -0,0 +1,166 @@
+"""
+Notion 資料庫本地鏡像的倒排索引模組
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from ..models.line_models import SearchResult
+from ..utils.text import normalize_text, char_ngrams, query_ngrams
+
+# 搜尋結果內容的最大長度（與即時搜尋一致）
+MAX_CONTENT_LENGTH = 500
+
+
+def match_score(query: str, title: str, tags: List[str], content: str = "") -> int:
+    """計算正規化後的查詢與頁面欄位的符合分數（標題 > 標籤 > 內容）"""
+    if query in title:
+        return 3
+    if any(query in tag for tag in tags):
+        return 2
+    if query in content:
+        return 1
+    return 0
+
+
+@dataclass
+class IndexedPage:
+    """已鏡像的 Notion 頁面"""
+    page_id: str
+    title: str
+    tags: List[str] = field(default_factory=list)
+    content: str = ""
+    url: Optional[str] = None
+    created_time: Optional[str] = None
+    last_edited_time: Optional[str] = None
+    
+    def to_search_result(self) -> SearchResult:
+        """轉換為搜尋結果"""
+        content = self.content
+        if len(content) > MAX_CONTENT_LENGTH:
+            content = content[:MAX_CONTENT_LENGTH] + "..."
+        
+        return SearchResult(
+            title=self.title,
+            content=content or None,
+            url=self.url,
+            created_time=self.created_time,
+            last_edited_time=self.last_edited_time,
+            tags=list(self.tags)
+        )
+
+
+@dataclass
+class _IndexedFields:
+    """頁面正規化後的欄位（用於比對）"""
+    title: str
+    tags: List[str]
+    content: str
+
+
+class SearchIndex:
+    """以字元 n-gram 建立的記憶體倒排索引"""
+    
+    def __init__(self):
+        self._pages: Dict[str, IndexedPage] = {}
+        self._fields: Dict[str, _IndexedFields] = {}
+        self._page_grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self.is_ready = False
+        self.last_synced_at: Optional[float] = None
+    
+    def __len__(self) -> int:
+        return len(self._pages)
+    
+    def __contains__(self, page_id: str) -> bool:
+        return page_id in self._pages
+    
+    def get(self, page_id: str) -> Optional[IndexedPage]:
+        """取得已鏡像的頁面"""
+        return self._pages.get(page_id)
+    
+    def page_ids(self) -> Set[str]:
+        """取得所有已鏡像的頁面 ID"""
+        return set(self._pages)
+    
+    def upsert(self, page: IndexedPage):
+        """新增或更新頁面"""
+        self.remove(page.page_id)
+        
+        fields = _IndexedFields(
+            title=normalize_text(page.title),
+            tags=[normalize_text(tag) for tag in page.tags],
+            content=normalize_text(page.content)
+        )
+        
+        grams = char_ngrams(fields.title)
+        for tag in fields.tags:
+            grams |= char_ngrams(tag)
+        grams |= char_ngrams(fields.content)
+        
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(page.page_id)
+        
+        self._pages[page.page_id] = page
+        self._fields[page.page_id] = fields
+        self._page_grams[page.page_id] = grams
+    
+    def remove(self, page_id: str):
+        """移除頁面"""
+        grams = self._page_grams.pop(page_id, None)
+        if grams is None:
+            return
+        
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(page_id)
+                if not posting:
+                    del self._postings[gram]
+        
+        del self._pages[page_id]
+        del self._fields[page_id]
+    
+    def mark_synced(self):
+        """標記索引已完成同步"""
+        self.is_ready = True
+        self.last_synced_at = time.time()
+    
+    def is_fresh(self, max_staleness: float) -> bool:
+        """檢查索引是否可用且未過期"""
+        if not self.is_ready or self.last_synced_at is None:
+            return False
+        return time.time() - self.last_synced_at <= max_staleness
+    
+    def search(self, query: str, limit: int) -> Tuple[List[IndexedPage], int]:
+        """搜尋索引，回傳排序後的前 limit 筆頁面與總符合數"""
+        normalized = normalize_text(query)
+        if not normalized:
+            return [], 0
+        
+        # 以 n-gram 倒排串列取交集得到候選頁面（由小到大）
+        postings = []
+        for gram in query_ngrams(normalized):
+            posting = self._postings.get(gram)
+            if not posting:
+                return [], 0
+            postings.append(posting)
+        postings.sort(key=len)
+        
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return [], 0
+        
+        # 以子字串比對確認候選頁面並計算分數
+        scored = []
+        for page_id in candidates:
+            fields = self._fields[page_id]
+            score = match_score(normalized, fields.title, fields.tags, fields.content)
+            if not score:
+                continue
+            scored.append((score, self._pages[page_id].last_edited_time or "", page_id))
+        
+        scored.sort(reverse=True)
+        pages = [self._pages[page_id] for _, _, page_id in scored[:limit]]
+        return pages, len(scored)
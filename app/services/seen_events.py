@@ -0,0 +1,81 @@
+"""
+Webhook 事件去重模組
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, Any
+from ..models.line_models import LineEvent
+from ..utils.cache import TTLCache
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SeenEventStore(ABC):
+    """已接收事件的儲存區基底類別（子類別可改用跨實例共用的儲存服務）"""
+    
+    def __init__(self):
+        self.redeliveries = 0
+        self.duplicates = 0
+    
+    @abstractmethod
+    async def add(self, event_id: str) -> bool:
+        """記錄事件 ID，回傳是否為第一次出現（需為原子操作）"""
+    
+    @abstractmethod
+    async def remove(self, event_id: str):
+        """移除事件 ID（事件未能送出時讓 Line 重新傳送的事件可以再次處理）"""
+    
+    async def check_and_mark(self, event: LineEvent) -> bool:
+        """記錄事件，重複的事件回傳 False（沒有 webhookEventId 的事件一律視為新事件）"""
+        if not event.webhook_event_id:
+            return True
+        
+        if event.is_redelivery:
+            self.redeliveries += 1
+        
+        if await self.add(event.webhook_event_id):
+            return True
+        
+        self.duplicates += 1
+        logger.info("略過重複的 Webhook 事件：%s（重新傳送：%s）", event.webhook_event_id, event.is_redelivery)
+        return False
+    
+    async def unmark(self, event: LineEvent):
+        """取消事件的已接收紀錄"""
+        if event.webhook_event_id:
+            await self.remove(event.webhook_event_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得統計資訊"""
+        return {
+            "redeliveries": self.redeliveries,
+            "duplicates": self.duplicates
+        }
+
+
+class InMemorySeenEventStore(SeenEventStore):
+    """單一實例使用的有界、具存活時間的已接收事件儲存區"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__()
+        self._seen = TTLCache(maxsize=maxsize, ttl=ttl)
+    
+    async def add(self, event_id: str) -> bool:
+        """記錄事件 ID，回傳是否為第一次出現"""
+        if self._seen.get(event_id) is not None:
+            return False
+        
+        self._seen.set(event_id, True)
+        return True
+    
+    async def remove(self, event_id: str):
+        """移除事件 ID"""
+        self._seen.invalidate(event_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得統計資訊"""
+        stats = super().stats()
+        stats["size"] = len(self._seen)
+        stats["maxsize"] = self._seen.maxsize
+        stats["evictions"] = self._seen.evictions
+        return stats
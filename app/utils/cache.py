@@ -0,0 +1,164 @@
+"""
+記憶體快取工具模組
+"""
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """具有存活時間（TTL）與 LRU 淘汰機制的有界快取"""
+    
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    @property
+    def enabled(self) -> bool:
+        """快取是否啟用"""
+        return self.maxsize > 0 and self.ttl > 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """取得快取值（過期或不存在時回傳 None）"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: Hashable, value: Any):
+        """設定快取值（超過容量時淘汰最久未使用的項目）"""
+        if not self.enabled:
+            return
+        
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key: Hashable):
+        """移除指定快取值"""
+        self._data.pop(key, None)
+    
+    def clear(self):
+        """清除所有快取值"""
+        self._data.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得快取統計資訊"""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+@dataclass
+class PageContent:
+    """快取的頁面內容"""
+    text: str
+    complete: bool = True
+
+
+class PageContentCache:
+    """以 (page_id, last_edited_time) 為鍵、依記憶體用量限制的頁面內容快取"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[str, PageContent, int]]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    @staticmethod
+    def _entry_size(page_id: str, last_edited_time: str, content: PageContent) -> int:
+        """估算快取項目佔用的記憶體大小"""
+        return sys.getsizeof(page_id) + sys.getsizeof(last_edited_time) + sys.getsizeof(content.text)
+    
+    def get(self, page_id: str, last_edited_time: str) -> Optional[PageContent]:
+        """取得頁面內容（last_edited_time 不同時視為失效）"""
+        entry = self._data.get(page_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        cached_time, content, _ = entry
+        if cached_time != last_edited_time:
+            self._remove(page_id)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        
+        self._data.move_to_end(page_id)
+        self.hits += 1
+        return content
+    
+    def set(self, page_id: str, last_edited_time: str, content: PageContent):
+        """設定頁面內容（超過記憶體上限時淘汰最久未使用的項目）"""
+        size = self._entry_size(page_id, last_edited_time, content)
+        if size > self.max_bytes:
+            return
+        
+        self._remove(page_id)
+        self._data[page_id] = (last_edited_time, content, size)
+        self.current_bytes += size
+        
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, page_id: str):
+        """移除頁面內容"""
+        entry = self._data.pop(page_id, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+    
+    def clear(self):
+        """清除所有頁面內容"""
+        self._data.clear()
+        self.current_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得快取統計資訊"""
+        return {
+            "size": len(self._data),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,98 @@
+"""
+斷路器工具模組
+"""
+import time
+from enum import Enum
+from typing import Callable, Dict, Any
+
+
+class CircuitState(str, Enum):
+    """斷路器狀態"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """斷路器開啟時拒絕請求"""
+    
+    def __init__(self, name: str):
+        super().__init__(f"{name} 斷路器已開啟，暫停呼叫上游服務")
+        self.name = name
+
+
+class CircuitBreaker:
+    """連續失敗達門檻時開啟、經過冷卻時間後以單一探測請求嘗試恢復的斷路器"""
+    
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+    
+    @property
+    def state(self) -> CircuitState:
+        """目前狀態（開啟超過冷卻時間後轉為半開）"""
+        if (self._state == CircuitState.OPEN and
+                self._clock() - self._opened_at >= self.recovery_timeout):
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+    
+    def allow_request(self) -> bool:
+        """檢查是否允許請求（半開狀態一次只允許一個探測請求）"""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        
+        self.rejected += 1
+        return False
+    
+    def check(self):
+        """不允許請求時拋出 CircuitOpenError"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+    
+    def record_success(self):
+        """記錄成功（關閉斷路器）"""
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+    
+    def record_failure(self):
+        """記錄失敗（達門檻或探測失敗時開啟斷路器）"""
+        self._failures += 1
+        if self._state == CircuitState.OPEN:
+            return
+        if self._state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+    
+    def release(self):
+        """請求未完成（例如被取消）時釋放探測名額"""
+        self._probe_in_flight = False
+    
+    def _open(self):
+        """開啟斷路器"""
+        self._state = CircuitState.OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        self.opened += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得統計資訊"""
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
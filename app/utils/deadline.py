@@ -0,0 +1,41 @@
+"""
+處理期限工具模組
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Deadline:
+    """以絕對時間（Unix 秒）表示的處理期限"""
+    
+    def __init__(self, expires_at: float, clock: Callable[[], float] = time.time):
+        self.expires_at = expires_at
+        self._clock = clock
+    
+    @classmethod
+    def from_timestamp(cls, timestamp_ms: int, ttl: float, clock: Callable[[], float] = time.time) -> "Deadline":
+        """由 Line 事件時間戳（毫秒）建立期限（時間戳晚於本機時間時以本機時間為準）"""
+        started_at = min(timestamp_ms / 1000, clock())
+        return cls(started_at + ttl, clock)
+    
+    def remaining(self) -> float:
+        """剩餘時間（秒）"""
+        return max(0.0, self.expires_at - self._clock())
+    
+    @property
+    def expired(self) -> bool:
+        """是否已超過期限"""
+        return self.remaining() <= 0
+    
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.2f})"
+
+
+async def wait_with_deadline(awaitable: Awaitable[T], deadline: Optional[Deadline]) -> T:
+    """在期限內等待（超過期限時取消並拋出 asyncio.TimeoutError，沒有期限時直接等待）"""
+    if deadline is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout=deadline.remaining())
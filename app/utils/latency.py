@@ -0,0 +1,49 @@
+"""
+延遲統計工具模組
+"""
+import math
+from collections import deque
+from typing import Deque, Dict, Any, Optional
+
+
+class LatencyTracker:
+    """以指數加權移動平均（EWMA）與最近 window 筆樣本的百分位數追蹤延遲"""
+    
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        self.alpha = alpha
+        self.count = 0
+        self.ewma = 0.0
+        self.max = 0.0
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+    
+    def observe(self, seconds: float):
+        """記錄一次延遲"""
+        self.count += 1
+        self.ewma = seconds if self.count == 1 else (1 - self.alpha) * self.ewma + self.alpha * seconds
+        self.max = max(self.max, seconds)
+        self._samples.append(seconds)
+    
+    def percentile(self, percent: float) -> Optional[float]:
+        """取得最近樣本的百分位數（nearest-rank，沒有樣本時回傳 None）"""
+        if not self._samples:
+            return None
+        
+        ordered = sorted(self._samples)
+        rank = math.ceil(percent / 100 * len(ordered))
+        return ordered[min(len(ordered), max(1, rank)) - 1]
+    
+    @property
+    def sample_count(self) -> int:
+        """目前視窗內的樣本數"""
+        return len(self._samples)
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得統計資訊"""
+        return {
+            "count": self.count,
+            "ewma": self.ewma,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
@@ -1,15 +1,200 @@
 """
 日誌工具模組
 """
+import copy
+import json
 import logging
+import queue
 import sys
-from typing import Optional
+import threading
+import uuid
+import zlib
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
 from google.cloud import logging as cloud_logging
 from ..config import get_settings, is_production
 
 
+# 目前請求／事件的關聯 ID（隨 asyncio 任務傳遞）
+_correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+# LogRecord 內建欄位，其餘欄位視為呼叫端傳入的 extra
+_RESERVED_ATTRS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "correlation_id", "taskName"}
+
+
+def new_correlation_id() -> str:
+    """產生新的關聯 ID"""
+    return uuid.uuid4().hex[:16]
+
+
+def get_correlation_id() -> Optional[str]:
+    """取得目前的關聯 ID"""
+    return _correlation_id.get()
+
+
+def set_correlation_id(value: Optional[str]) -> Token:
+    """設定目前的關聯 ID，回傳用於還原的 token"""
+    return _correlation_id.set(value)
+
+
+def reset_correlation_id(token: Token):
+    """還原設定前的關聯 ID"""
+    _correlation_id.reset(token)
+
+
+class _CorrelationIdFilter(logging.Filter):
+    """在呼叫端記錄當下的關聯 ID（背景寫入執行緒無法取得呼叫端的 contextvars）"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """輸出單行 JSON 的結構化日誌格式（包含關聯 ID 與 extra 欄位）"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        
+        correlation_id = getattr(record, "correlation_id", None)
+        if correlation_id:
+            payload["correlation_id"] = correlation_id
+        
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """佇列已滿時捨棄日誌而不阻塞呼叫端的 QueueHandler"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.direct_handlers: Optional[List[logging.Handler]] = None
+    
+    def emit(self, record: logging.LogRecord):
+        """放入佇列（背景寫入已停止時改為直接寫出）"""
+        if self.direct_handlers is None:
+            super().emit(record)
+            return
+        
+        for handler in self.direct_handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """組合訊息並將例外轉為文字（保留 extra 欄位供背景執行緒格式化）"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        """將日誌放入佇列（已滿時捨棄）"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LoggingPipeline:
+    """所有日誌記錄器共用的佇列與背景寫入執行緒"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queue_handler: Optional[_DroppingQueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+        self._handlers: List[logging.Handler] = []
+    
+    def get_handler(self) -> QueueHandler:
+        """取得共用的 QueueHandler（首次使用時啟動背景寫入執行緒）"""
+        with self._lock:
+            if self.queue_handler is None:
+                self._start()
+            return self.queue_handler
+    
+    def _start(self):
+        """建立輸出 handler 並啟動背景寫入執行緒"""
+        settings = get_settings()
+        
+        # 設定格式（生產環境預設輸出結構化 JSON）
+        log_format = settings.log_format.lower()
+        if log_format == "json" or (log_format == "auto" and is_production()):
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+        
+        # Console handler
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        self._handlers = [console_handler]
+        
+        # Google Cloud Logging（僅在生產環境，整個程序共用一個 client，由 transport 於背景批次上傳）
+        if is_production():
+            try:
+                client = cloud_logging.Client(project=settings.gcp_project_id)
+                self._handlers.append(client.get_default_handler())
+            except Exception as e:
+                console_handler.handle(logging.makeLogRecord({
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"無法設定 Google Cloud Logging: {e}"
+                }))
+        
+        log_queue = queue.Queue(maxsize=settings.log_queue_size)
+        self.queue_handler = _DroppingQueueHandler(log_queue)
+        self.queue_handler.addFilter(_CorrelationIdFilter())
+        self._listener = QueueListener(log_queue, *self._handlers, respect_handler_level=True)
+        self._listener.start()
+    
+    def shutdown(self):
+        """寫出佇列中剩餘的日誌並停止背景寫入執行緒"""
+        with self._lock:
+            if self._listener is None:
+                return
+            
+            self._listener.stop()
+            self._listener = None
+            # 關閉後（例如測試或重新啟動期間）仍產生的日誌直接寫出
+            self.queue_handler.direct_handlers = self._handlers
+            for handler in self._handlers:
+                transport = getattr(handler, "transport", None)
+                if transport is not None:
+                    transport.flush()
+                handler.flush()
+    
+    @property
+    def dropped(self) -> int:
+        """因佇列已滿而捨棄的日誌數"""
+        return self.queue_handler.dropped if self.queue_handler else 0
+
+
+_pipeline = _LoggingPipeline()
+
+
 class Logger:
-    """日誌管理器"""
+    """日誌管理器（訊息以 % 格式延遲組合，寫出由背景執行緒處理）"""
     
     def __init__(self, name: str = __name__):
         self.settings = get_settings()
@@ -18,8 +203,12 @@ class Logger:
     
     def _setup_logger(self):
         """設定日誌記錄器"""
-        # 設定日誌等級
-        if self.settings.debug:
+        # 設定日誌等級（LOG_LEVEL 優先）
+        if self.settings.log_level:
+            level = logging.getLevelName(self.settings.log_level.upper())
+            if not isinstance(level, int):
+                level = logging.INFO
+        elif self.settings.debug:
             level = logging.DEBUG
         elif is_production():
             level = logging.INFO
@@ -32,60 +221,79 @@ class Logger:
         if self.logger.handlers:
             return
         
-        # 設定格式
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(level)
-        console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
+        # 呼叫端只將日誌放入佇列
+        self.logger.addHandler(_pipeline.get_handler())
+    
+    def _sampled(self) -> bool:
+        """依關聯 ID 決定是否保留請求內的 DEBUG/INFO 日誌（同一請求的日誌一起保留或捨棄）"""
+        rate = self.settings.log_info_sample_rate
+        if rate >= 1:
+            return True
         
-        # Google Cloud Logging (僅在生產環境)
-        if is_production():
-            try:
-                client = cloud_logging.Client(project=self.settings.gcp_project_id)
-                cloud_handler = client.get_default_handler()
-                cloud_handler.setLevel(level)
-                self.logger.addHandler(cloud_handler)
-            except Exception as e:
-                self.logger.warning(f"無法設定 Google Cloud Logging: {e}")
+        correlation_id = _correlation_id.get()
+        if correlation_id is None:
+            return True
+        return zlib.crc32(correlation_id.encode("utf-8")) % 10000 < rate * 10000
     
-    def debug(self, message: str, **kwargs):
+    def debug(self, message: str, *args, **kwargs):
         """記錄 DEBUG 等級日誌"""
-        self.logger.debug(message, extra=kwargs)
+        if self._sampled():
+            self.logger.debug(message, *args, extra=kwargs)
     
-    def info(self, message: str, **kwargs):
-        """記錄 INFO 等級日誌"""
-        self.logger.info(message, extra=kwargs)
+    def info(self, message: str, *args, **kwargs):
+        """記錄 INFO 等級日誌（請求內的日誌依 log_info_sample_rate 取樣）"""
+        if self._sampled():
+            self.logger.info(message, *args, extra=kwargs)
     
-    def warning(self, message: str, **kwargs):
+    def warning(self, message: str, *args, **kwargs):
         """記錄 WARNING 等級日誌"""
-        self.logger.warning(message, extra=kwargs)
+        self.logger.warning(message, *args, extra=kwargs)
     
-    def error(self, message: str, error: Optional[Exception] = None, **kwargs):
+    def error(self, message: str, *args, error: Optional[Exception] = None, **kwargs):
         """記錄 ERROR 等級日誌"""
         if error:
-            self.logger.error(f"{message}: {str(error)}", exc_info=True, extra=kwargs)
+            self.logger.error(*self._with_error(message, args, error), exc_info=True, extra=kwargs)
         else:
-            self.logger.error(message, extra=kwargs)
+            self.logger.error(message, *args, extra=kwargs)
     
-    def critical(self, message: str, error: Optional[Exception] = None, **kwargs):
+    def critical(self, message: str, *args, error: Optional[Exception] = None, **kwargs):
         """記錄 CRITICAL 等級日誌"""
         if error:
-            self.logger.critical(f"{message}: {str(error)}", exc_info=True, extra=kwargs)
+            self.logger.critical(*self._with_error(message, args, error), exc_info=True, extra=kwargs)
         else:
-            self.logger.critical(message, extra=kwargs)
+            self.logger.critical(message, *args, extra=kwargs)
+    
+    @staticmethod
+    def _with_error(message: str, args: tuple, error: Exception) -> tuple:
+        """在訊息後附加錯誤內容"""
+        if not args:
+            message = message.replace("%", "%%")
+        return (f"{message}: %s", *args, error)
 
 
+# 依名稱快取的日誌實例
+_loggers: Dict[str, Logger] = {}
+
 # 全域日誌實例
 logger = Logger("line-notion-bot")
+_loggers["line-notion-bot"] = logger
 
 
 def get_logger(name: str = None) -> Logger:
-    """取得日誌記錄器實例"""
-    if name:
-        return Logger(name)
-    return logger
\ No newline at end of file
+    """取得日誌記錄器實例（相同名稱共用同一個實例）"""
+    if not name:
+        return logger
+    
+    if name not in _loggers:
+        _loggers[name] = Logger(name)
+    return _loggers[name]
+
+
+def shutdown_logging():
+    """寫出剩餘日誌並停止背景寫入（應用程式關閉時呼叫）"""
+    _pipeline.shutdown()
+
+
+def dropped_log_count() -> int:
+    """因佇列已滿而捨棄的日誌數"""
+    return _pipeline.dropped
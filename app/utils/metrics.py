@@ -0,0 +1,295 @@
+"""
+程序內指標工具模組（Prometheus 文字格式）
+"""
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 預設延遲分桶（秒），涵蓋微秒級的簽名驗證到數十秒的 Notion 請求
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    """轉換為 Prometheus 標籤格式"""
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    """轉換為 Prometheus 數值格式"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer:
+    """以 with 區塊量測經過時間並記錄到 Histogram"""
+    
+    __slots__ = ("_histogram", "_started_at")
+    
+    def __init__(self, histogram: "_HistogramChild"):
+        self._histogram = histogram
+        self._started_at = 0.0
+    
+    def __enter__(self) -> "_Timer":
+        self._started_at = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self._histogram.observe(time.perf_counter() - self._started_at)
+
+
+class _Metric(ABC):
+    """指標基底類別（依標籤值區分子指標）"""
+    
+    metric_type = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+    
+    @abstractmethod
+    def _new_child(self):
+        """建立單一標籤組合的子指標"""
+    
+    def labels(self, **labels: str):
+        """取得指定標籤值的子指標（建議在模組載入時取得並重複使用）"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+    
+    @abstractmethod
+    def _samples(self, key: Tuple[str, ...], child) -> List[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        """取得子指標的輸出樣本（名稱、標籤與數值）"""
+    
+    def render(self) -> List[str]:
+        """轉換為 Prometheus 文字格式"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}"
+        ]
+        for key, child in sorted(self._children.items()):
+            for name, labels, value in self._samples(key, child):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    """計數器的單一標籤組合"""
+    
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0
+    
+    def inc(self, amount: float = 1):
+        """增加計數"""
+        self.value += amount
+
+
+class Counter(_Metric):
+    """只會增加的計數器"""
+    
+    metric_type = "counter"
+    
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1):
+        """增加計數（沒有標籤的計數器）"""
+        self._default.inc(amount)
+    
+    def _samples(self, key, child):
+        return [(f"{self.name}_total", list(zip(self.labelnames, key)), child.value)]
+
+
+class _GaugeChild:
+    """量測值的單一標籤組合"""
+    
+    __slots__ = ("value", "function")
+    
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+    
+    def set(self, value: float):
+        """設定目前值"""
+        self.value = value
+    
+    def set_function(self, function: Callable[[], float]):
+        """改為在輸出時呼叫 function 取得目前值"""
+        self.function = function
+    
+    def get(self) -> float:
+        """取得目前值"""
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """可增可減的量測值"""
+    
+    metric_type = "gauge"
+    
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        """設定目前值（沒有標籤的量測值）"""
+        self._default.set(value)
+    
+    def set_function(self, function: Callable[[], float]):
+        """改為在輸出時呼叫 function 取得目前值（沒有標籤的量測值）"""
+        self._default.set_function(function)
+    
+    def _samples(self, key, child):
+        return [(self.name, list(zip(self.labelnames, key)), child.get())]
+
+
+class _HistogramChild:
+    """直方圖的單一標籤組合"""
+    
+    __slots__ = ("_bounds", "counts", "sum", "count")
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """記錄一次觀測值"""
+        self.counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def time(self) -> _Timer:
+        """以 with 區塊量測經過時間"""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    """依分桶統計分佈的直方圖"""
+    
+    metric_type = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        """記錄一次觀測值（沒有標籤的直方圖）"""
+        self._default.observe(value)
+    
+    def time(self) -> _Timer:
+        """以 with 區塊量測經過時間（沒有標籤的直方圖）"""
+        return self._default.time()
+    
+    def _samples(self, key, child):
+        labels = list(zip(self.labelnames, key))
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", labels + [("le", _format_value(bound))], cumulative))
+        samples.append((f"{self.name}_sum", labels, child.sum))
+        samples.append((f"{self.name}_count", labels, child.count))
+        return samples
+
+
+class MetricsRegistry:
+    """指標註冊表"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        """註冊指標（相同名稱回傳已註冊的指標）"""
+        return self._metrics.setdefault(metric.name, metric)
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """建立或取得計數器"""
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """建立或取得量測值"""
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """建立或取得直方圖"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        """輸出所有指標的 Prometheus 文字格式"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全域指標註冊表
+registry = MetricsRegistry()
+
+# Webhook 到回覆之間各階段的耗時
+STAGE_DURATION = registry.histogram(
+    "linebot_stage_duration_seconds",
+    "Webhook 到回覆之間各處理階段的耗時",
+    labelnames=("stage",)
+)
+SIGNATURE_VERIFICATION_DURATION = STAGE_DURATION.labels(stage="signature_verification")
+EVENT_PARSING_DURATION = STAGE_DURATION.labels(stage="event_parsing")
+QUEUE_WAIT_DURATION = STAGE_DURATION.labels(stage="queue_wait")
+MESSAGE_RENDERING_DURATION = STAGE_DURATION.labels(stage="message_rendering")
+REPLY_MESSAGE_DURATION = STAGE_DURATION.labels(stage="reply_message")
+
+# Notion API 各操作的單次請求耗時（不含速率限制等待）
+NOTION_REQUEST_DURATION = registry.histogram(
+    "linebot_notion_request_duration_seconds",
+    "Notion API 單次請求耗時",
+    labelnames=("operation",)
+)
+
+NOTION_ERRORS = registry.counter(
+    "linebot_notion_errors",
+    "Notion API 錯誤次數",
+    labelnames=("code",)
+)
+NOTION_RATE_LIMITED = registry.counter(
+    "linebot_notion_rate_limited",
+    "Notion API 回應 429 的次數"
+)
+
+CACHE_REQUESTS = registry.counter(
+    "linebot_cache_requests",
+    "快取查詢次數",
+    labelnames=("cache", "result")
+)
+SEARCH_CACHE_HITS = CACHE_REQUESTS.labels(cache="search", result="hit")
+SEARCH_CACHE_MISSES = CACHE_REQUESTS.labels(cache="search", result="miss")
+CONTENT_CACHE_HITS = CACHE_REQUESTS.labels(cache="page_content", result="hit")
+CONTENT_CACHE_MISSES = CACHE_REQUESTS.labels(cache="page_content", result="miss")
+
+EVENT_QUEUE_DEPTH = registry.gauge(
+    "linebot_event_queue_depth",
+    "事件佇列中等待處理的事件數"
+)
@@ -0,0 +1,138 @@
+"""
+請求效能分析工具模組
+"""
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Deque, Dict, List, Optional, Tuple
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    # 未安裝 pyinstrument 時改用標準函式庫的 cProfile
+    SamplingProfiler = None
+
+
+@dataclass
+class ProfileRecord:
+    """單次事件處理的效能分析結果"""
+    profile_id: int
+    label: str
+    engine: str
+    duration: float
+    content: str
+    media_type: str
+    created_at: float = field(default_factory=time.time)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    def summary(self) -> Dict[str, Any]:
+        """取得不含分析內容的摘要"""
+        return {
+            "id": self.profile_id,
+            "label": self.label,
+            "engine": self.engine,
+            "duration": self.duration,
+            "created_at": self.created_at,
+            "size": len(self.content),
+            **self.metadata
+        }
+
+
+class RequestProfiler:
+    """以效能分析器包裝單次事件處理，保留最近 max_profiles 份結果"""
+    
+    def __init__(self, max_profiles: int = 20, sample_rate: float = 0.0, interval: float = 0.001,
+                 use_pyinstrument: bool = True):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.engine = "pyinstrument" if use_pyinstrument and SamplingProfiler is not None else "cprofile"
+        self._profiles: Deque[ProfileRecord] = deque(maxlen=max(1, max_profiles))
+        self._ids = itertools.count(1)
+        self._active = False
+        self.profiled = 0
+        self.skipped_busy = 0
+    
+    def should_profile(self, requested: bool = False) -> bool:
+        """依請求標頭或取樣率決定是否分析此事件"""
+        if requested:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+    
+    async def run(self, awaitable: Awaitable[Any], label: str, **metadata) -> Any:
+        """分析 awaitable 的執行並保存結果（同一時間只分析一個事件，其餘直接執行）"""
+        # cProfile 同一執行緒只能有一個分析器，且並行分析會互相干擾
+        if self._active:
+            self.skipped_busy += 1
+            return await awaitable
+        
+        self._active = True
+        started_at = time.perf_counter()
+        profiler = self._start()
+        try:
+            return await awaitable
+        finally:
+            duration = time.perf_counter() - started_at
+            try:
+                content, media_type = self._stop(profiler)
+            finally:
+                self._active = False
+            self._profiles.append(ProfileRecord(
+                profile_id=next(self._ids),
+                label=label,
+                engine=self.engine,
+                duration=duration,
+                content=content,
+                media_type=media_type,
+                metadata=metadata
+            ))
+            self.profiled += 1
+    
+    def _start(self):
+        """啟動效能分析器"""
+        if self.engine == "pyinstrument":
+            # async_mode 只統計目前任務（包含 await 等待時間），不混入其他並行事件
+            profiler = SamplingProfiler(interval=self.interval, async_mode="enabled")
+            profiler.start()
+        else:
+            # cProfile 會一併記錄同一事件迴圈上其他任務的函式呼叫
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    
+    def _stop(self, profiler) -> Tuple[str, str]:
+        """停止效能分析器並轉換為可下載的內容"""
+        if self.engine == "pyinstrument":
+            profiler.stop()
+            return profiler.output_html(), "text/html"
+        
+        profiler.disable()
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(60)
+        return stream.getvalue(), "text/plain"
+    
+    def get(self, profile_id: int) -> Optional[ProfileRecord]:
+        """依 ID 取得保存的分析結果"""
+        for record in self._profiles:
+            if record.profile_id == profile_id:
+                return record
+        return None
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """列出保存的分析結果摘要（最新的在前）"""
+        return [record.summary() for record in reversed(self._profiles)]
+    
+    def stats(self) -> Dict[str, Any]:
+        """取得統計資訊"""
+        return {
+            "engine": self.engine,
+            "sample_rate": self.sample_rate,
+            "stored": len(self._profiles),
+            "capacity": self._profiles.maxlen,
+            "profiled": self.profiled,
+            "skipped_busy": self.skipped_busy
+        }
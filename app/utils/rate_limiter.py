@@ -0,0 +1,131 @@
+"""
+具優先等級的速率限制工具模組
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """請求優先等級（數值越小越優先）"""
+    INTERACTIVE = 0
+    HYDRATION = 1
+    HEALTH_CHECK = 2
+    BACKGROUND = 3
+
+
+class PriorityRateLimiter:
+    """依優先等級分配 token 的 token bucket 速率限制器"""
+    
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.capacity)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.pauses = 0
+    
+    @property
+    def queue_depth(self) -> int:
+        """等待中的請求數"""
+        return sum(1 for _, _, future in self._waiters if not future.done())
+    
+    def queue_depth_by_priority(self) -> Dict[str, int]:
+        """各優先等級等待中的請求數"""
+        depth = {priority.name.lower(): 0 for priority in Priority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[Priority(priority).name.lower()] += 1
+        return depth
+    
+    def _refill(self, now: float):
+        """依經過時間補充 token"""
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+    
+    def try_acquire(self) -> bool:
+        """不等待地嘗試取得 token（有其他請求在等待時一律失敗）"""
+        now = self._clock()
+        self._refill(now)
+        if self.queue_depth or now < self._paused_until or self._tokens < 1:
+            return False
+        
+        self._tokens -= 1
+        self.granted += 1
+        return True
+    
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        """取得 token（依優先等級排隊等待）"""
+        if self.try_acquire():
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        self._dispatch()
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            # token 已分配但等待者被取消時歸還 token
+            if future.done() and not future.cancelled():
+                self._tokens = min(self.capacity, self._tokens + 1)
+                self.granted -= 1
+                self._dispatch()
+            raise
+    
+    def pause(self, seconds: float):
+        """暫停分配 token（例如收到 429 的 Retry-After）"""
+        now = self._clock()
+        self._refill(now)
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, now + seconds)
+        self.pauses += 1
+        self._dispatch()
+    
+    def _dispatch(self):
+        """依優先等級分配 token，並排程下次分配"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        now = self._clock()
+        self._refill(now)
+        
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if now < self._paused_until or self._tokens < 1:
+                break
+            heapq.heappop(self._waiters)
+            self._tokens -= 1
+            self.granted += 1
+            future.set_result(None)
+        
+        if self._waiters:
+            delay = max(self._paused_until - now, (1 - self._tokens) / self.rate, 0.0)
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(delay, self._dispatch)
+    
+    def stats(self) -> Dict[str, object]:
+        """取得統計資訊"""
+        return {
+            "rate": self.rate,
+            "burst": self.capacity,
+            "queue_depth": self.queue_depth,
+            "queue_depth_by_priority": self.queue_depth_by_priority(),
+            "granted": self.granted,
+            "pauses": self.pauses,
+            "paused_for": max(0.0, self._paused_until - self._clock())
+        }
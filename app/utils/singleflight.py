@@ -0,0 +1,50 @@
+"""
+並行請求合併（single-flight）工具模組
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """讓相同鍵的並行非同步呼叫共用同一次執行結果"""
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+    
+    def __len__(self) -> int:
+        return len(self._inflight)
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """執行 func；若相同鍵已有進行中的呼叫，則等待並共用其結果"""
+        future = self._inflight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._on_done(key, done))
+        else:
+            self.shared += 1
+        
+        # 單一呼叫者被取消時不影響其他共用結果的呼叫者
+        return await asyncio.shield(future)
+    
+    def _on_done(self, key: Hashable, future: asyncio.Future):
+        """呼叫完成後移除進行中紀錄"""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        
+        # 取得例外以避免所有呼叫者皆已取消時產生「例外未被取得」警告
+        if not future.cancelled():
+            future.exception()
+    
+    def stats(self) -> Dict[str, int]:
+        """取得統計資訊"""
+        return {
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "shared": self.shared
+        }
@@ -0,0 +1,31 @@
+"""
+文字正規化工具模組
+"""
+import re
+import unicodedata
+from typing import Set
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """正規化文字（全形轉半形、大小寫折疊、合併空白）"""
+    if not text:
+        return ""
+    
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def char_ngrams(text: str) -> Set[str]:
+    """產生字元 unigram 與 bigram（適用於中英文混合的子字串搜尋）"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_ngrams(query: str) -> Set[str]:
+    """產生查詢用的 n-gram（長度大於 1 時僅使用 bigram）"""
+    if len(query) < 2:
+        return set(query)
+    return {query[i:i + 2] for i in range(len(query) - 1)}
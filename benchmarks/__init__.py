@@ -0,0 +1,3 @@
+"""
+純 Python 熱路徑的微基準測試（python -m benchmarks）
+"""
@@ -0,0 +1,125 @@
+"""
+執行熱路徑微基準測試並與本機記錄的 baseline.json 比較
+
+基準為絕對時間，只在同一台機器上有意義，因此不納入版本控制；尚未記錄基準時只輸出結果。
+每次執行先量測固定的純 Python 校準迴圈，比較時依校準時間換算基準，降低機器負載變化的影響。
+
+用法：
+    python -m benchmarks --update-baseline     # 修改前在本機記錄基準
+    python -m benchmarks                       # 修改後與基準比較，退步超過門檻時結束碼為 1
+    python -m benchmarks --filter verify --threshold 0.3
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Dict
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def measure(func, repeat: int, min_time: float) -> float:
+    """量測單次呼叫耗時（微秒），取多次重複中的最小值以降低雜訊"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    # autorange 至少執行 0.2 秒，依 min_time 調整每輪次數
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def _calibration_loop():
+    """校準用的固定工作量（字串、字典與串列操作，與熱路徑相近）"""
+    items = {}
+    for index in range(200):
+        key = f"key-{index}"
+        items[key] = key.upper().split("-")
+    return sorted(items)
+
+
+def calibrate(repeat: int, min_time: float) -> float:
+    """量測校準迴圈的單次耗時（微秒）"""
+    return measure(_calibration_loop, repeat, min_time)
+
+
+def main(argv=None) -> int:
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="熱路徑微基準測試")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基準 JSON 路徑")
+    parser.add_argument("--threshold", type=float, default=0.25, help="視為退步的相對變化（預設 25%%）")
+    parser.add_argument("--repeat", type=int, default=5, help="每個案例的重複輪數")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每輪的最短量測秒數")
+    parser.add_argument("--filter", default="", help="只執行名稱包含此字串的案例")
+    parser.add_argument("--update-baseline", action="store_true", help="以本次結果更新基準")
+    parser.add_argument("--output", help="結果 JSON 的輸出路徑")
+    args = parser.parse_args(argv)
+    
+    from .hot_paths import build_benchmarks, quiet_app_loggers
+    
+    baseline: Dict[str, float] = {}
+    baseline_calibration = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline_data = json.load(baseline_file)
+        baseline = baseline_data["results"]
+        baseline_calibration = baseline_data.get("calibration")
+    
+    if not baseline and not args.update_baseline:
+        print(f"尚未記錄基準（{args.baseline}），只輸出結果；請先執行 python -m benchmarks --update-baseline")
+    
+    calibration = calibrate(args.repeat, args.min_time)
+    # 基準依本機與記錄基準的機器的速度比例換算（沒有校準值的舊基準直接比較）
+    scale = calibration / baseline_calibration if baseline_calibration else 1.0
+    print(f"{'calibration':<45} {calibration:>10.2f} us  {scale:>7.2f}x")
+    
+    results: Dict[str, float] = {}
+    regressions = []
+    with quiet_app_loggers():
+        benchmarks = build_benchmarks()
+        for name, func in benchmarks:
+            if args.filter not in name:
+                continue
+            results[name] = measure(func, args.repeat, args.min_time)
+    
+    for name, result in results.items():
+        previous = baseline.get(name)
+        expected = previous * scale if previous else None
+        change = (result - expected) / expected if expected else None
+        regressed = change is not None and change > args.threshold
+        if regressed:
+            regressions.append(name)
+        
+        change_text = f"{change:+.1%}" if change is not None else "new"
+        print(f"{name:<45} {result:>10.2f} us  {change_text:>8}{'  REGRESSION' if regressed else ''}")
+    
+    report = {
+        "unit": "us",
+        "threshold": args.threshold,
+        "calibration": calibration,
+        "results": results,
+        "regressions": regressions
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, ensure_ascii=False, indent=2)
+            output_file.write("\n")
+    
+    if args.update_baseline:
+        # 合併的舊結果先換算到本次的校準時間，整份基準使用同一個校準值
+        merged = {name: value * scale for name, value in baseline.items()}
+        merged.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump({"unit": "us", "calibration": calibration, "results": merged}, baseline_file,
+                      ensure_ascii=False, indent=2)
+            baseline_file.write("\n")
+        print(f"已更新基準：{args.baseline}")
+        return 0
+    
+    if regressions:
+        print(f"{len(regressions)} 個案例退步超過 {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
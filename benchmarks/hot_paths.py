@@ -0,0 +1,102 @@
+"""
+熱路徑基準測試案例
+
+使用接近實際大小的請求體與 Notion 物件：單一事件與 10 個事件的 Webhook 請求、
+loadtest 合成資料集中的頁面與區塊、5 筆含內容與標籤的搜尋結果。
+"""
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# 匯入 app 前提供必要設定（基準測試不連線到任何外部服務）
+for _name in ("LINE_CHANNEL_ACCESS_TOKEN", "LINE_CHANNEL_SECRET", "NOTION_API_TOKEN",
+              "NOTION_DATABASE_ID", "GCP_PROJECT_ID"):
+    os.environ.setdefault(_name, "benchmark")
+
+from app.models.line_models import SearchResponse, SearchResult  # noqa: E402
+from app.services.line_service import LineService  # noqa: E402
+from app.services.notion_service import NotionService  # noqa: E402
+from loadtest.dataset import SyntheticDataset  # noqa: E402
+from loadtest.webhook_bench import build_webhook_body, sign_body  # noqa: E402
+
+Benchmark = Tuple[str, Callable[[], object]]
+
+
+@contextmanager
+def quiet_app_loggers() -> Iterator[None]:
+    """暫時關閉 app 的 INFO/DEBUG 日誌，只量測函式本身（停用等級的日誌呼叫只剩等級檢查），結束後還原等級"""
+    loggers = [
+        logging.getLogger(name) for name in list(logging.root.manager.loggerDict)
+        if name.startswith("app.")
+    ]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.setLevel(level)
+
+
+def _webhook_body(events: int) -> bytes:
+    """建立含 events 個文字訊息事件的 Webhook 請求體"""
+    bodies = [
+        json.loads(build_webhook_body(f"U{index:032d}", f"{index:032x}", "搜尋 API 設計", 1700000000000 + index))
+        for index in range(events)
+    ]
+    payload = {"destination": bodies[0]["destination"], "events": [body["events"][0] for body in bodies]}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _search_response(service: NotionService, dataset: SyntheticDataset) -> SearchResponse:
+    """建立 5 筆含 200 字內容與標籤的搜尋結果"""
+    results = []
+    for page in dataset.pages[:5]:
+        content = " ".join(
+            service._extract_block_text(block) for block in dataset.blocks(page["id"])
+        )[:200]
+        results.append(service._build_search_result(page, content))
+    return SearchResponse(query="API 設計", results=results, total_count=len(results))
+
+
+def build_benchmarks() -> List[Benchmark]:
+    """建立所有基準測試案例"""
+    line_service = LineService()
+    notion_service = NotionService()
+    
+    secret = line_service.settings.line_channel_secret
+    single_body = _webhook_body(1)
+    batch_body = _webhook_body(10)
+    single_signature = sign_body(single_body, secret)
+    batch_signature = sign_body(batch_body, secret)
+    single_json = json.loads(single_body)
+    batch_json = json.loads(batch_body)
+    
+    dataset = SyntheticDataset("benchmark", pages=20, blocks_per_page=8, block_text_length=120)
+    page = dataset.pages[3]
+    blocks = dataset.blocks(page["id"])
+    response = _search_response(notion_service, dataset)
+    
+    benchmarks: Dict[str, Callable[[], object]] = {
+        "verify_signature[1 event]": lambda: line_service.verify_signature(single_body, single_signature),
+        "verify_signature[10 events]": lambda: line_service.verify_signature(batch_body, batch_signature),
+        "parse_webhook_body[1 event]": lambda: line_service.parse_webhook_body(single_json),
+        "parse_webhook_body[10 events]": lambda: line_service.parse_webhook_body(batch_json),
+        "parse_webhook_bytes[1 event]": lambda: line_service.parse_webhook_bytes(single_body),
+        "parse_webhook_bytes[10 events]": lambda: line_service.parse_webhook_bytes(batch_body),
+        "extract_search_query[prefixed]": lambda: line_service.extract_search_query("搜尋 API 設計"),
+        "extract_search_query[plain]": lambda: line_service.extract_search_query("Python 非同步 教學"),
+        "notion._extract_title": lambda: notion_service._extract_title(page),
+        "notion._extract_tags": lambda: notion_service._extract_tags(page),
+        "notion._extract_block_text[8 blocks]": lambda: [notion_service._extract_block_text(block) for block in blocks],
+        "notion._build_search_result": lambda: notion_service._build_search_result(page, "內容" * 100),
+        "SearchResponse.to_line_messages[5 results]": response.to_line_messages,
+        "SearchResponse[5 results]": lambda: SearchResponse(
+            query="API 設計", results=[SearchResult(**result.model_dump()) for result in response.results],
+            total_count=5
+        )
+    }
+    return list(benchmarks.items())
@@ -0,0 +1,16 @@
+"""
+負載測試用的模擬上游伺服器（Notion API 與 LINE Messaging API）
+"""
+from .dataset import SyntheticDataset
+from .faults import FaultProfile, FaultInjector
+from .fake_notion import create_notion_app
+from .fake_line import LineReceipts, create_line_app
+
+__all__ = [
+    "SyntheticDataset",
+    "FaultProfile",
+    "FaultInjector",
+    "create_notion_app",
+    "LineReceipts",
+    "create_line_app"
+]
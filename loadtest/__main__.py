@@ -0,0 +1,143 @@
+"""
+啟動模擬上游伺服器與執行 Webhook 負載測試
+
+用法：
+    python -m loadtest notion --port 9001 --pages 5000 --latency-median 0.2 --rate-limit-rate 0.02
+    python -m loadtest line --port 9002 --latency-median 0.05
+
+應用程式端設定 NOTION_BASE_URL=http://127.0.0.1:9001 與 LINE_API_ENDPOINT=http://127.0.0.1:9002，再執行：
+    python -m loadtest webhook --events 1000 --arrival-rate 50 --output report.json --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import uvicorn
+from .dataset import SyntheticDataset
+from .faults import FaultProfile, FaultInjector
+from .fake_notion import create_notion_app
+from .fake_line import create_line_app
+from .webhook_bench import BenchmarkConfig, WebhookBenchmark, compare_to_baseline
+
+
+def _add_fault_arguments(parser: argparse.ArgumentParser, latency_median: float):
+    """加入延遲與錯誤注入參數"""
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency-median", type=float, default=latency_median, help="延遲中位數（秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="對數常態分佈的 sigma（0 為固定延遲）")
+    parser.add_argument("--latency-max", type=float, default=5.0, help="延遲上限（秒）")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="隨機回應 429 的比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="隨機回應 5xx 的比例")
+    parser.add_argument("--requests-per-second", type=float, default=0.0, help="每秒請求數上限（0 為不限制）")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 回應的 Retry-After（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="錯誤注入的亂數種子")
+
+
+def _fault_injector(args: argparse.Namespace) -> FaultInjector:
+    """依參數建立錯誤注入器"""
+    profile = FaultProfile(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        latency_max=args.latency_max,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        requests_per_second=args.requests_per_second,
+        retry_after=args.retry_after
+    )
+    return FaultInjector(profile, seed=args.seed)
+
+
+def _add_webhook_arguments(parser: argparse.ArgumentParser):
+    """加入 Webhook 負載測試參數"""
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook", help="受測應用程式的 Webhook URL")
+    parser.add_argument("--line-url", default="http://127.0.0.1:9002", help="模擬 LINE 伺服器的 URL")
+    parser.add_argument("--channel-secret", default=os.environ.get("LINE_CHANNEL_SECRET", ""),
+                        help="簽名用的 channel secret（預設讀取 LINE_CHANNEL_SECRET）")
+    parser.add_argument("--events", type=int, default=500, help="送出的事件數")
+    parser.add_argument("--concurrency", type=int, default=50, help="同時進行中的 Webhook 請求上限")
+    parser.add_argument("--arrival-rate", type=float, default=50.0, help="每秒到達的事件數（0 為依並行上限連續送出）")
+    parser.add_argument("--users", type=int, default=0, help="模擬的用戶數（0 為每個事件不同用戶）")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="送出後等待回覆的秒數")
+    parser.add_argument("--seed", type=int, default=1, help="事件內容的亂數種子")
+    parser.add_argument("--output", help="報告 JSON 的輸出路徑（預設輸出到 stdout）")
+    parser.add_argument("--baseline", help="比較用的基準報告 JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="視為退步的相對變化（預設 10%%）")
+
+
+def _run_webhook_benchmark(args: argparse.Namespace) -> int:
+    """執行 Webhook 負載測試，有退步時回傳 1"""
+    if not args.channel_secret:
+        print("需要 --channel-secret 或 LINE_CHANNEL_SECRET", file=sys.stderr)
+        return 2
+    
+    config = BenchmarkConfig(
+        webhook_url=args.url,
+        line_receipts_url=f"{args.line_url.rstrip('/')}/_loadtest/receipts",
+        channel_secret=args.channel_secret,
+        events=args.events,
+        concurrency=args.concurrency,
+        arrival_rate=args.arrival_rate,
+        users=args.users,
+        drain_timeout=args.drain_timeout,
+        seed=args.seed
+    )
+    report = asyncio.run(WebhookBenchmark(config).run())
+    
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        report["regressions"] = compare_to_baseline(report, baseline, args.threshold)
+        exit_code = 1 if report["regressions"] else 0
+    
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+    return exit_code
+
+
+def main(argv=None):
+    """命令列進入點"""
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="負載測試用的模擬上游伺服器")
+    subparsers = parser.add_subparsers(dest="server", required=True)
+    
+    notion_parser = subparsers.add_parser("notion", help="模擬 Notion API")
+    _add_fault_arguments(notion_parser, latency_median=0.15)
+    notion_parser.add_argument("--database-id", default="loadtest-database", help="需與 NOTION_DATABASE_ID 相同")
+    notion_parser.add_argument("--pages", type=int, default=1000, help="合成頁面數")
+    notion_parser.add_argument("--blocks-per-page", type=int, default=8, help="每頁區塊數")
+    notion_parser.add_argument("--block-text-length", type=int, default=120, help="每個區塊的文字長度")
+    notion_parser.add_argument("--dataset-seed", type=int, default=42, help="合成資料的亂數種子")
+    
+    line_parser = subparsers.add_parser("line", help="模擬 LINE Messaging API")
+    _add_fault_arguments(line_parser, latency_median=0.03)
+    
+    webhook_parser = subparsers.add_parser("webhook", help="對 /webhook 進行端對端負載測試")
+    _add_webhook_arguments(webhook_parser)
+    
+    args = parser.parse_args(argv)
+    if args.server == "webhook":
+        return _run_webhook_benchmark(args)
+    if args.server == "notion":
+        dataset = SyntheticDataset(
+            args.database_id,
+            pages=args.pages,
+            blocks_per_page=args.blocks_per_page,
+            block_text_length=args.block_text_length,
+            seed=args.dataset_seed
+        )
+        app = create_notion_app(dataset, _fault_injector(args))
+    else:
+        app = create_line_app(_fault_injector(args))
+    
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
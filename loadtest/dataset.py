@@ -0,0 +1,125 @@
+"""
+模擬 Notion 資料庫的合成資料模組
+"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+# 標題與標籤使用的詞彙（中英混合，接近實際知識庫內容）
+TOPICS = [
+    "Python", "FastAPI", "API 設計", "Notion", "Line Bot", "資料庫", "快取", "部署",
+    "Docker", "Kubernetes", "監控", "日誌", "測試", "效能調校", "非同步", "安全性",
+    "GCP", "Cloud Run", "CI/CD", "Git", "SQL", "Redis", "訊息佇列", "架構"
+]
+SUFFIXES = ["入門", "實戰筆記", "常見問題", "最佳實踐", "教學", "疑難排解", "設計原則", "檢查清單"]
+TAGS = ["backend", "frontend", "infra", "教學", "筆記", "FAQ", "draft", "重要"]
+BLOCK_TYPES = ["paragraph", "paragraph", "paragraph", "heading_2", "bulleted_list_item", "numbered_list_item"]
+
+
+def _rich_text(text: str) -> List[Dict[str, Any]]:
+    """建立 Notion rich_text 陣列"""
+    return [{
+        "type": "text",
+        "text": {"content": text, "link": None},
+        "annotations": {
+            "bold": False, "italic": False, "strikethrough": False,
+            "underline": False, "code": False, "color": "default"
+        },
+        "plain_text": text,
+        "href": None
+    }]
+
+
+def _timestamp(value: datetime) -> str:
+    """轉換為 Notion 的時間格式"""
+    return value.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class SyntheticDataset:
+    """以固定亂數種子產生的模擬 Notion 頁面與區塊"""
+    
+    def __init__(self, database_id: str, pages: int = 1000, blocks_per_page: int = 8,
+                 block_text_length: int = 120, seed: int = 42):
+        self.database_id = database_id
+        self.blocks_per_page = blocks_per_page
+        self.block_text_length = block_text_length
+        self.seed = seed
+        self.pages = [self._build_page(index) for index in range(pages)]
+        self._pages_by_id = {page["id"]: index for index, page in enumerate(self.pages)}
+    
+    def _build_page(self, index: int) -> Dict[str, Any]:
+        """建立單一頁面"""
+        rng = random.Random(self.seed * 1_000_003 + index)
+        page_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        created = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=rng.randint(0, 500_000))
+        edited = created + timedelta(minutes=rng.randint(0, 100_000))
+        title = f"{rng.choice(TOPICS)} {rng.choice(SUFFIXES)} #{index}"
+        tags = rng.sample(TAGS, rng.randint(0, 3))
+        
+        return {
+            "object": "page",
+            "id": page_id,
+            "created_time": _timestamp(created),
+            "last_edited_time": _timestamp(edited),
+            "archived": False,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+            "parent": {"type": "database_id", "database_id": self.database_id},
+            "properties": {
+                "Name": {"id": "title", "type": "title", "title": _rich_text(title)},
+                "Tags": {
+                    "id": "tags",
+                    "type": "multi_select",
+                    "multi_select": [{"id": tag, "name": tag, "color": "default"} for tag in tags]
+                },
+                "Last edited time": {
+                    "id": "edited",
+                    "type": "last_edited_time",
+                    "last_edited_time": _timestamp(edited)
+                }
+            }
+        }
+    
+    def has_page(self, page_id: str) -> bool:
+        """是否存在指定頁面"""
+        return page_id in self._pages_by_id
+    
+    def blocks(self, page_id: str) -> List[Dict[str, Any]]:
+        """產生指定頁面的區塊（每次呼叫結果相同，不常駐記憶體）"""
+        index = self._pages_by_id[page_id]
+        rng = random.Random(self.seed * 7_000_003 + index)
+        title = self.pages[index]["properties"]["Name"]["title"][0]["plain_text"]
+        blocks = []
+        for position in range(self.blocks_per_page):
+            block_type = rng.choice(BLOCK_TYPES)
+            words = []
+            length = 0
+            while length < self.block_text_length:
+                word = rng.choice(TOPICS + SUFFIXES)
+                words.append(word)
+                length += len(word) + 1
+            text = f"{title}：" + " ".join(words) if position == 0 else " ".join(words)
+            blocks.append({
+                "object": "block",
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "type": block_type,
+                "has_children": False,
+                "archived": False,
+                block_type: {"rich_text": _rich_text(text), "color": "default"}
+            })
+        return blocks
+    
+    def database(self) -> Dict[str, Any]:
+        """資料庫資訊"""
+        return {
+            "object": "database",
+            "id": self.database_id,
+            "title": _rich_text("Load Test Knowledge Base"),
+            "properties": {
+                "Name": {"id": "title", "name": "Name", "type": "title", "title": {}},
+                "Tags": {"id": "tags", "name": "Tags", "type": "multi_select", "multi_select": {"options": []}},
+                "Last edited time": {
+                    "id": "edited", "name": "Last edited time", "type": "last_edited_time", "last_edited_time": {}
+                }
+            }
+        }
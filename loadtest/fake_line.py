@@ -0,0 +1,98 @@
+"""
+模擬 LINE Messaging API 伺服器
+"""
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from .faults import FaultInjector
+
+# 保留的收件紀錄上限
+MAX_RECEIPTS = 100_000
+
+
+class LineReceipts:
+    """模擬伺服器收到的 reply / push 紀錄（供基準測試計算回覆時間）"""
+    
+    def __init__(self, maxlen: int = MAX_RECEIPTS):
+        self.receipts: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self._used_reply_tokens = set()
+    
+    def use_reply_token(self, reply_token: str) -> bool:
+        """標記 reply token 已使用，重複使用時回傳 False"""
+        if reply_token in self._used_reply_tokens:
+            return False
+        self._used_reply_tokens.add(reply_token)
+        return True
+    
+    def record(self, kind: str, target: str, messages: int):
+        """記錄一次收到的訊息"""
+        self.receipts.append({
+            "kind": kind,
+            "target": target,
+            "messages": messages,
+            "received_at": time.time()
+        })
+    
+    def clear(self):
+        """清除所有紀錄"""
+        self.receipts.clear()
+        self._used_reply_tokens.clear()
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    """LINE 格式的錯誤回應"""
+    return JSONResponse(status_code=status, content={"message": message})
+
+
+def create_line_app(faults: FaultInjector, receipts: Optional[LineReceipts] = None) -> FastAPI:
+    """建立模擬 LINE Messaging API 的應用程式"""
+    app = FastAPI(title="Fake LINE Messaging API")
+    app.state.receipts = receipts or LineReceipts()
+    
+    async def _accept(request: Request, kind: str, target_field: str):
+        """套用錯誤注入並記錄收到的訊息"""
+        if not request.headers.get("authorization"):
+            return _error(401, "Authentication failed")
+        
+        fault = await faults.apply()
+        if fault == "rate_limited":
+            return _error(429, "The API rate limit has been exceeded. Try again later.")
+        if fault == "error":
+            return _error(500, "An error occurred on the API server")
+        
+        body = await request.json()
+        target = body.get(target_field, "")
+        messages = body.get("messages", [])
+        if not target or not 1 <= len(messages) <= 5:
+            return _error(400, "The request body has 1 error(s)")
+        if kind == "reply" and not app.state.receipts.use_reply_token(target):
+            return _error(400, "Invalid reply token")
+        
+        app.state.receipts.record(kind, target, len(messages))
+        return JSONResponse({}, headers={"X-Line-Request-Id": f"loadtest-{faults.requests}"})
+    
+    @app.post("/v2/bot/message/reply")
+    async def reply(request: Request):
+        """reply_message"""
+        return await _accept(request, "reply", "replyToken")
+    
+    @app.post("/v2/bot/message/push")
+    async def push(request: Request):
+        """push_message"""
+        return await _accept(request, "push", "to")
+    
+    @app.get("/_loadtest/receipts")
+    async def list_receipts(since: float = 0.0):
+        """取得 since（epoch 秒）之後收到的訊息紀錄"""
+        receipts = [receipt for receipt in app.state.receipts.receipts if receipt["received_at"] >= since]
+        return {"receipts": receipts, **faults.stats()}
+    
+    @app.delete("/_loadtest/receipts")
+    async def clear_receipts():
+        """清除訊息紀錄"""
+        app.state.receipts.clear()
+        return {"status": "ok"}
+    
+    return app
@@ -0,0 +1,152 @@
+"""
+模擬 Notion API 伺服器
+"""
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.requests import ClientDisconnect
+from .dataset import SyntheticDataset
+from .faults import FaultInjector
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 100
+
+
+def _error(status: int, code: str, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """Notion 格式的錯誤回應"""
+    return JSONResponse(
+        status_code=status,
+        content={"object": "error", "status": status, "code": code, "message": message},
+        headers=headers
+    )
+
+
+def _paginate(items: List[Dict[str, Any]], start_cursor: Optional[str], page_size: Optional[int],
+              result_type: str) -> Dict[str, Any]:
+    """依 start_cursor 與 page_size 分頁（cursor 為下一筆的位置）"""
+    offset = int(start_cursor) if start_cursor else 0
+    size = min(MAX_PAGE_SIZE, int(page_size or DEFAULT_PAGE_SIZE))
+    page = items[offset:offset + size]
+    has_more = offset + size < len(items)
+    return {
+        "object": "list",
+        "results": page,
+        "next_cursor": str(offset + size) if has_more else None,
+        "has_more": has_more,
+        "type": result_type,
+        result_type: {}
+    }
+
+
+def _plain_text(prop: Dict[str, Any]) -> str:
+    """取得 title 屬性的純文字"""
+    return "".join(text.get("plain_text", "") for text in prop.get("title", []))
+
+
+def _matches(page: Dict[str, Any], condition: Optional[Dict[str, Any]]) -> bool:
+    """評估 databases.query 的篩選條件（僅支援 NotionService 與同步服務使用的條件）"""
+    if not condition:
+        return True
+    if "or" in condition:
+        return any(_matches(page, sub) for sub in condition["or"])
+    if "and" in condition:
+        return all(_matches(page, sub) for sub in condition["and"])
+    
+    if condition.get("timestamp") == "last_edited_time":
+        on_or_after = condition.get("last_edited_time", {}).get("on_or_after")
+        return on_or_after is None or page["last_edited_time"] >= on_or_after
+    
+    prop = page["properties"].get(condition.get("property"))
+    if prop is None:
+        return False
+    if "title" in condition:
+        needle = condition["title"].get("contains", "").lower()
+        return needle in _plain_text(prop).lower()
+    if "multi_select" in condition:
+        needle = condition["multi_select"].get("contains", "")
+        return any(option["name"] == needle for option in prop.get("multi_select", []))
+    return True
+
+
+def _sort(pages: List[Dict[str, Any]], sorts: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """依 last_edited_time 排序（其他排序條件忽略）"""
+    for sort in reversed(sorts or []):
+        if sort.get("timestamp") == "last_edited_time" or sort.get("property") == "Last edited time":
+            pages = sorted(pages, key=lambda page: page["last_edited_time"],
+                           reverse=sort.get("direction") == "descending")
+    return pages
+
+
+def create_notion_app(dataset: SyntheticDataset, faults: FaultInjector) -> FastAPI:
+    """建立模擬 Notion API 的應用程式"""
+    app = FastAPI(title="Fake Notion API")
+    
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        """套用延遲、429 與錯誤注入（管理端點除外）"""
+        if request.url.path.startswith("/_loadtest"):
+            return await call_next(request)
+        if not request.headers.get("authorization"):
+            return _error(401, "unauthorized", "API token is invalid.")
+        
+        fault = await faults.apply()
+        if fault == "rate_limited":
+            return _error(
+                429, "rate_limited", "You have been rate limited. Please try again in a few minutes.",
+                headers={"Retry-After": str(faults.profile.retry_after)}
+            )
+        if fault == "error":
+            return _error(503, "service_unavailable", "Notion is unavailable, please try again later.")
+        
+        try:
+            return await call_next(request)
+        except ClientDisconnect:
+            # 客戶端因期限或對沖請求取消而中斷連線
+            return Response(status_code=499)
+    
+    @app.get("/v1/databases/{database_id}")
+    async def retrieve_database(database_id: str):
+        """databases.retrieve"""
+        if database_id.replace("-", "") != dataset.database_id.replace("-", ""):
+            return _error(404, "object_not_found", f"Could not find database with ID: {database_id}.")
+        return dataset.database()
+    
+    @app.post("/v1/databases/{database_id}/query")
+    async def query_database(database_id: str, request: Request):
+        """databases.query"""
+        if database_id.replace("-", "") != dataset.database_id.replace("-", ""):
+            return _error(404, "object_not_found", f"Could not find database with ID: {database_id}.")
+        
+        body = await request.json()
+        pages = [page for page in dataset.pages if _matches(page, body.get("filter"))]
+        return _paginate(_sort(pages, body.get("sorts")), body.get("start_cursor"), body.get("page_size"),
+                         "page_or_database")
+    
+    @app.post("/v1/search")
+    async def search(request: Request):
+        """search（以標題比對查詢字串）"""
+        body = await request.json()
+        query = (body.get("query") or "").lower()
+        pages = [
+            page for page in dataset.pages
+            if query in _plain_text(page["properties"]["Name"]).lower()
+        ]
+        sort = body.get("sort")
+        if sort:
+            pages = _sort(pages, [sort])
+        return _paginate(pages, body.get("start_cursor"), body.get("page_size"), "page_or_database")
+    
+    @app.get("/v1/blocks/{block_id}/children")
+    async def list_block_children(block_id: str, start_cursor: Optional[str] = None,
+                                  page_size: Optional[int] = None):
+        """blocks.children.list"""
+        if not dataset.has_page(block_id):
+            return _error(404, "object_not_found", f"Could not find block with ID: {block_id}.")
+        return _paginate(dataset.blocks(block_id), start_cursor, page_size, "block")
+    
+    @app.get("/_loadtest/stats")
+    async def stats():
+        """模擬伺服器統計"""
+        return {"pages": len(dataset.pages), **faults.stats()}
+    
+    return app
@@ -0,0 +1,81 @@
+"""
+模擬上游延遲與錯誤注入模組
+"""
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class FaultProfile:
+    """模擬伺服器的延遲分佈與錯誤注入設定"""
+    latency_median: float = 0.15
+    latency_sigma: float = 0.5
+    latency_max: float = 5.0
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    requests_per_second: float = 0.0
+    retry_after: float = 1.0
+
+
+class FaultInjector:
+    """依 FaultProfile 決定每個請求的延遲與注入的錯誤"""
+    
+    def __init__(self, profile: FaultProfile, seed: Optional[int] = None):
+        self.profile = profile
+        self._random = random.Random(seed)
+        self._tokens = profile.requests_per_second
+        self._updated_at = time.monotonic()
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+    
+    def sample_latency(self) -> float:
+        """依對數常態分佈取樣延遲（秒），中位數為 latency_median"""
+        if self.profile.latency_median <= 0:
+            return 0.0
+        if self.profile.latency_sigma <= 0:
+            return min(self.profile.latency_median, self.profile.latency_max)
+        latency = self._random.lognormvariate(math.log(self.profile.latency_median), self.profile.latency_sigma)
+        return min(latency, self.profile.latency_max)
+    
+    def _over_rate_limit(self) -> bool:
+        """以 token bucket 模擬每秒請求數上限（requests_per_second 為 0 時不限制）"""
+        rate = self.profile.requests_per_second
+        if rate <= 0:
+            return False
+        
+        now = time.monotonic()
+        self._tokens = min(rate, self._tokens + (now - self._updated_at) * rate)
+        self._updated_at = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+    
+    async def apply(self) -> Optional[str]:
+        """模擬一次請求，回傳注入的錯誤（"rate_limited" 或 "error"），沒有錯誤時回傳 None"""
+        self.requests += 1
+        
+        # 速率限制的回應不經過處理延遲
+        if self._over_rate_limit() or self._random.random() < self.profile.rate_limit_rate:
+            self.rate_limited += 1
+            return "rate_limited"
+        
+        await asyncio.sleep(self.sample_latency())
+        
+        if self._random.random() < self.profile.error_rate:
+            self.errors += 1
+            return "error"
+        return None
+    
+    def stats(self) -> dict:
+        """取得統計資訊"""
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors
+        }
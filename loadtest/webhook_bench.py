@@ -0,0 +1,284 @@
+"""
+端對端 Webhook 負載測試模組
+
+以正確簽名的 LINE Webhook 請求驅動 /webhook，並由模擬 LINE 伺服器的收件紀錄計算回覆時間。
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import math
+import random
+import time
+import uuid
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+import httpx
+from .dataset import TOPICS
+
+# 與基準比較的指標：(路徑, 越大越好)
+COMPARED_METRICS = [
+    (("time_to_reply", "p50"), False),
+    (("time_to_reply", "p95"), False),
+    (("time_to_reply", "p99"), False),
+    (("throughput", "replied_per_second"), True),
+    (("error_rate",), False)
+]
+
+# 錯誤率的絕對容許差（避免基準為 0 時任何錯誤都算退步）
+ERROR_RATE_TOLERANCE = 0.01
+
+
+@dataclass
+class BenchmarkConfig:
+    """負載測試設定"""
+    webhook_url: str
+    line_receipts_url: str
+    channel_secret: str
+    events: int = 500
+    concurrency: int = 50
+    arrival_rate: float = 50.0
+    users: int = 0
+    queries: List[str] = field(default_factory=lambda: list(TOPICS))
+    drain_timeout: float = 60.0
+    seed: int = 1
+
+
+@dataclass
+class _SentEvent:
+    """已送出的事件"""
+    reply_token: str
+    user_id: str
+    sent_at: float
+    replied_at: Optional[float] = None
+    reply_kind: Optional[str] = None
+
+
+def sign_body(body: bytes, channel_secret: str) -> str:
+    """計算 X-Line-Signature（與 LineService.verify_signature 相同的 HMAC-SHA256 + Base64）"""
+    digest = hmac.new(channel_secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+def build_webhook_body(user_id: str, reply_token: str, text: str, timestamp_ms: Optional[int] = None) -> bytes:
+    """建立包含單一文字訊息事件的 Webhook 請求體"""
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+    payload = {
+        "destination": "Uloadtest",
+        "events": [{
+            "type": "message",
+            "mode": "active",
+            "timestamp": timestamp_ms,
+            "source": {"type": "user", "userId": user_id},
+            "replyToken": reply_token,
+            "webhookEventId": uuid.uuid4().hex.upper()[:26],
+            "deliveryContext": {"isRedelivery": False},
+            "message": {"type": "text", "id": str(random.getrandbits(53)), "text": text}
+        }]
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """nearest-rank 百分位數（沒有樣本時回傳 None）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[min(len(ordered), max(1, rank)) - 1]
+
+
+def _distribution(values: List[float]) -> Dict[str, Any]:
+    """延遲分佈摘要"""
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None
+    }
+
+
+class WebhookBenchmark:
+    """以固定到達率與並行上限送出 Webhook 請求並量測回覆時間"""
+    
+    def __init__(self, config: BenchmarkConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._sent: List[_SentEvent] = []
+        self._webhook_latencies: List[float] = []
+        self._status_counts: Dict[str, int] = defaultdict(int)
+        self._transport_errors = 0
+        self._schedule_lag: List[float] = []
+    
+    def _next_event(self, index: int):
+        """產生第 index 個事件的用戶、reply token 與訊息"""
+        if self.config.users > 0:
+            user_id = f"Uloadtest{self._random.randrange(self.config.users):08d}"
+        else:
+            user_id = f"Uloadtest{index:08d}"
+        reply_token = uuid.uuid4().hex
+        text = f"搜尋 {self._random.choice(self.config.queries)}"
+        return user_id, reply_token, text
+    
+    async def _send(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, index: int,
+                    scheduled_at: float):
+        """送出單一 Webhook 請求"""
+        async with semaphore:
+            self._schedule_lag.append(max(0.0, time.monotonic() - scheduled_at))
+            user_id, reply_token, text = self._next_event(index)
+            body = build_webhook_body(user_id, reply_token, text)
+            headers = {
+                "Content-Type": "application/json",
+                "X-Line-Signature": sign_body(body, self.config.channel_secret)
+            }
+            
+            sent = _SentEvent(reply_token=reply_token, user_id=user_id, sent_at=time.time())
+            started_at = time.perf_counter()
+            try:
+                response = await client.post(self.config.webhook_url, content=body, headers=headers)
+            except httpx.HTTPError:
+                self._transport_errors += 1
+                return
+            
+            self._webhook_latencies.append(time.perf_counter() - started_at)
+            self._status_counts[str(response.status_code)] += 1
+            if response.status_code == 200:
+                self._sent.append(sent)
+    
+    async def _drive(self, client: httpx.AsyncClient) -> float:
+        """依到達率送出所有事件（arrival_rate 為 0 時以並行上限連續送出），回傳送出期間秒數"""
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+        started_at = time.monotonic()
+        scheduled_at = started_at
+        tasks = []
+        for index in range(self.config.events):
+            if self.config.arrival_rate > 0:
+                # 開放式負載：以 Poisson 過程排程到達時間，不因伺服器變慢而減少送出
+                scheduled_at += self._random.expovariate(self.config.arrival_rate)
+                delay = scheduled_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._send(client, semaphore, index, scheduled_at)))
+        
+        await asyncio.gather(*tasks)
+        return time.monotonic() - started_at
+    
+    async def _collect_replies(self, client: httpx.AsyncClient, since: float):
+        """輪詢模擬 LINE 伺服器的收件紀錄，直到所有事件都收到回覆或逾時"""
+        by_token = {event.reply_token: event for event in self._sent}
+        pending_pushes: Dict[str, Deque[_SentEvent]] = defaultdict(deque)
+        for event in sorted(self._sent, key=lambda item: item.sent_at):
+            pending_pushes[event.user_id].append(event)
+        
+        deadline = time.monotonic() + self.config.drain_timeout
+        seen = 0
+        upstream: Dict[str, Any] = {}
+        while True:
+            response = await client.get(self.config.line_receipts_url, params={"since": since})
+            response.raise_for_status()
+            data = response.json()
+            receipts = data.pop("receipts")
+            upstream = data
+            
+            for receipt in receipts[seen:]:
+                if receipt["kind"] == "reply":
+                    event = by_token.get(receipt["target"])
+                else:
+                    # 推送訊息沒有 reply token，依同一用戶最早尚未回覆的事件配對
+                    queue = pending_pushes.get(receipt["target"])
+                    event = None
+                    while queue:
+                        candidate = queue.popleft()
+                        if candidate.replied_at is None:
+                            event = candidate
+                            break
+                if event is not None and event.replied_at is None:
+                    event.replied_at = receipt["received_at"]
+                    event.reply_kind = receipt["kind"]
+            seen = len(receipts)
+            
+            if all(event.replied_at is not None for event in self._sent) or time.monotonic() >= deadline:
+                return upstream
+            await asyncio.sleep(0.5)
+    
+    async def run(self) -> Dict[str, Any]:
+        """執行負載測試並回傳報告"""
+        limits = httpx.Limits(max_connections=self.config.concurrency + 1)
+        async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+            started_at = time.time()
+            send_duration = await self._drive(client)
+            upstream = await self._collect_replies(client, since=started_at)
+        
+        replied = [event for event in self._sent if event.replied_at is not None]
+        time_to_reply = [event.replied_at - event.sent_at for event in replied]
+        reply_window = (max(event.replied_at for event in replied) - started_at) if replied else 0.0
+        rejected = sum(count for status, count in self._status_counts.items() if status != "200")
+        unanswered = len(self._sent) - len(replied)
+        failures = rejected + self._transport_errors + unanswered
+        
+        return {
+            "config": {key: value for key, value in asdict(self.config).items()
+                       if key not in ("channel_secret", "queries")},
+            "send_duration": send_duration,
+            "events": {
+                "sent": self.config.events,
+                "accepted": len(self._sent),
+                "rejected": rejected,
+                "transport_errors": self._transport_errors,
+                "status_counts": dict(self._status_counts)
+            },
+            "throughput": {
+                "offered_per_second": self.config.events / send_duration if send_duration else 0.0,
+                "replied_per_second": len(replied) / reply_window if reply_window else 0.0
+            },
+            "webhook_latency": _distribution(self._webhook_latencies),
+            "schedule_lag": _distribution(self._schedule_lag),
+            "time_to_reply": _distribution(time_to_reply),
+            "replies": {
+                "reply": sum(1 for event in replied if event.reply_kind == "reply"),
+                "push": sum(1 for event in replied if event.reply_kind == "push"),
+                "unanswered": unanswered
+            },
+            "error_rate": failures / self.config.events if self.config.events else 0.0,
+            "upstream_line": upstream
+        }
+
+
+def _lookup(report: Dict[str, Any], path) -> Optional[float]:
+    """依路徑取得報告中的數值"""
+    value: Any = report
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """與基準報告比較，回傳超過 threshold（相對變化）的退步指標"""
+    regressions = []
+    for path, higher_is_better in COMPARED_METRICS:
+        current = _lookup(report, path)
+        previous = _lookup(baseline, path)
+        if current is None or previous is None:
+            continue
+        
+        if path == ("error_rate",):
+            regressed = current > previous + ERROR_RATE_TOLERANCE
+        elif higher_is_better:
+            regressed = current < previous * (1 - threshold)
+        else:
+            regressed = current > previous * (1 + threshold)
+        
+        if regressed:
+            regressions.append({
+                "metric": ".".join(path),
+                "baseline": previous,
+                "current": current,
+                "change": (current - previous) / previous if previous else None
+            })
+    return regressions
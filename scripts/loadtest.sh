@@ -0,0 +1,170 @@
+#!/bin/bash
+
+# Line Bot Notion API 端對端負載測試腳本
+# 啟動模擬 Notion / LINE 伺服器與應用程式，送出簽名的 Webhook 請求並輸出 JSON 報告
+#
+# 用法：
+#   ./scripts/loadtest.sh                         # 輸出 loadtest-report.json
+#   BASELINE=loadtest-baseline.json ./scripts/loadtest.sh   # 與基準比較，退步時結束碼為 1
+#
+# 可調整的環境變數：EVENTS、CONCURRENCY、ARRIVAL_RATE、USERS、PAGES、NOTION_LATENCY、
+# NOTION_RATE_LIMIT_RATE、NOTION_ERROR_RATE、LINE_LATENCY、THRESHOLD、OUTPUT、
+# NOTION_SYNC_ENABLED（預設 true，送出事件前等待本地索引同步完成）、
+# NOTION_RATE_LIMIT / NOTION_RATE_BURST（應用程式的 Notion 速率限制，預設 50；設為 3 模擬正式環境）、
+# WARMUP_TIMEOUT（預設依頁數、Notion 延遲與速率限制估算第一次同步的時間）
+
+set -e
+
+# 顏色定義
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+RED='\033[0;31m'
+NC='\033[0m' # No Color
+
+print_info() {
+    echo -e "${GREEN}[INFO]${NC} $1"
+}
+
+print_warning() {
+    echo -e "${YELLOW}[WARNING]${NC} $1"
+}
+
+print_error() {
+    echo -e "${RED}[ERROR]${NC} $1"
+}
+
+APP_PORT=${APP_PORT:-9000}
+NOTION_PORT=${NOTION_PORT:-9001}
+LINE_PORT=${LINE_PORT:-9002}
+OUTPUT=${OUTPUT:-loadtest-report.json}
+THRESHOLD=${THRESHOLD:-0.1}
+
+# 應用程式使用的設定（指向模擬伺服器）
+export LINE_CHANNEL_ACCESS_TOKEN=loadtest-token
+export LINE_CHANNEL_SECRET=loadtest-secret
+export NOTION_API_TOKEN=loadtest-token
+export NOTION_DATABASE_ID=loadtest-database
+export GCP_PROJECT_ID=${GCP_PROJECT_ID:-loadtest}
+# 與生產環境相同的日誌等級與格式（不使用 ENVIRONMENT=production，避免連線 Google Cloud Logging）
+export ENVIRONMENT=loadtest
+export DEBUG=false
+export LOG_LEVEL=INFO
+export LOG_FORMAT=json
+# 與生產環境相同預設啟用本地鏡像同步，設為 false 時所有搜尋直接呼叫 Notion
+export NOTION_SYNC_ENABLED=${NOTION_SYNC_ENABLED:-true}
+PAGES=${PAGES:-2000}
+NOTION_LATENCY=${NOTION_LATENCY:-0.15}
+# 模擬 Notion 伺服器不限制速率（只依 NOTION_RATE_LIMIT_RATE 隨機回傳 429），
+# 提高應用程式的速率限制，避免第一次同步 2000 頁需要十幾分鐘
+export NOTION_RATE_LIMIT=${NOTION_RATE_LIMIT:-50}
+export NOTION_RATE_BURST=${NOTION_RATE_BURST:-50}
+# 同步依序取得每頁內容，預留兩倍的預估時間
+WARMUP_TIMEOUT=${WARMUP_TIMEOUT:-$(python -c "print(int(30 + 2 * $PAGES * ($NOTION_LATENCY + 1 / $NOTION_RATE_LIMIT)))")}
+export NOTION_BASE_URL=http://127.0.0.1:${NOTION_PORT}
+export LINE_API_ENDPOINT=http://127.0.0.1:${LINE_PORT}
+
+PIDS=()
+
+cleanup() {
+    print_info "關閉模擬伺服器與應用程式..."
+    for pid in "${PIDS[@]}"; do
+        kill "$pid" 2>/dev/null || true
+    done
+}
+trap cleanup EXIT
+
+# 等待服務可以連線
+wait_for() {
+    local url=$1
+    for _ in $(seq 1 50); do
+        if curl -s -o /dev/null "$url"; then
+            return 0
+        fi
+        sleep 0.2
+    done
+    print_error "服務未啟動：$url"
+    exit 1
+}
+
+start_upstreams() {
+    print_info "啟動模擬 Notion 伺服器（port ${NOTION_PORT}）..."
+    python -m loadtest notion --port "$NOTION_PORT" --database-id "$NOTION_DATABASE_ID" \
+        --pages "$PAGES" \
+        --latency-median "$NOTION_LATENCY" \
+        --rate-limit-rate "${NOTION_RATE_LIMIT_RATE:-0.01}" \
+        --error-rate "${NOTION_ERROR_RATE:-0.0}" \
+        --seed 1 &
+    PIDS+=($!)
+    
+    print_info "啟動模擬 LINE 伺服器（port ${LINE_PORT}）..."
+    python -m loadtest line --port "$LINE_PORT" --latency-median "${LINE_LATENCY:-0.03}" --seed 1 &
+    PIDS+=($!)
+    
+    wait_for "http://127.0.0.1:${NOTION_PORT}/_loadtest/stats"
+    wait_for "http://127.0.0.1:${LINE_PORT}/_loadtest/receipts"
+}
+
+start_app() {
+    print_info "啟動應用程式（port ${APP_PORT}）..."
+    uvicorn app.main:app --port "$APP_PORT" --log-level warning > loadtest-app.log 2>&1 &
+    PIDS+=($!)
+    wait_for "http://127.0.0.1:${APP_PORT}/"
+}
+
+# 等待本地鏡像索引完成第一次同步（避免量測到冷啟動期間的 Notion 即時搜尋）
+warm_up() {
+    if [ "$NOTION_SYNC_ENABLED" != "true" ]; then
+        print_info "本地鏡像同步已停用，跳過暖機"
+        return 0
+    fi
+    
+    print_info "等待本地鏡像索引同步完成..."
+    local deadline=$((SECONDS + WARMUP_TIMEOUT))
+    while [ "$SECONDS" -lt "$deadline" ]; do
+        if curl -s "http://127.0.0.1:${APP_PORT}/health" | \
+            python -c "import json, sys; sys.exit(0 if json.load(sys.stdin)['search_index']['ready'] else 1)" \
+            2>/dev/null; then
+            print_info "本地鏡像索引已就緒"
+            return 0
+        fi
+        sleep 1
+    done
+    print_error "本地鏡像索引未在 ${WARMUP_TIMEOUT} 秒內完成同步"
+    exit 1
+}
+
+run_benchmark() {
+    print_info "送出 ${EVENTS:-300} 個 Webhook 事件..."
+    local args=(
+        --url "http://127.0.0.1:${APP_PORT}/webhook"
+        --line-url "http://127.0.0.1:${LINE_PORT}"
+        --events "${EVENTS:-300}"
+        --concurrency "${CONCURRENCY:-50}"
+        --arrival-rate "${ARRIVAL_RATE:-10}"
+        --users "${USERS:-0}"
+        --output "$OUTPUT"
+    )
+    if [ -n "$BASELINE" ]; then
+        if [ -f "$BASELINE" ]; then
+            args+=(--baseline "$BASELINE" --threshold "$THRESHOLD")
+        else
+            print_warning "基準檔案不存在：$BASELINE，僅輸出報告"
+        fi
+    fi
+    
+    if python -m loadtest webhook "${args[@]}"; then
+        print_info "報告已輸出到 ${OUTPUT}"
+    else
+        print_error "與基準相比有退步，詳見 ${OUTPUT} 的 regressions"
+        exit 1
+    fi
+}
+
+main() {
+    start_upstreams
+    start_app
+    warm_up
+    run_benchmark
+}
+
+main "$@"
@@ -0,0 +1,64 @@
+"""
+共用測試 fixture
+"""
+import pytest
+from unittest.mock import Mock, patch
+from app.services.line_service import LineService
+from app.services.notion_service import NotionService
+
+
+@pytest.fixture
+def notion_settings():
+    """NotionService 使用的測試設定"""
+    settings = Mock()
+    settings.notion_api_token = "test_token"
+    settings.notion_database_id = "test_db_id"
+    settings.max_search_results = 5
+    settings.notion_max_concurrency = 3
+    settings.notion_speculative_search = False
+    settings.search_cache_size = 16
+    settings.search_cache_ttl = 60
+    settings.page_content_cache_bytes = 1024 * 1024
+    settings.notion_base_url = "https://api.notion.com"
+    settings.notion_request_timeout = 10.0
+    settings.notion_http2 = False
+    settings.notion_max_connections = 10
+    settings.notion_max_keepalive_connections = 5
+    settings.notion_keepalive_expiry = 30.0
+    settings.notion_rate_limit = 100.0
+    settings.notion_rate_burst = 100
+    settings.notion_max_retries = 2
+    settings.notion_retry_base_delay = 0.01
+    settings.notion_hedging_enabled = False
+    settings.notion_hedge_percentile = 95.0
+    settings.notion_hedge_min_samples = 5
+    settings.notion_latency_window = 100
+    settings.notion_breaker_failure_threshold = 3
+    settings.notion_breaker_recovery_timeout = 30.0
+    settings.search_stale_cache_size = 16
+    settings.search_stale_ttl = 3600
+    settings.notion_sync_max_staleness = 600
+    settings.notion_index_fallback_on_miss = True
+    return settings
+
+
+@pytest.fixture
+def notion_service(notion_settings):
+    """建立 NotionService 實例"""
+    with patch('app.services.notion_service.get_settings', return_value=notion_settings):
+        return NotionService()
+
+
+@pytest.fixture
+def line_service():
+    """建立 LineService 實例"""
+    with patch('app.services.line_service.get_settings') as mock_settings:
+        mock_settings.return_value.line_channel_access_token = "test_token"
+        mock_settings.return_value.line_channel_secret = "test_secret"
+        mock_settings.return_value.line_max_connections = 10
+        mock_settings.return_value.line_keepalive_timeout = 30.0
+        mock_settings.return_value.line_api_endpoint = "https://api.line.me"
+        mock_settings.return_value.reply_deadline_margin = 3.0
+        
+        service = LineService()
+        return service
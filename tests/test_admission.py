@@ -0,0 +1,202 @@
+"""
+准入控制測試
+"""
+import asyncio
+from contextlib import asynccontextmanager
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app import main
+from app.models.line_models import LineEvent
+from app.services.admission import AdmissionController, AdmissionDecision
+from app.services.event_dispatcher import EventDispatcher
+from app.utils.latency import LatencyTracker
+from app.utils.rate_limiter import PriorityRateLimiter
+
+
+def _event(user_id: str) -> LineEvent:
+    """建立範例訊息事件"""
+    return LineEvent(
+        type="message",
+        mode="active",
+        timestamp=1234567890,
+        source={"userId": user_id, "type": "user"},
+        reply_token="test_reply_token",
+        message={"type": "text", "text": "Python"}
+    )
+
+
+class TestAdmissionController:
+    """AdmissionController 測試類別"""
+    
+    def test_accepts_when_idle(self):
+        """測試佇列空閒時接受事件"""
+        controller = AdmissionController(wait_budget=10)
+        
+        assert controller.decide(queue_depth=0, workers=4, service_time=2.0) == AdmissionDecision.ACCEPT
+    
+    def test_degrades_then_sheds_as_wait_grows(self):
+        """測試預估等待時間增加時依序降級並拒絕事件"""
+        controller = AdmissionController(wait_budget=10, titles_only_ratio=0.5, cache_only_ratio=0.75)
+        
+        # 預估等待 = 佇列深度 / 工作者數 × 處理時間
+        assert controller.decide(queue_depth=12, workers=4, service_time=2.0) == AdmissionDecision.TITLES_ONLY
+        assert controller.decide(queue_depth=16, workers=4, service_time=2.0) == AdmissionDecision.CACHE_ONLY
+        assert controller.decide(queue_depth=24, workers=4, service_time=2.0) == AdmissionDecision.SHED
+        assert controller.shed_count == 1
+        assert controller.stats()["last_predicted_wait"] == 12.0
+    
+    def test_service_time_uses_notion_latency(self):
+        """測試處理時間估算會考慮 Notion 近期延遲"""
+        controller = AdmissionController(wait_budget=10, notion_calls_per_event=3)
+        
+        assert controller.estimate_service_time(handler_time=0.5, notion_latency=1.0) == 3.0
+        assert controller.estimate_service_time(handler_time=5.0, notion_latency=1.0) == 5.0
+    
+    def test_limiter_wait_includes_backlog_and_own_calls(self):
+        """測試速率限制器排隊時間包含前方等待的請求與本事件所需的呼叫數"""
+        controller = AdmissionController(wait_budget=10, notion_calls_per_event=3)
+        
+        assert controller.estimate_limiter_wait(limiter_depth=0, rate=3.0) == 1.0
+        assert controller.estimate_limiter_wait(limiter_depth=27, rate=3.0) == 10.0
+        assert controller.estimate_limiter_wait(limiter_depth=27, rate=0) == 0.0
+    
+    def test_limiter_wait_counts_queued_events(self):
+        """測試事件佇列中尚未處理的事件會換算成速率限制器前方的呼叫"""
+        controller = AdmissionController(wait_budget=10, notion_calls_per_event=3)
+        
+        assert controller.estimate_limiter_wait(limiter_depth=6, rate=3.0, pending_events=10) == 13.0
+    
+    def test_limiter_wait_adds_to_predicted_wait(self):
+        """測試佇列空閒時速率限制器的排隊時間仍會使事件降級或被拒絕"""
+        controller = AdmissionController(wait_budget=10, titles_only_ratio=0.5, cache_only_ratio=0.75)
+        
+        assert controller.decide(queue_depth=0, workers=1, service_time=2.0, limiter_wait=6.0) == \
+            AdmissionDecision.TITLES_ONLY
+        assert controller.decide(queue_depth=0, workers=1, service_time=2.0, limiter_wait=11.0) == \
+            AdmissionDecision.SHED
+    
+    def test_stats_counts_decisions(self):
+        """測試統計資訊記錄各決策次數"""
+        controller = AdmissionController(wait_budget=1)
+        controller.decide(queue_depth=0, workers=1, service_time=1.0)
+        controller.decide(queue_depth=10, workers=1, service_time=1.0)
+        
+        decisions = controller.stats()["decisions"]
+        assert decisions["accept"] == 1
+        assert decisions["shed"] == 1
+
+
+@asynccontextmanager
+async def _wired(handler=None, rate: float = 3.0, index_available: bool = False):
+    """以實際的速率限制器與事件分派器取代 main 的全域服務"""
+    limiter = PriorityRateLimiter(rate=rate, burst=1)
+    notion_service = Mock(rate_limiter=limiter, latency=LatencyTracker())
+    notion_service.is_index_available.return_value = index_available
+    notion_service.latency.observe(0.2)
+    dispatcher = EventDispatcher(handler or AsyncMock(), workers=4, queue_size=400)
+    await dispatcher.start()
+    controller = AdmissionController(wait_budget=20, notion_calls_per_event=3)
+    
+    try:
+        with patch.object(main, 'notion_service', notion_service), \
+             patch.object(main, 'event_dispatcher', dispatcher), \
+             patch.object(main, 'admission_controller', controller):
+            yield limiter, dispatcher
+    finally:
+        await dispatcher.stop(timeout=0)
+
+
+class TestAdmitEvent:
+    """main._admit_event 測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_accepts_when_limiter_idle(self):
+        """測試速率限制器與佇列空閒時接受事件"""
+        async with _wired():
+            assert main._admit_event(_event("user_a")) == AdmissionDecision.ACCEPT
+    
+    @pytest.mark.asyncio
+    async def test_saturated_limiter_degrades_then_sheds(self):
+        """測試 Notion 速率限制器飽和時，即使事件佇列空閒也會降級並拒絕事件"""
+        async with _wired() as (limiter, _):
+            waiters = [asyncio.create_task(limiter.acquire()) for _ in range(40)]
+            await asyncio.sleep(0)
+            try:
+                # 預估等待 (40 + 3) / 3 秒，超過預算的一半
+                assert main._admit_event(_event("user_a")) in (
+                    AdmissionDecision.TITLES_ONLY, AdmissionDecision.CACHE_ONLY
+                )
+                
+                waiters += [asyncio.create_task(limiter.acquire()) for _ in range(40)]
+                await asyncio.sleep(0)
+                assert main._admit_event(_event("user_a")) == AdmissionDecision.SHED
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+                await asyncio.gather(*waiters, return_exceptions=True)
+    
+    @pytest.mark.asyncio
+    async def test_uses_depth_of_target_shard(self):
+        """測試只計算事件會被分派到的佇列深度，而非全部佇列平均"""
+        async def blocked(event, **context):
+            await asyncio.sleep(60)
+        
+        # 速率限制器充足時，只有目標佇列的深度會影響決策
+        async with _wired(blocked, rate=1000.0) as (_, dispatcher):
+            busy, idle = _event("user_busy"), _event("user_idle")
+            while dispatcher._shard(idle) == dispatcher._shard(busy):
+                idle = _event(idle.user_id + "_")
+            
+            # 工作者被阻塞，送出的事件留在同一個佇列中
+            for _ in range(100):
+                assert await dispatcher.submit(busy)
+            
+            assert main._admit_event(idle) == AdmissionDecision.ACCEPT
+            assert main._admit_event(busy) == AdmissionDecision.SHED
+    
+    @pytest.mark.asyncio
+    async def test_dispatcher_backlog_saturating_limiter_sheds(self):
+        """測試佇列中的事件會使共用的速率限制器飽和，新事件即使分派到空閒佇列也會被拒絕"""
+        limiters = []
+        
+        async def handler(event, **context):
+            # 每個事件依序發出 3 個 Notion 呼叫
+            for _ in range(3):
+                await limiters[0].acquire()
+        
+        async with _wired(handler) as (limiter, dispatcher):
+            limiters.append(limiter)
+            events = [_event(f"user_{index}") for index in range(60)]
+            decisions = []
+            for event in events:
+                decisions.append(main._admit_event(event))
+                if decisions[-1] != AdmissionDecision.SHED:
+                    assert await dispatcher.submit(event)
+                await asyncio.sleep(0)
+            
+            assert decisions[0] == AdmissionDecision.ACCEPT
+            assert AdmissionDecision.SHED in decisions
+            # 被接受的事件在 3 次/秒的限制下都能在等待預算內取得所需的 token
+            accepted = len(decisions) - decisions.count(AdmissionDecision.SHED)
+            assert accepted * 3 / limiter.rate <= main.admission_controller.wait_budget + 3
+    
+    @pytest.mark.asyncio
+    async def test_index_available_accepts_deep_queue(self):
+        """測試本地索引可用時搜尋不經過 Notion，佇列很深也不會因速率限制器而降級或拒絕"""
+        async def blocked(event, **context):
+            await asyncio.sleep(60)
+        
+        async with _wired(blocked, index_available=True) as (limiter, dispatcher):
+            # 處理實際上只需數毫秒
+            dispatcher.service_time.observe(0.005)
+            for index in range(300):
+                assert await dispatcher.submit(_event(f"user_{index}"))
+            waiters = [asyncio.create_task(limiter.acquire()) for _ in range(40)]
+            await asyncio.sleep(0)
+            
+            try:
+                assert main._admit_event(_event("user_new")) == AdmissionDecision.ACCEPT
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+                await asyncio.gather(*waiters, return_exceptions=True)
@@ -0,0 +1,73 @@
+"""
+微基準測試案例測試
+"""
+import json
+import logging
+from unittest.mock import patch
+from benchmarks import __main__ as cli
+from benchmarks.__main__ import measure
+from benchmarks.hot_paths import build_benchmarks, quiet_app_loggers
+
+
+class TestHotPathBenchmarks:
+    """熱路徑基準測試案例測試類別"""
+    
+    def test_all_benchmarks_run(self):
+        """測試所有案例都能執行且量測的是成功路徑"""
+        benchmarks = dict(build_benchmarks())
+        
+        assert benchmarks["verify_signature[1 event]"]() is True
+        assert len(benchmarks["parse_webhook_bytes[10 events]"]()) == 10
+        assert benchmarks["extract_search_query[prefixed]"]() == "API 設計"
+        assert benchmarks["notion._extract_title"]() != "無標題"
+        assert len(benchmarks["SearchResponse.to_line_messages[5 results]"]()) == 6
+        for func in benchmarks.values():
+            func()
+    
+    def test_measure_returns_microseconds(self):
+        """測試量測結果為單次呼叫的微秒數"""
+        assert measure(lambda: None, repeat=1, min_time=0.01) > 0
+    
+    def test_quiet_app_loggers_restores_levels(self):
+        """測試關閉 app 日誌只在區塊內有效，結束後還原原本的等級"""
+        logger = logging.getLogger("app.services.line_service")
+        original = logger.level
+        
+        with quiet_app_loggers():
+            assert logger.level == logging.WARNING
+        assert logger.level == original
+
+
+def _fast_benchmarks():
+    """以單一案例取代實際的基準測試案例"""
+    return [("noop", lambda: None)]
+
+
+class TestBenchmarkCli:
+    """python -m benchmarks 測試類別"""
+    
+    def test_without_baseline_only_reports(self, tmp_path):
+        """測試尚未在本機記錄基準時只輸出結果，不視為退步"""
+        output = tmp_path / "report.json"
+        with patch("benchmarks.hot_paths.build_benchmarks", _fast_benchmarks):
+            code = cli.main(["--baseline", str(tmp_path / "missing.json"), "--repeat", "1",
+                             "--min-time", "0.01", "--output", str(output)])
+        
+        assert code == 0
+        assert json.loads(output.read_text(encoding="utf-8"))["regressions"] == []
+    
+    def test_baseline_scaled_by_calibration(self, tmp_path):
+        """測試基準依校準時間換算，機器整體變慢時不視為退步"""
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(json.dumps({"unit": "us", "calibration": 100.0, "results": {"noop": 1.0}}))
+        
+        # 本機校準迴圈慢 3 倍，案例也慢 3 倍
+        with patch("benchmarks.hot_paths.build_benchmarks", _fast_benchmarks), \
+             patch.object(cli, "calibrate", return_value=300.0), \
+             patch.object(cli, "measure", return_value=3.0):
+            assert cli.main(["--baseline", str(baseline)]) == 0
+        
+        with patch("benchmarks.hot_paths.build_benchmarks", _fast_benchmarks), \
+             patch.object(cli, "calibrate", return_value=100.0), \
+             patch.object(cli, "measure", return_value=3.0):
+            assert cli.main(["--baseline", str(baseline)]) == 1
@@ -0,0 +1,105 @@
+"""
+快取工具測試
+"""
+import pytest
+from app.utils.cache import TTLCache, PageContentCache, PageContent
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """建立假時鐘"""
+    return FakeClock()
+
+
+class TestTTLCache:
+    """TTLCache 測試類別"""
+    
+    def test_get_and_set(self, clock):
+        """測試快取命中與未命中統計"""
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+        
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+    
+    def test_expiration(self, clock):
+        """測試過期項目視為未命中"""
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        
+        clock.now = 10
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+        assert len(cache) == 0
+    
+    def test_lru_eviction(self, clock):
+        """測試超過容量時淘汰最久未使用的項目"""
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+    
+    def test_disabled_cache(self, clock):
+        """測試容量為 0 時不快取"""
+        cache = TTLCache(maxsize=0, ttl=10, clock=clock)
+        cache.set("a", 1)
+        
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+
+class TestPageContentCache:
+    """PageContentCache 測試類別"""
+    
+    def test_hit_with_same_last_edited_time(self):
+        """測試 last_edited_time 相同時命中"""
+        cache = PageContentCache(max_bytes=10_000)
+        cache.set("page_1", "2023-01-01T00:00:00.000Z", PageContent(text="內容"))
+        
+        content = cache.get("page_1", "2023-01-01T00:00:00.000Z")
+        assert content.text == "內容"
+        assert cache.hits == 1
+    
+    def test_invalidate_when_last_edited_time_moves(self):
+        """測試 last_edited_time 變動時自動失效"""
+        cache = PageContentCache(max_bytes=10_000)
+        cache.set("page_1", "2023-01-01T00:00:00.000Z", PageContent(text="內容"))
+        
+        assert cache.get("page_1", "2023-01-02T00:00:00.000Z") is None
+        assert cache.invalidations == 1
+        assert len(cache) == 0
+        assert cache.current_bytes == 0
+    
+    def test_evicts_by_memory_budget(self):
+        """測試超過記憶體上限時淘汰最久未使用的項目"""
+        text = "a" * 1000
+        cache = PageContentCache(max_bytes=2500)
+        cache.set("page_1", "t1", PageContent(text=text))
+        cache.set("page_2", "t1", PageContent(text=text))
+        cache.set("page_3", "t1", PageContent(text=text))
+        
+        assert cache.get("page_1", "t1") is None
+        assert cache.get("page_3", "t1") is not None
+        assert cache.evictions >= 1
+        assert cache.current_bytes <= 2500
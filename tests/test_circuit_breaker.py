@@ -0,0 +1,77 @@
+"""
+斷路器測試
+"""
+import pytest
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """建立假時鐘"""
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    """建立斷路器"""
+    return CircuitBreaker("test", failure_threshold=2, recovery_timeout=10, clock=clock)
+
+
+class TestCircuitBreaker:
+    """CircuitBreaker 測試類別"""
+    
+    def test_opens_after_threshold(self, breaker):
+        """測試連續失敗達門檻後開啟並拒絕請求"""
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+        
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+        
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+        assert breaker.rejected == 1
+    
+    def test_success_resets_failures(self, breaker):
+        """測試成功會重置失敗次數"""
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitState.CLOSED
+    
+    def test_half_open_allows_single_probe(self, breaker, clock):
+        """測試冷卻後半開只允許一個探測請求"""
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.now = 10
+        
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+        
+        breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+    
+    def test_failed_probe_reopens(self, breaker, clock):
+        """測試探測失敗時重新開啟"""
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.now = 10
+        breaker.allow_request()
+        
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+        
+        clock.now = 15
+        assert breaker.allow_request() is False
@@ -0,0 +1,35 @@
+"""
+處理期限測試
+"""
+from app.utils.deadline import Deadline
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+    
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestDeadline:
+    """Deadline 測試類別"""
+    
+    def test_from_timestamp(self):
+        """測試由事件時間戳（毫秒）計算期限"""
+        clock = FakeClock(1000.0)
+        deadline = Deadline.from_timestamp(990_000, ttl=30, clock=clock)
+        
+        assert deadline.remaining() == 20.0
+        clock.now = 1025.0
+        assert deadline.remaining() == 0.0
+        assert deadline.expired
+    
+    def test_future_timestamp_does_not_extend_deadline(self):
+        """測試時間戳晚於本機時間時以本機時間為準"""
+        clock = FakeClock(1000.0)
+        deadline = Deadline.from_timestamp(1_100_000, ttl=30, clock=clock)
+        
+        assert deadline.remaining() == 30.0
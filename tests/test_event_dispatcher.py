@@ -0,0 +1,134 @@
+"""
+事件分派器測試
+"""
+import asyncio
+import pytest
+from app.models.line_models import LineEvent
+from app.services.event_dispatcher import EventDispatcher
+from app.utils.logger import get_correlation_id, set_correlation_id, reset_correlation_id
+
+
+def _event(user_id: str, text: str) -> LineEvent:
+    """建立範例事件"""
+    return LineEvent(
+        type="message",
+        mode="active",
+        timestamp=1234567890,
+        source={"userId": user_id, "type": "user"},
+        reply_token="test_reply_token",
+        message={"type": "text", "text": text}
+    )
+
+
+class TestEventDispatcher:
+    """EventDispatcher 測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_preserves_per_user_order(self):
+        """測試同一用戶的事件依序處理"""
+        handled = []
+        
+        async def handler(event):
+            # 越早的事件處理越久，若並行處理順序會顛倒
+            await asyncio.sleep(0.01 * (3 - int(event.text_content)))
+            handled.append((event.user_id, event.text_content))
+        
+        dispatcher = EventDispatcher(handler, workers=4, queue_size=16)
+        await dispatcher.start()
+        for i in range(3):
+            assert await dispatcher.submit(_event("user_a", str(i)))
+        await dispatcher.stop(timeout=1)
+        
+        assert [text for user, text in handled if user == "user_a"] == ["0", "1", "2"]
+        assert dispatcher.processed == 3
+    
+    @pytest.mark.asyncio
+    async def test_rejects_when_full(self):
+        """測試佇列已滿時拒絕事件"""
+        release = asyncio.Event()
+        
+        async def handler(event):
+            await release.wait()
+        
+        dispatcher = EventDispatcher(handler, workers=1, queue_size=1)
+        await dispatcher.start()
+        
+        assert await dispatcher.submit(_event("user_a", "1"))
+        await asyncio.sleep(0)
+        assert await dispatcher.submit(_event("user_a", "2"))
+        assert await dispatcher.submit(_event("user_a", "3"), timeout=0.01) is False
+        assert dispatcher.rejected == 1
+        assert dispatcher.queue_depth == 1
+        
+        release.set()
+        await dispatcher.stop(timeout=1)
+    
+    @pytest.mark.asyncio
+    async def test_stop_drains_within_deadline(self):
+        """測試關閉時在期限內處理完佇列，逾時則捨棄"""
+        async def slow_handler(event):
+            await asyncio.sleep(10)
+        
+        dispatcher = EventDispatcher(slow_handler, workers=1, queue_size=4)
+        await dispatcher.start()
+        for i in range(3):
+            await dispatcher.submit(_event("user_a", str(i)))
+        
+        await dispatcher.stop(timeout=0.05)
+        
+        assert dispatcher.dropped_on_shutdown == 2
+        assert await dispatcher.submit(_event("user_a", "4")) is False
+    
+    @pytest.mark.asyncio
+    async def test_handler_errors_are_counted(self):
+        """測試處理失敗的事件會被記錄且不影響後續事件"""
+        async def handler(event):
+            if event.text_content == "bad":
+                raise ValueError("處理失敗")
+        
+        dispatcher = EventDispatcher(handler, workers=1, queue_size=4)
+        await dispatcher.start()
+        await dispatcher.submit(_event("user_a", "bad"))
+        await dispatcher.submit(_event("user_a", "good"))
+        await dispatcher.stop(timeout=1)
+        
+        assert dispatcher.failed == 1
+        assert dispatcher.processed == 1
+        assert dispatcher.stats()["wait_time"]["max"] >= 0
+    
+    @pytest.mark.asyncio
+    async def test_passes_context_to_handler(self):
+        """測試加入佇列時的 context 會傳給處理函式"""
+        received = []
+        
+        async def handler(event, admission=None):
+            received.append(admission)
+        
+        dispatcher = EventDispatcher(handler, workers=1, queue_size=4)
+        await dispatcher.start()
+        await dispatcher.submit(_event("user_a", "1"), admission="titles_only")
+        await dispatcher.submit(_event("user_a", "2"))
+        await dispatcher.stop(timeout=1)
+        
+        assert received == ["titles_only", None]
+        assert dispatcher.service_time.count == 2
+    
+    @pytest.mark.asyncio
+    async def test_propagates_correlation_id(self):
+        """測試工作者沿用加入佇列時的關聯 ID"""
+        seen = []
+        
+        async def handler(event):
+            seen.append(get_correlation_id())
+        
+        dispatcher = EventDispatcher(handler, workers=1, queue_size=4)
+        await dispatcher.start()
+        token = set_correlation_id("event-abc")
+        try:
+            await dispatcher.submit(_event("user_a", "1"))
+        finally:
+            reset_correlation_id(token)
+        await dispatcher.stop(timeout=1)
+        
+        assert seen == ["event-abc"]
+
@@ -0,0 +1,37 @@
+"""
+延遲統計測試
+"""
+from app.utils.latency import LatencyTracker
+
+
+class TestLatencyTracker:
+    """LatencyTracker 測試類別"""
+    
+    def test_percentiles(self):
+        """測試百分位數計算"""
+        tracker = LatencyTracker()
+        for value in range(1, 101):
+            tracker.observe(value / 100)
+        
+        assert tracker.percentile(50) == 0.5
+        assert tracker.percentile(95) == 0.95
+        assert tracker.percentile(100) == 1.0
+        assert tracker.stats()["p99"] == 0.99
+    
+    def test_window_keeps_recent_samples(self):
+        """測試只保留最近的樣本"""
+        tracker = LatencyTracker(window=3)
+        for value in [10.0, 1.0, 2.0, 3.0]:
+            tracker.observe(value)
+        
+        assert tracker.sample_count == 3
+        assert tracker.percentile(100) == 3.0
+        assert tracker.max == 10.0
+        assert tracker.count == 4
+    
+    def test_empty_tracker(self):
+        """測試沒有樣本時不回傳百分位數"""
+        tracker = LatencyTracker()
+        
+        assert tracker.percentile(95) is None
+        assert tracker.ewma == 0.0
@@ -1,21 +1,14 @@
 """
 Line 服務測試
 """
+import asyncio
+import time
 import pytest
-from unittest.mock import Mock, patch
-from app.services.line_service import LineService
+from unittest.mock import Mock, AsyncMock, patch
+from linebot.exceptions import LineBotApiError
+from linebot.models import Error
 from app.models.line_models import LineEvent, SearchResponse, SearchResult, ErrorResponse
-
-
-@pytest.fixture
-def line_service():
-    """建立 LineService 實例"""
-    with patch('app.services.line_service.get_settings') as mock_settings:
-        mock_settings.return_value.line_channel_access_token = "test_token"
-        mock_settings.return_value.line_channel_secret = "test_secret"
-        
-        service = LineService()
-        return service
+from app.utils.deadline import Deadline
 
 
 @pytest.fixture
@@ -59,6 +52,11 @@ def sample_search_response():
     )
 
 
+
+def _line_api_error(status_code: int, message: str) -> LineBotApiError:
+    """建立 Line API 錯誤"""
+    return LineBotApiError(status_code, {}, error=Error(message=message))
+
 class TestLineService:
     """LineService 測試類別"""
     
@@ -102,6 +100,48 @@ class TestLineService:
         assert events[0].user_id == "test_user"
         assert events[0].text_content == "Hello"
     
+    def test_parse_webhook_bytes_line_payload(self, line_service):
+        """測試由原始位元組解析 Line 實際送出的 Webhook 格式"""
+        body = (
+            '{"destination": "U123", "events": [{"type": "message", "mode": "active", '
+            '"timestamp": 1234567890, "source": {"userId": "test_user", "type": "user"}, '
+            '"replyToken": "test_token", "message": {"id": "1", "type": "text", "text": "Hello"}}]}'
+        ).encode("utf-8")
+        
+        events = line_service.parse_webhook_bytes(body)
+        
+        assert len(events) == 1
+        assert events[0].reply_token == "test_token"
+        assert events[0].text_content == "Hello"
+    
+    def test_parse_webhook_bytes_redelivery(self, line_service):
+        """測試解析事件 ID 與重新傳送標記"""
+        body = (
+            '{"events": [{"type": "message", "mode": "active", "timestamp": 1234567890, '
+            '"source": {"userId": "test_user", "type": "user"}, "replyToken": "test_token", '
+            '"message": {"id": "1", "type": "text", "text": "Hello"}, '
+            '"webhookEventId": "01FZ74A0TDDPYRVKNK77XKC3ZR", "deliveryContext": {"isRedelivery": true}}]}'
+        ).encode("utf-8")
+        
+        events = line_service.parse_webhook_bytes(body)
+        
+        assert events[0].webhook_event_id == "01FZ74A0TDDPYRVKNK77XKC3ZR"
+        assert events[0].is_redelivery is True
+    
+    def test_parse_webhook_bytes_invalid_json(self, line_service):
+        """測試無效的 JSON 會拋出 ValueError"""
+        with pytest.raises(ValueError):
+            line_service.parse_webhook_bytes(b'{"events": [')
+    
+    def test_parse_webhook_bytes_invalid_event(self, line_service):
+        """測試事件格式錯誤時回傳空列表"""
+        events = line_service.parse_webhook_bytes(b'{"events": [{"type": "message"}]}')
+        assert events == []
+    
+    def test_parse_webhook_bytes_non_object(self, line_service):
+        """測試請求體不是 JSON 物件時回傳空列表"""
+        assert line_service.parse_webhook_bytes(b'[1, 2]') == []
+    
     def test_parse_webhook_body_empty(self, line_service):
         """測試解析空的 Webhook 請求體"""
         body = {"events": []}
@@ -113,11 +153,117 @@ class TestLineService:
     @pytest.mark.asyncio
     async def test_reply_message_success(self, line_service):
         """測試成功回覆訊息"""
-        with patch.object(line_service.line_bot_api, 'reply_message') as mock_reply:
+        mock_api = Mock()
+        mock_api.reply_message = AsyncMock()
+        
+        with patch.object(line_service, '_get_async_api', return_value=mock_api):
             result = await line_service.reply_message("test_token", ["測試訊息"])
             
             assert result is True
-            mock_reply.assert_called_once()
+            mock_api.reply_message.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_push_message_success(self, line_service):
+        """測試成功推送訊息"""
+        mock_api = Mock()
+        mock_api.push_message = AsyncMock()
+        
+        with patch.object(line_service, '_get_async_api', return_value=mock_api):
+            result = await line_service.push_message("test_user", ["測試訊息"])
+            
+            assert result is True
+            mock_api.push_message.assert_awaited_once()
+            args, kwargs = mock_api.push_message.call_args
+            assert args[0] == "test_user"
+    
+    @pytest.mark.asyncio
+    async def test_reply_message_pushes_when_deadline_close(self, line_service):
+        """測試回覆期限將至時改用推送訊息"""
+        mock_api = Mock()
+        mock_api.reply_message = AsyncMock()
+        mock_api.push_message = AsyncMock()
+        deadline = Deadline(expires_at=101.0, clock=lambda: 100.0)
+        
+        with patch.object(line_service, '_get_async_api', return_value=mock_api):
+            result = await line_service.reply_message(
+                "test_token", ["測試訊息"], user_id="test_user", deadline=deadline
+            )
+        
+        assert result is True
+        mock_api.reply_message.assert_not_awaited()
+        mock_api.push_message.assert_awaited_once()
+        assert line_service.late_replies == 1
+        assert line_service.push_fallbacks == 1
+    
+    @pytest.mark.asyncio
+    async def test_reply_message_pushes_when_reply_token_invalid(self, line_service):
+        """測試 Line 回應回覆 token 已失效時改用推送訊息"""
+        mock_api = Mock()
+        mock_api.reply_message = AsyncMock(side_effect=_line_api_error(400, "Invalid reply token"))
+        mock_api.push_message = AsyncMock()
+        deadline = Deadline(expires_at=130.0, clock=lambda: 100.0)
+        
+        with patch.object(line_service, '_get_async_api', return_value=mock_api):
+            result = await line_service.reply_message(
+                "test_token", ["測試訊息"], user_id="test_user", deadline=deadline
+            )
+        
+        assert result is True
+        assert line_service.stats()["reply_failures"] == 1
+        assert line_service.stats()["push_fallbacks"] == 1
+        assert line_service.stats()["late_replies"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_reply_message_does_not_push_after_api_error(self, line_service):
+        """測試回覆 token 仍有效時的 Line API 錯誤（例如 429）不改用推送訊息"""
+        mock_api = Mock()
+        mock_api.reply_message = AsyncMock(side_effect=_line_api_error(429, "The API rate limit has been exceeded."))
+        mock_api.push_message = AsyncMock()
+        deadline = Deadline(expires_at=130.0, clock=lambda: 100.0)
+        
+        with patch.object(line_service, '_get_async_api', return_value=mock_api):
+            result = await line_service.reply_message(
+                "test_token", ["測試訊息"], user_id="test_user", deadline=deadline
+            )
+        
+        assert result is False
+        mock_api.push_message.assert_not_awaited()
+        assert line_service.stats()["reply_failures"] == 1
+        assert line_service.stats()["push_fallbacks"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_reply_message_does_not_push_after_cancelled_reply(self, line_service):
+        """測試回覆在 token 期限到達時被中途取消不改用推送訊息（Line 可能已收到回覆）"""
+        async def slow_reply(*args, **kwargs):
+            await asyncio.sleep(10)
+        
+        mock_api = Mock()
+        mock_api.reply_message = AsyncMock(side_effect=slow_reply)
+        mock_api.push_message = AsyncMock()
+        line_service.settings.reply_deadline_margin = 0.0
+        deadline = Deadline(time.time() + 0.05)
+        
+        with patch.object(line_service, '_get_async_api', return_value=mock_api):
+            result = await line_service.reply_message(
+                "test_token", ["測試訊息"], user_id="test_user", deadline=deadline
+            )
+        
+        assert result is False
+        mock_api.reply_message.assert_awaited_once()
+        mock_api.push_message.assert_not_awaited()
+        assert line_service.stats()["push_fallbacks"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_async_api_shares_session(self, line_service):
+        """測試非同步客戶端共用同一個連線池"""
+        first = line_service._get_async_api()
+        second = line_service._get_async_api()
+        
+        assert first is second
+        assert line_service._session is not None
+        
+        await line_service.aclose()
+        assert line_service._session is None
     
     @pytest.mark.asyncio
     async def test_reply_message_empty_token(self, line_service):
@@ -0,0 +1,139 @@
+"""
+負載測試模擬伺服器測試
+"""
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from notion_client import AsyncClient
+from notion_client.errors import APIResponseError
+from loadtest import SyntheticDataset, FaultProfile, FaultInjector, create_notion_app, create_line_app
+from loadtest.webhook_bench import build_webhook_body, compare_to_baseline, sign_body
+
+
+def _notion_client(app) -> AsyncClient:
+    """建立連到模擬 Notion 伺服器的客戶端（不經過網路）"""
+    return AsyncClient(
+        auth="test_token",
+        client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+        base_url="http://fake-notion"
+    )
+
+
+def _no_latency(**kwargs) -> FaultInjector:
+    """建立沒有延遲的錯誤注入器"""
+    return FaultInjector(FaultProfile(latency_median=0, **kwargs), seed=1)
+
+
+class TestFakeNotion:
+    """模擬 Notion API 測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_notion_service_searches_fake_dataset(self, notion_service):
+        """測試 NotionService 可以對模擬伺服器完成搜尋與內容擷取"""
+        dataset = SyntheticDataset("test_db_id", pages=50, blocks_per_page=3, seed=7)
+        notion_service.client = _notion_client(create_notion_app(dataset, _no_latency()))
+        
+        response = await notion_service.search_database("Python")
+        
+        assert response.total_count > 0
+        assert all("python" in result.title.lower() for result in response.results)
+        assert response.results[0].content
+        assert await notion_service.test_connection()
+    
+    @pytest.mark.asyncio
+    async def test_query_paginates_with_cursor(self):
+        """測試 databases.query 依 page_size 分頁並依 last_edited_time 排序"""
+        dataset = SyntheticDataset("test_db_id", pages=25, seed=7)
+        client = _notion_client(create_notion_app(dataset, _no_latency()))
+        
+        first = await client.databases.query(
+            database_id="test_db_id",
+            page_size=10,
+            sorts=[{"timestamp": "last_edited_time", "direction": "ascending"}]
+        )
+        second = await client.databases.query(database_id="test_db_id", page_size=10,
+                                               start_cursor=first["next_cursor"])
+        last = await client.databases.query(database_id="test_db_id", page_size=10, start_cursor="20")
+        
+        assert len(first["results"]) == 10 and first["has_more"]
+        edited = [page["last_edited_time"] for page in first["results"]]
+        assert edited == sorted(edited)
+        assert len(second["results"]) == 10
+        assert len(last["results"]) == 5 and last["has_more"] is False
+    
+    @pytest.mark.asyncio
+    async def test_injects_rate_limit(self):
+        """測試注入的 429 會轉為 notion_client 的 rate_limited 錯誤"""
+        dataset = SyntheticDataset("test_db_id", pages=5)
+        client = _notion_client(create_notion_app(dataset, _no_latency(rate_limit_rate=1.0)))
+        
+        with pytest.raises(APIResponseError) as exc_info:
+            await client.search(query="Python")
+        
+        assert exc_info.value.code == "rate_limited"
+    
+    def test_dataset_is_deterministic(self):
+        """測試相同種子產生相同資料"""
+        first = SyntheticDataset("db", pages=10, seed=3)
+        second = SyntheticDataset("db", pages=10, seed=3)
+        page_id = first.pages[4]["id"]
+        
+        assert first.pages == second.pages
+        assert first.blocks(page_id) == second.blocks(page_id)
+
+
+class TestFakeLine:
+    """模擬 LINE Messaging API 測試類別"""
+    
+    def test_records_reply_and_rejects_reused_token(self):
+        """測試記錄回覆訊息，且 reply token 只能使用一次"""
+        client = TestClient(create_line_app(_no_latency()))
+        headers = {"Authorization": "Bearer test_token"}
+        body = {"replyToken": "token-1", "messages": [{"type": "text", "text": "hi"}]}
+        
+        assert client.post("/v2/bot/message/reply", json=body, headers=headers).status_code == 200
+        assert client.post("/v2/bot/message/reply", json=body, headers=headers).status_code == 400
+        
+        receipts = client.get("/_loadtest/receipts").json()["receipts"]
+        assert [(receipt["kind"], receipt["target"]) for receipt in receipts] == [("reply", "token-1")]
+    
+    def test_injects_errors(self):
+        """測試依錯誤率回應 5xx"""
+        client = TestClient(create_line_app(_no_latency(error_rate=1.0)))
+        body = {"to": "user", "messages": [{"type": "text", "text": "hi"}]}
+        
+        response = client.post("/v2/bot/message/push", json=body, headers={"Authorization": "Bearer x"})
+        
+        assert response.status_code == 500
+        assert client.get("/_loadtest/receipts").json()["errors"] == 1
+
+
+class TestWebhookBenchmark:
+    """Webhook 負載測試工具測試類別"""
+    
+    def test_signed_payload_is_accepted(self, line_service):
+        """測試產生的請求體與簽名可通過 LineService 驗證與解析"""
+        body = build_webhook_body("Uloadtest00000001", "reply-token", "搜尋 Python")
+        
+        assert line_service.verify_signature(body, sign_body(body, "test_secret"))
+        events = line_service.parse_webhook_bytes(body)
+        assert len(events) == 1
+        assert events[0].reply_token == "reply-token"
+        assert line_service.extract_search_query(events[0].text_content) == "Python"
+    
+    def test_compare_to_baseline(self):
+        """測試超過門檻的退步才會被回報"""
+        baseline = {
+            "time_to_reply": {"p50": 0.1, "p95": 0.5, "p99": 1.0},
+            "throughput": {"replied_per_second": 100.0},
+            "error_rate": 0.0
+        }
+        report = {
+            "time_to_reply": {"p50": 0.105, "p95": 0.6, "p99": 1.0},
+            "throughput": {"replied_per_second": 85.0},
+            "error_rate": 0.005
+        }
+        
+        regressions = compare_to_baseline(report, baseline, threshold=0.1)
+        
+        assert [item["metric"] for item in regressions] == ["time_to_reply.p95", "throughput.replied_per_second"]
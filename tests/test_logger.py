@@ -0,0 +1,99 @@
+"""
+日誌工具測試
+"""
+import json
+import logging
+import queue
+from unittest.mock import patch
+from app.utils.logger import (
+    JsonFormatter, Logger, _CorrelationIdFilter, _DroppingQueueHandler, get_logger,
+    set_correlation_id, reset_correlation_id
+)
+
+
+class TestLogger:
+    """Logger 測試類別"""
+    
+    def test_get_logger_reuses_instances(self):
+        """測試相同名稱共用同一個日誌實例"""
+        assert get_logger("tests.logger") is get_logger("tests.logger")
+        assert get_logger("tests.logger") is not get_logger("tests.other")
+    
+    def test_error_message_formatted_lazily(self):
+        """測試錯誤訊息以 % 參數附加錯誤內容"""
+        message, *args = Logger._with_error("處理 %s 失敗", ("查詢",), ValueError("逾時"))
+        
+        assert message == "處理 %s 失敗: %s"
+        assert message % tuple(args) == "處理 查詢 失敗: 逾時"
+    
+    def test_error_message_escapes_percent(self):
+        """測試沒有參數的訊息中的 % 不會被當成格式符號"""
+        message, *args = Logger._with_error("進度 100%", (), ValueError("錯誤"))
+        
+        assert message % tuple(args) == "進度 100%: 錯誤"
+    
+    def test_log_level_setting_overrides_environment(self):
+        """測試 LOG_LEVEL 優先於 DEBUG 與環境的預設等級"""
+        with patch('app.utils.logger.get_settings') as mock_settings:
+            mock_settings.return_value.debug = True
+            mock_settings.return_value.log_level = "info"
+            assert Logger("tests.logger.level_info").logger.level == logging.INFO
+            
+            mock_settings.return_value.log_level = "unknown"
+            assert Logger("tests.logger.level_unknown").logger.level == logging.INFO
+            
+            mock_settings.return_value.log_level = None
+            assert Logger("tests.logger.level_default").logger.level == logging.DEBUG
+    
+    def test_queue_handler_drops_when_full(self):
+        """測試佇列已滿時捨棄日誌而不阻塞"""
+        handler = _DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.makeLogRecord({"msg": "測試"})
+        
+        handler.emit(record)
+        handler.emit(record)
+        
+        assert handler.dropped == 1
+    
+    def test_json_formatter_includes_context_and_extra(self):
+        """測試 JSON 格式包含關聯 ID 與 extra 欄位"""
+        record = logging.makeLogRecord({
+            "name": "app.test",
+            "levelno": logging.INFO,
+            "levelname": "INFO",
+            "msg": "搜尋完成，結果數：%s",
+            "args": (3,),
+            "query_length": 6
+        })
+        token = set_correlation_id("event-123")
+        try:
+            _CorrelationIdFilter().filter(record)
+        finally:
+            reset_correlation_id(token)
+        
+        payload = json.loads(JsonFormatter().format(record))
+        
+        assert payload["message"] == "搜尋完成，結果數：3"
+        assert payload["severity"] == "INFO"
+        assert payload["correlation_id"] == "event-123"
+        assert payload["query_length"] == 6
+    
+    def test_info_sampling_keeps_whole_request(self):
+        """測試取樣依關聯 ID 決定，同一請求的日誌一起保留或捨棄"""
+        test_logger = Logger("tests.sampling")
+        test_logger.settings = test_logger.settings.model_copy(update={"log_info_sample_rate": 0.5})
+        
+        decisions = {}
+        for correlation_id in [f"event-{i}" for i in range(50)]:
+            token = set_correlation_id(correlation_id)
+            try:
+                decisions[correlation_id] = {test_logger._sampled() for _ in range(3)}
+            finally:
+                reset_correlation_id(token)
+        
+        assert all(len(values) == 1 for values in decisions.values())
+        assert {True, False} == {values.pop() for values in decisions.values()}
+        
+        # 請求以外（例如啟動、背景同步）的日誌不取樣
+        assert test_logger._sampled() is True
+
@@ -0,0 +1,391 @@
+"""
+Webhook 端點測試（以簽名正確的請求體驅動 /webhook，服務以測試替身取代）
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+from types import SimpleNamespace
+import httpx
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi.testclient import TestClient
+from app import main
+from app.models.line_models import SearchResponse
+from app.services.admission import AdmissionController, AdmissionDecision
+from app.services.event_dispatcher import EventDispatcher
+from app.services.line_service import ReplyOutcome
+from app.services.seen_events import InMemorySeenEventStore
+from app.utils.latency import LatencyTracker
+from app.utils.logger import get_correlation_id
+from app.utils.profiler import RequestProfiler
+
+CHANNEL_SECRET = "test_secret"
+
+
+def _body(event_id: str = "01H0001", text: str = "Python", user_id: str = "test_user",
+          redelivery: bool = False, timestamp_ms: int = 1234567890000) -> bytes:
+    """建立包含單一文字訊息事件的 Webhook 請求體"""
+    return json.dumps({
+        "destination": "Utest",
+        "events": [{
+            "type": "message",
+            "mode": "active",
+            "timestamp": timestamp_ms,
+            "source": {"type": "user", "userId": user_id},
+            "replyToken": "test_reply_token",
+            "webhookEventId": event_id,
+            "deliveryContext": {"isRedelivery": redelivery},
+            "message": {"type": "text", "id": "1", "text": text}
+        }]
+    }).encode("utf-8")
+
+
+def _signed(body: bytes) -> dict:
+    """計算 X-Line-Signature 標頭"""
+    digest = hmac.new(CHANNEL_SECRET.encode("utf-8"), body, hashlib.sha256).digest()
+    return {"Content-Type": "application/json", "X-Line-Signature": base64.b64encode(digest).decode("utf-8")}
+
+
+@pytest.fixture
+def services(line_service):
+    """以測試替身取代 main 的全域服務（不執行 lifespan，不連線 Notion 與 Line）"""
+    line_service.reply_busy_message = AsyncMock()
+    dispatcher = Mock()
+    dispatcher.submit = AsyncMock(return_value=True)
+    wired = SimpleNamespace(
+        line_service=line_service,
+        event_dispatcher=dispatcher,
+        seen_event_store=InMemorySeenEventStore(maxsize=100, ttl=60)
+    )
+    
+    with patch.object(main, 'line_service', line_service), \
+         patch.object(main, 'notion_service', Mock()), \
+         patch.object(main, 'event_dispatcher', dispatcher), \
+         patch.object(main, 'seen_event_store', wired.seen_event_store), \
+         patch.object(main, 'admission_controller', None), \
+         patch.object(main, 'request_profiler', None):
+        yield wired
+
+
+@pytest.fixture
+def client(services):
+    """不觸發 lifespan 的測試用戶端"""
+    return TestClient(main.app, raise_server_exceptions=False)
+
+
+class TestWebhook:
+    """/webhook 測試類別"""
+    
+    def test_rejects_invalid_signature(self, client, services):
+        """測試簽名錯誤時回傳 400 且不處理事件"""
+        response = client.post("/webhook", content=_body(), headers={"X-Line-Signature": "invalid"})
+        
+        assert response.status_code == 400
+        services.event_dispatcher.submit.assert_not_called()
+    
+    def test_accepts_signed_event(self, client, services):
+        """測試簽名正確的事件會被加入佇列"""
+        body = _body()
+        response = client.post("/webhook", content=body, headers=_signed(body))
+        
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+        services.event_dispatcher.submit.assert_awaited_once()
+    
+    def test_drops_redelivered_event(self, client, services):
+        """測試 Line 重新傳送相同 webhookEventId 的事件時只處理一次"""
+        first = _body("01H0001")
+        redelivered = _body("01H0001", redelivery=True)
+        
+        assert client.post("/webhook", content=first, headers=_signed(first)).status_code == 200
+        assert client.post("/webhook", content=redelivered, headers=_signed(redelivered)).status_code == 200
+        
+        assert services.event_dispatcher.submit.await_count == 1
+        assert services.seen_event_store.stats()["duplicates"] == 1
+    
+    def test_redelivery_processed_after_submit_error(self, client, services):
+        """測試事件送出時發生錯誤，Line 重新傳送的事件仍會被處理"""
+        services.event_dispatcher.submit.side_effect = [RuntimeError("dispatcher error"), True]
+        first = _body("01H0001")
+        redelivered = _body("01H0001", redelivery=True)
+        
+        assert client.post("/webhook", content=first, headers=_signed(first)).status_code == 500
+        assert client.post("/webhook", content=redelivered, headers=_signed(redelivered)).status_code == 200
+        
+        assert services.event_dispatcher.submit.await_count == 2
+        assert services.seen_event_store.stats()["duplicates"] == 0
+    
+    def test_enqueue_waits_then_replies_busy(self, client, services):
+        """測試佇列已滿時以 EVENT_ENQUEUE_TIMEOUT 等待，逾時後回覆忙碌訊息且 Webhook 仍回傳 200"""
+        services.event_dispatcher.submit.return_value = False
+        body = _body()
+        response = client.post("/webhook", content=body, headers=_signed(body))
+        
+        assert response.status_code == 200
+        kwargs = services.event_dispatcher.submit.await_args.kwargs
+        assert kwargs["timeout"] == main.get_settings().event_enqueue_timeout
+        services.line_service.reply_busy_message.assert_called_once()
+        assert services.line_service.reply_busy_message.call_args.args[0] == "test_reply_token"
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_applies_backpressure(self, services):
+        """測試實際的事件分派器佇列已滿時，Webhook 等待 EVENT_ENQUEUE_TIMEOUT 後回覆忙碌訊息"""
+        release = asyncio.Event()
+        
+        async def blocked(event, **context):
+            await release.wait()
+        
+        dispatcher = EventDispatcher(blocked, workers=1, queue_size=1)
+        await dispatcher.start()
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            with patch.object(main, 'event_dispatcher', dispatcher):
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                    for event_id in ["01H0001", "01H0002", "01H0003"]:
+                        body = _body(event_id)
+                        started_at = time.monotonic()
+                        response = await http.post("/webhook", content=body, headers=_signed(body))
+                        assert response.status_code == 200
+            
+            # 第一個事件由工作者處理、第二個在佇列中，第三個等待後被拒絕
+            assert time.monotonic() - started_at >= main.get_settings().event_enqueue_timeout
+            assert dispatcher.rejected == 1
+            services.line_service.reply_busy_message.assert_called_once()
+        finally:
+            release.set()
+            await dispatcher.stop(timeout=1)
+
+
+class TestWebhookAdmission:
+    """/webhook 准入控制測試類別"""
+    
+    @pytest.fixture
+    def limiter(self, services):
+        """啟用准入控制並以可調整深度的速率限制器估算等待時間"""
+        limiter = Mock(queue_depth=0, rate=1.0)
+        services.event_dispatcher.service_time = LatencyTracker()
+        services.event_dispatcher.shard_depth = Mock(return_value=0)
+        services.event_dispatcher.queue_depth = 0
+        notion_service = Mock(rate_limiter=limiter, latency=LatencyTracker())
+        notion_service.is_index_available.return_value = False
+        controller = AdmissionController(wait_budget=20, notion_calls_per_event=3)
+        
+        with patch.object(main, 'notion_service', notion_service), \
+             patch.object(main, 'admission_controller', controller):
+            yield limiter
+    
+    def test_degrades_when_limiter_backlogged(self, client, services, limiter):
+        """測試預估等待超過預算一半時以僅標題模式處理事件"""
+        limiter.queue_depth = 9
+        body = _body()
+        response = client.post("/webhook", content=body, headers=_signed(body))
+        
+        assert response.status_code == 200
+        assert services.event_dispatcher.submit.await_args.kwargs["admission"] == AdmissionDecision.TITLES_ONLY
+        services.line_service.reply_busy_message.assert_not_called()
+    
+    def test_sheds_with_busy_reply(self, client, services, limiter):
+        """測試預估等待超過預算時不加入佇列，直接回覆忙碌訊息且 Webhook 仍回傳 200"""
+        limiter.queue_depth = 100
+        body = _body()
+        response = client.post("/webhook", content=body, headers=_signed(body))
+        
+        assert response.status_code == 200
+        services.event_dispatcher.submit.assert_not_called()
+        services.line_service.reply_busy_message.assert_called_once()
+        assert main.admission_controller.shed_count == 1
+
+
+class TestWebhookReplyDeadline:
+    """/webhook 事件的回覆期限測試類別"""
+    
+    async def _deliver(self, services, timestamp_ms: int):
+        """送出 Webhook 請求並以事件分派器收到的參數處理事件"""
+        body = _body(timestamp_ms=timestamp_ms)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            response = await http.post("/webhook", content=body, headers=_signed(body))
+        assert response.status_code == 200
+        
+        submit = services.event_dispatcher.submit.await_args
+        await main.handle_line_event(submit.args[0], submit.kwargs["admission"], submit.kwargs["profile"])
+    
+    @pytest.fixture
+    def line_api(self, services):
+        """以測試替身取代實際送出回覆與推送訊息的 Line API 呼叫"""
+        notion_service = Mock()
+        notion_service.search_database = AsyncMock(
+            return_value=SearchResponse(query="Python", results=[], total_count=0)
+        )
+        api = SimpleNamespace(
+            send_reply=AsyncMock(return_value=ReplyOutcome.SENT),
+            push_message=AsyncMock(return_value=True)
+        )
+        
+        with patch.object(main, 'notion_service', notion_service), \
+             patch.object(services.line_service, '_send_reply', api.send_reply), \
+             patch.object(services.line_service, 'push_message', api.push_message):
+            yield api
+    
+    @pytest.mark.asyncio
+    async def test_fresh_event_uses_reply_token(self, services, line_api):
+        """測試回覆期限內的事件使用 reply token 回覆，期限由事件時間戳與 REPLY_TOKEN_TTL 決定"""
+        now_ms = int(time.time() * 1000)
+        await self._deliver(services, now_ms)
+        
+        line_api.send_reply.assert_awaited_once()
+        deadline = line_api.send_reply.await_args.args[2]
+        assert deadline.expires_at == pytest.approx(now_ms / 1000 + main.get_settings().reply_token_ttl)
+        line_api.push_message.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_expired_reply_token_falls_back_to_push(self, services, line_api):
+        """測試事件時間戳已超過 reply token 有效期限時改以推送訊息回覆"""
+        stale_ms = int((time.time() - main.get_settings().reply_token_ttl) * 1000)
+        await self._deliver(services, stale_ms)
+        
+        line_api.send_reply.assert_not_awaited()
+        line_api.push_message.assert_awaited_once()
+        assert line_api.push_message.await_args.args[0] == "test_user"
+        assert services.line_service.stats()["push_fallbacks"] == 1
+
+
+class TestSearchReply:
+    """搜尋結果回覆測試類別"""
+    
+    @pytest.fixture
+    def search(self, services):
+        """以測試替身取代 Notion 搜尋與搜尋結果回覆"""
+        notion_service = Mock()
+        notion_service.search_database = AsyncMock()
+        services.line_service.reply_search_results = AsyncMock(return_value=True)
+        
+        with patch.object(main, 'notion_service', notion_service):
+            yield notion_service.search_database
+    
+    async def _process(self, services):
+        """處理一個時間戳為現在的文字訊息事件"""
+        body = _body(timestamp_ms=int(time.time() * 1000))
+        event = services.line_service.parse_webhook_bytes(body)[0]
+        await main.process_line_event(event)
+    
+    @pytest.mark.asyncio
+    async def test_empty_partial_result_replies_busy(self, services, search):
+        """測試處理期限內沒有取得任何結果時回覆忙碌訊息，而非「沒有找到相關內容」"""
+        search.return_value = SearchResponse(query="Python", results=[], total_count=0, partial=True)
+        await self._process(services)
+        
+        services.line_service.reply_busy_message.assert_awaited_once()
+        services.line_service.reply_search_results.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_genuine_zero_hits_replies_results(self, services, search):
+        """測試確實沒有找到內容時回覆搜尋結果"""
+        search.return_value = SearchResponse(query="Python", results=[], total_count=0)
+        await self._process(services)
+        
+        services.line_service.reply_search_results.assert_awaited_once()
+        services.line_service.reply_busy_message.assert_not_awaited()
+
+
+class TestWebhookCorrelationId:
+    """/webhook 關聯 ID 傳遞測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_worker_logs_with_event_correlation_id(self, services):
+        """測試工作者處理事件時的關聯 ID 為事件的 webhookEventId，沒有時為新產生的 ID"""
+        seen = []
+        
+        async def handler(event, **context):
+            seen.append((event.webhook_event_id, get_correlation_id()))
+        
+        dispatcher = EventDispatcher(handler, workers=2, queue_size=8)
+        await dispatcher.start()
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            with patch.object(main, 'event_dispatcher', dispatcher):
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                    for event_id in ["01HCORR0001", "", ""]:
+                        body = _body(event_id)
+                        response = await http.post("/webhook", content=body, headers=_signed(body))
+                        assert response.status_code == 200
+        finally:
+            await dispatcher.stop(timeout=1)
+        
+        assert seen[0] == ("01HCORR0001", "01HCORR0001")
+        generated = [correlation_id for _, correlation_id in seen[1:]]
+        assert all(generated) and generated[0] != generated[1]
+        assert get_correlation_id() is None
+
+
+class TestProfiling:
+    """效能分析端點與 X-Debug-Profile 測試類別"""
+    
+    TOKEN = "test_admin_token"
+    
+    @pytest.fixture
+    def profiler(self, services):
+        """啟用效能分析並設定管理 token"""
+        profiler = RequestProfiler(max_profiles=5, use_pyinstrument=False)
+        with patch.object(main, 'request_profiler', profiler), \
+             patch.object(main.get_settings(), 'profiling_admin_token', self.TOKEN):
+            yield profiler
+    
+    def test_endpoints_not_found_when_disabled(self, client):
+        """測試未啟用效能分析時管理端點回傳 404"""
+        headers = {"X-Admin-Token": self.TOKEN}
+        
+        assert client.get("/admin/profiles", headers=headers).status_code == 404
+        assert client.get("/admin/profiles/1", headers=headers).status_code == 404
+    
+    @pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+    def test_endpoints_require_admin_token(self, client, profiler, headers):
+        """測試沒有或錯誤的管理 token 時回傳 403"""
+        assert client.get("/admin/profiles", headers=headers).status_code == 403
+        assert client.get("/admin/profiles/1", headers=headers).status_code == 403
+    
+    def test_endpoints_reject_when_token_unset(self, client, profiler):
+        """測試未設定管理 token 時一律拒絕"""
+        with patch.object(main.get_settings(), 'profiling_admin_token', ""):
+            assert client.get("/admin/profiles", headers={"X-Admin-Token": ""}).status_code == 403
+    
+    def test_list_and_download_profiles(self, client, profiler):
+        """測試列出並下載保存的分析結果"""
+        asyncio.run(profiler.run(asyncio.sleep(0), label="message", admission="accept"))
+        headers = {"X-Admin-Token": self.TOKEN}
+        
+        listing = client.get("/admin/profiles", headers=headers)
+        assert listing.status_code == 200
+        assert [summary["id"] for summary in listing.json()["profiles"]] == [1]
+        assert listing.json()["stats"]["stored"] == 1
+        
+        download = client.get("/admin/profiles/1", headers=headers)
+        assert download.status_code == 200
+        assert download.headers["content-type"].startswith("text/plain")
+        assert download.headers["content-disposition"] == 'attachment; filename="profile-1.txt"'
+        assert download.text == profiler.get(1).content
+        
+        assert client.get("/admin/profiles/999", headers=headers).status_code == 404
+    
+    @pytest.mark.parametrize("header, expected", [(TOKEN, True), ("wrong", False), ("", False)])
+    def test_debug_profile_header(self, client, services, profiler, header, expected):
+        """測試只有帶正確 X-Debug-Profile 標頭的請求會要求分析事件"""
+        body = _body()
+        headers = {**_signed(body), "X-Debug-Profile": header}
+        
+        assert client.post("/webhook", content=body, headers=headers).status_code == 200
+        assert services.event_dispatcher.submit.await_args.kwargs["profile"] is expected
+    
+    @pytest.mark.asyncio
+    async def test_requested_profile_is_recorded(self, services, profiler):
+        """測試工作者處理要求分析的事件時保存分析結果"""
+        event = services.line_service.parse_webhook_bytes(_body())[0]
+        with patch.object(main, 'process_line_event', AsyncMock()) as process:
+            await main.handle_line_event(event, AdmissionDecision.ACCEPT, profile=True)
+            await main.handle_line_event(event, AdmissionDecision.ACCEPT, profile=False)
+        
+        assert process.await_count == 2
+        assert [summary["admission"] for summary in profiler.list()] == ["accept"]
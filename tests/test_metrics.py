@@ -0,0 +1,64 @@
+"""
+指標工具測試
+"""
+from app.utils.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """MetricsRegistry 測試類別"""
+    
+    def test_counter_render(self):
+        """測試計數器輸出 Prometheus 格式"""
+        registry = MetricsRegistry()
+        errors = registry.counter("notion_errors", "Notion 錯誤次數", labelnames=("code",))
+        errors.labels(code="rate_limited").inc()
+        errors.labels(code="rate_limited").inc(2)
+        
+        output = registry.render()
+        
+        assert "# TYPE notion_errors counter" in output
+        assert 'notion_errors_total{code="rate_limited"} 3' in output
+    
+    def test_histogram_cumulative_buckets(self):
+        """測試直方圖的分桶為累計值且邊界值包含在該分桶"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("stage_seconds", "階段耗時", buckets=(0.1, 1.0))
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            histogram.observe(value)
+        
+        output = registry.render()
+        
+        assert 'stage_seconds_bucket{le="0.1"} 2' in output
+        assert 'stage_seconds_bucket{le="1.0"} 3' in output
+        assert 'stage_seconds_bucket{le="+Inf"} 4' in output
+        assert "stage_seconds_count 4" in output
+        assert "stage_seconds_sum 2.65" in output
+    
+    def test_histogram_timer(self):
+        """測試以 with 區塊量測耗時"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("stage_seconds", "階段耗時", labelnames=("stage",))
+        
+        with histogram.labels(stage="parse").time():
+            pass
+        
+        child = histogram.labels(stage="parse")
+        assert child.count == 1
+        assert child.sum >= 0
+    
+    def test_gauge_function_and_registration(self):
+        """測試量測值在輸出時取值，且相同名稱回傳同一個指標"""
+        registry = MetricsRegistry()
+        gauge = registry.gauge("queue_depth", "佇列深度")
+        gauge.set_function(lambda: 7)
+        
+        assert registry.gauge("queue_depth", "佇列深度") is gauge
+        assert "queue_depth 7" in registry.render()
+    
+    def test_label_values_escaped(self):
+        """測試標籤值中的特殊字元會被跳脫"""
+        registry = MetricsRegistry()
+        counter = registry.counter("errors", "錯誤次數", labelnames=("code",))
+        counter.labels(code='bad"value').inc()
+        
+        assert 'errors_total{code="bad\\"value"} 1' in registry.render()
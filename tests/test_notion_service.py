@@ -1,24 +1,19 @@
 """
 Notion 服務測試
 """
+import asyncio
+import time
+import httpx
 import pytest
-from unittest.mock import Mock, patch, AsyncMock
-from app.services.notion_service import NotionService
+from unittest.mock import patch, AsyncMock
+from notion_client.errors import APIResponseError, RequestTimeoutError
+from app.services.search_index import IndexedPage
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.deadline import Deadline
+from app.utils.rate_limiter import Priority, PriorityRateLimiter
 from app.models.line_models import SearchResponse, SearchResult
 
 
-@pytest.fixture
-def notion_service():
-    """建立 NotionService 實例"""
-    with patch('app.services.notion_service.get_settings') as mock_settings:
-        mock_settings.return_value.notion_api_token = "test_token"
-        mock_settings.return_value.notion_database_id = "test_db_id"
-        mock_settings.return_value.max_search_results = 5
-        
-        service = NotionService()
-        return service
-
-
 @pytest.fixture
 def mock_notion_response():
     """模擬 Notion API 回應"""
@@ -98,6 +93,7 @@ class TestNotionService:
             assert result.query == "不存在的查詢"
             assert len(result.results) == 0
             assert result.total_count == 0
+            assert result.partial is False
     
     @pytest.mark.asyncio
     async def test_search_database_exception(self, notion_service):
@@ -110,6 +106,397 @@ class TestNotionService:
             assert result.query == "測試查詢"
             assert len(result.results) == 0
             assert result.total_count == 0
+            assert result.partial is True
+    
+    @pytest.mark.asyncio
+    async def test_search_database_parallel_content_keeps_order(self, notion_service, mock_notion_response):
+        """測試並行取得內容時限制並行數並保持結果順序"""
+        item = mock_notion_response["results"][0]
+        items = []
+        for i in range(5):
+            page = dict(item, id=f"page_{i}")
+            page["properties"] = dict(item["properties"], Name={
+                "type": "title", "title": [{"plain_text": f"頁面 {i}"}]
+            })
+            items.append(page)
+        
+        running = 0
+        peak = 0
+        
+        async def fake_extract_content(page_id, last_edited_time=None, deadline=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            # 讓越前面的頁面越晚完成
+            await asyncio.sleep(0.01 * (5 - int(page_id.split("_")[1])))
+            running -= 1
+            return page_id
+        
+        with patch.object(notion_service, '_perform_search', return_value={"results": items}), \
+             patch.object(notion_service, '_extract_content', side_effect=fake_extract_content):
+            result = await notion_service.search_database("頁面")
+        
+        assert [r.title for r in result.results] == [f"頁面 {i}" for i in range(5)]
+        assert 1 < peak <= 3
+    
+    @pytest.mark.asyncio
+    async def test_search_database_hydrates_only_returned_results(self, notion_service):
+        """測試只對要回傳的結果取得內容，並回報正確總數"""
+        items = []
+        for i in range(8):
+            items.append({
+                "id": f"page_{i}",
+                "last_edited_time": f"2023-01-0{i + 1}T00:00:00.000Z",
+                "properties": {
+                    "Name": {
+                        "type": "title",
+                        "title": [{"plain_text": "Python 教學" if i == 0 else f"筆記 {i}"}]
+                    }
+                }
+            })
+        
+        with patch.object(notion_service, '_perform_search', return_value={"results": items}), \
+             patch.object(notion_service, '_extract_content', return_value="內容") as mock_content:
+            result = await notion_service.search_database("python")
+        
+        assert result.total_count == 8
+        assert len(result.results) == 5
+        assert mock_content.call_count == 5
+        # 標題符合的頁面優先，其餘依 last_edited_time 遞減
+        assert [r.title for r in result.results] == ["Python 教學", "筆記 7", "筆記 6", "筆記 5", "筆記 4"]
+    
+    @pytest.mark.asyncio
+    async def test_search_database_cache_normalized_query(self, notion_service, mock_notion_response):
+        """測試正規化後相同的查詢直接使用快取"""
+        with patch.object(notion_service, '_perform_search', return_value=mock_notion_response) as mock_search, \
+             patch.object(notion_service, '_extract_content', return_value="這是測試內容"):
+            first = await notion_service.search_database("Python  教學")
+            second = await notion_service.search_database("ｐｙｔｈｏｎ 教學")
+        
+        mock_search.assert_called_once()
+        assert second.query == "ｐｙｔｈｏｎ 教學"
+        assert second.results == first.results
+        assert notion_service.search_cache.hits == 1
+    
+    @pytest.mark.asyncio
+    async def test_search_database_error_not_cached(self, notion_service, mock_notion_response):
+        """測試搜尋失敗時不寫入快取"""
+        with patch.object(notion_service, '_perform_search', side_effect=Exception("API 錯誤")):
+            await notion_service.search_database("測試查詢")
+        
+        assert len(notion_service.search_cache) == 0
+    
+    @pytest.mark.asyncio
+    async def test_search_database_coalesces_concurrent_queries(self, notion_service, mock_notion_response):
+        """測試並行的相同查詢只執行一次 Notion 搜尋"""
+        async def slow_search(query, deadline=None):
+            await asyncio.sleep(0.01)
+            return mock_notion_response
+        
+        with patch.object(notion_service, '_perform_search', side_effect=slow_search) as mock_search, \
+             patch.object(notion_service, '_extract_content', return_value="這是測試內容"):
+            responses = await asyncio.gather(
+                notion_service.search_database("Python"),
+                notion_service.search_database("python"),
+                notion_service.search_database(" PYTHON ")
+            )
+        
+        assert mock_search.call_count == 1
+        assert [r.query for r in responses] == ["Python", "python", " PYTHON "]
+        assert all(r.total_count == 1 for r in responses)
+        assert notion_service.search_flights.shared == 2
+    
+    @pytest.mark.asyncio
+    async def test_search_database_follower_retries_partial_result(self, notion_service, mock_notion_response):
+        """測試共用的結果因第一個呼叫者期限而不完整時，後到者依自己的期限重新搜尋"""
+        async def slow_search(query, deadline=None):
+            await asyncio.sleep(0.05)
+            return mock_notion_response
+        
+        short = Deadline(time.time() + 0.02)
+        long = Deadline(time.time() + 5)
+        with patch.object(notion_service, '_perform_search', side_effect=slow_search) as mock_search, \
+             patch.object(notion_service, '_extract_content', return_value="這是測試內容"):
+            leader, follower = await asyncio.gather(
+                notion_service.search_database("Python", deadline=short),
+                notion_service.search_database("Python", deadline=long)
+            )
+        
+        assert leader.partial is True
+        assert follower.partial is False
+        assert mock_search.call_count == 2
+        assert notion_service.search_cache.get("python") is not None
+    
+    @pytest.mark.asyncio
+    async def test_search_database_followers_share_retry(self, notion_service, mock_notion_response):
+        """測試多個後到者因第一個呼叫者期限而重新搜尋時，共用同一次重新搜尋"""
+        async def slow_search(query, deadline=None):
+            await asyncio.sleep(0.05)
+            return mock_notion_response
+        
+        short = Deadline(time.time() + 0.02)
+        with patch.object(notion_service, '_perform_search', side_effect=slow_search) as mock_search, \
+             patch.object(notion_service, '_extract_content', return_value="這是測試內容"):
+            responses = await asyncio.gather(
+                notion_service.search_database("Python", deadline=short),
+                *[notion_service.search_database("Python", deadline=Deadline(time.time() + 5))
+                  for _ in range(20)]
+            )
+        
+        assert responses[0].partial is True
+        assert all(not response.partial for response in responses[1:])
+        assert mock_search.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_search_database_follower_retries_after_leader_timeout(self, notion_service, mock_notion_response):
+        """測試第一個呼叫者逾時時，期限較晚的後到者不會跟著回傳備援結果"""
+        calls = []
+        
+        async def search(query, deadline=None):
+            calls.append(deadline)
+            if len(calls) == 1:
+                await asyncio.sleep(0.02)
+                raise asyncio.TimeoutError()
+            return mock_notion_response
+        
+        with patch.object(notion_service, '_perform_search', side_effect=search), \
+             patch.object(notion_service, '_extract_content', return_value="這是測試內容"):
+            leader, follower = await asyncio.gather(
+                notion_service.search_database("Python", deadline=Deadline(time.time() + 0.01)),
+                notion_service.search_database("Python", deadline=Deadline(time.time() + 5))
+            )
+        
+        assert leader.total_count == 0
+        assert follower.total_count == 1
+        assert len(calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_search_database_serves_stale_when_circuit_open(self, notion_service, mock_notion_response):
+        """測試 Notion 斷路器開啟時立即回傳最後一次成功的結果"""
+        with patch.object(notion_service, '_perform_search', return_value=mock_notion_response), \
+             patch.object(notion_service, '_extract_content', return_value="這是測試內容"):
+            await notion_service.search_database("測試")
+        
+        notion_service.search_cache.clear()
+        for _ in range(3):
+            notion_service.circuit_breaker.record_failure()
+        
+        with patch.object(notion_service, '_perform_search') as mock_search:
+            result = await notion_service.search_database("測試")
+            
+            mock_search.assert_not_called()
+            assert result.total_count == 1
+            assert result.results[0].title == "測試頁面 1"
+    
+    @pytest.mark.asyncio
+    async def test_search_database_titles_only_skips_content(self, notion_service, mock_notion_response):
+        """測試不取得內容的搜尋只回傳標題且不寫入快取"""
+        with patch.object(notion_service, '_perform_search', return_value=mock_notion_response), \
+             patch.object(notion_service, '_extract_content') as mock_content:
+            result = await notion_service.search_database("測試", hydrate=False)
+        
+        mock_content.assert_not_called()
+        assert result.results[0].title == "測試頁面 1"
+        assert result.results[0].content is None
+        assert len(notion_service.search_cache) == 0
+    
+    @pytest.mark.asyncio
+    async def test_search_cached_never_calls_notion(self, notion_service, mock_notion_response):
+        """測試僅使用快取的查詢不呼叫 Notion API"""
+        assert notion_service.search_cached("測試") is None
+        
+        with patch.object(notion_service, '_perform_search', return_value=mock_notion_response), \
+             patch.object(notion_service, '_extract_content', return_value="這是測試內容"):
+            await notion_service.search_database("測試")
+        notion_service.search_cache.clear()
+        
+        with patch.object(notion_service, '_perform_search') as mock_search:
+            result = notion_service.search_cached("測試")
+            
+            mock_search.assert_not_called()
+            assert result.results[0].content == "這是測試內容"
+    
+    @pytest.mark.asyncio
+    async def test_call_notion_fails_fast_when_circuit_open(self, notion_service):
+        """測試斷路器開啟時不呼叫 Notion API"""
+        for _ in range(3):
+            notion_service.circuit_breaker.record_failure()
+        func = AsyncMock()
+        
+        with pytest.raises(CircuitOpenError):
+            await notion_service._call_notion(Priority.INTERACTIVE, func)
+        
+        func.assert_not_awaited()
+    
+    def test_client_timeout_below_processing_deadline(self, notion_service):
+        """測試 Notion 請求逾時使用 NOTION_REQUEST_TIMEOUT 而非 notion-client 預設的 60 秒"""
+        assert notion_service.client.options.timeout_ms == 10000
+        assert notion_service.client.client.timeout.read == 10.0
+    
+    @pytest.mark.asyncio
+    async def test_request_timeout_counts_as_breaker_failure(self, notion_service):
+        """測試 Notion 請求逾時會計入斷路器失敗"""
+        with patch.object(notion_service.client.client, 'send', side_effect=httpx.ReadTimeout("timeout")):
+            for _ in range(3):
+                with pytest.raises(RequestTimeoutError):
+                    await notion_service._call_notion(
+                        Priority.INTERACTIVE,
+                        notion_service.client.databases.query,
+                        database_id="test_db_id"
+                    )
+        
+        assert notion_service.circuit_breaker.stats()["consecutive_failures"] == 3
+        assert notion_service.circuit_breaker.state.value == "open"
+    
+    @pytest.mark.asyncio
+    async def test_search_database_uses_local_index(self, notion_service):
+        """測試本地索引可用時不呼叫 Notion API"""
+        notion_service.search_index.upsert(IndexedPage(
+            page_id="test_page_1",
+            title="測試頁面 1",
+            tags=["Python"],
+            content="這是測試內容"
+        ))
+        notion_service.search_index.mark_synced()
+        
+        with patch.object(notion_service, '_perform_search') as mock_search:
+            result = await notion_service.search_database("python")
+            
+            mock_search.assert_not_called()
+            assert result.total_count == 1
+            assert result.results[0].title == "測試頁面 1"
+            assert result.results[0].content == "這是測試內容"
+    
+    @pytest.mark.asyncio
+    async def test_search_database_index_miss_falls_back(self, notion_service, mock_notion_response):
+        """測試本地索引沒有結果時改用即時搜尋"""
+        notion_service.search_index.mark_synced()
+        
+        with patch.object(notion_service, '_perform_search', return_value=mock_notion_response) as mock_search, \
+             patch.object(notion_service, '_extract_content', return_value="這是測試內容"):
+            result = await notion_service.search_database("測試")
+            
+            mock_search.assert_called_once()
+            assert result.total_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_extract_content_uses_page_cache(self, notion_service, mock_blocks_response):
+        """測試頁面未變動時不重新取得區塊"""
+        with patch.object(notion_service.client.blocks.children, 'list',
+                          new_callable=AsyncMock, return_value=mock_blocks_response) as mock_list:
+            first = await notion_service._extract_content("test_page_1", "2023-01-02T00:00:00.000Z")
+            second = await notion_service._extract_content("test_page_1", "2023-01-02T00:00:00.000Z")
+            assert mock_list.call_count == 1
+            
+            await notion_service._extract_content("test_page_1", "2023-01-03T00:00:00.000Z")
+            assert mock_list.call_count == 2
+        
+        assert first == second == "這是測試內容"
+    
+    @pytest.mark.asyncio
+    async def test_perform_search_sequential_skips_global_when_enough(self, notion_service):
+        """測試資料庫結果足夠時不進行全域搜尋"""
+        database_results = {"results": [{"id": f"db_{i}"} for i in range(5)]}
+        
+        with patch.object(notion_service, '_query_database', new=AsyncMock(return_value=database_results)), \
+             patch.object(notion_service, '_search_pages', new=AsyncMock()) as mock_global:
+            result = await notion_service._perform_search("測試")
+        
+        mock_global.assert_not_awaited()
+        assert len(result["results"]) == 5
+    
+    @pytest.mark.asyncio
+    async def test_perform_search_deadline_skips_slow_global(self, notion_service):
+        """測試全域搜尋超過期限時只回傳資料庫結果"""
+        database_results = {"results": [{"id": "db_1"}]}
+        
+        async def slow_global(query):
+            await asyncio.sleep(10)
+        
+        deadline = Deadline(time.time() + 0.05)
+        with patch.object(notion_service, '_query_database', new=AsyncMock(return_value=database_results)), \
+             patch.object(notion_service, '_search_pages', side_effect=slow_global):
+            result = await notion_service._perform_search("測試", deadline)
+        
+        assert [r["id"] for r in result["results"]] == ["db_1"]
+    
+    @pytest.mark.asyncio
+    async def test_search_database_deadline_returns_titles(self, notion_service, mock_notion_response):
+        """測試取得內容超過期限時回傳不含內容的部分結果且不寫入快取"""
+        async def slow_fetch(page_id, **kwargs):
+            await asyncio.sleep(10)
+        
+        deadline = Deadline(time.time() + 0.05)
+        with patch.object(notion_service, '_perform_search', return_value=mock_notion_response), \
+             patch.object(notion_service, '_fetch_page_text', side_effect=slow_fetch):
+            result = await notion_service.search_database("測試", deadline=deadline)
+        
+        assert result.partial is True
+        assert result.results[0].title == "測試頁面 1"
+        assert result.results[0].content is None
+        assert len(notion_service.search_cache) == 0
+    
+    @pytest.mark.asyncio
+    async def test_search_database_deadline_without_results_is_partial(self, notion_service):
+        """測試查詢在期限內沒有回應時回傳標記為部分結果的空結果，與真的沒有找到內容區分"""
+        async def slow_query(query):
+            await asyncio.sleep(10)
+        
+        deadline = Deadline(time.time() + 0.05)
+        with patch.object(notion_service, '_query_database', side_effect=slow_query):
+            result = await notion_service.search_database("測試", deadline=deadline)
+        
+        assert result.results == []
+        assert result.partial is True
+    
+    @pytest.mark.asyncio
+    async def test_search_database_circuit_open_without_stale_is_partial(self, notion_service):
+        """測試斷路器開啟且沒有過期結果時回傳標記為部分結果的空結果"""
+        for _ in range(3):
+            notion_service.circuit_breaker.record_failure()
+        
+        result = await notion_service.search_database("測試")
+        
+        assert result.results == []
+        assert result.partial is True
+    
+    @pytest.mark.asyncio
+    async def test_speculative_search_cancels_global(self, notion_service):
+        """測試推測式搜尋在資料庫結果足夠時取消全域搜尋"""
+        notion_service.settings.notion_speculative_search = True
+        database_results = {"results": [{"id": f"db_{i}"} for i in range(5)]}
+        global_cancelled = asyncio.Event()
+        
+        async def slow_global(query):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                global_cancelled.set()
+                raise
+        
+        async def fast_database(query):
+            await asyncio.sleep(0)
+            return database_results
+        
+        with patch.object(notion_service, '_query_database', side_effect=fast_database), \
+             patch.object(notion_service, '_search_pages', side_effect=slow_global):
+            result = await notion_service._perform_search("測試")
+            await asyncio.wait_for(global_cancelled.wait(), timeout=1)
+        
+        assert [r["id"] for r in result["results"]] == [f"db_{i}" for i in range(5)]
+    
+    @pytest.mark.asyncio
+    async def test_speculative_search_merges_sparse_results(self, notion_service):
+        """測試推測式搜尋在資料庫結果不足時合併並去重"""
+        notion_service.settings.notion_speculative_search = True
+        database_results = {"results": [{"id": "page_1"}]}
+        global_results = {"results": [{"id": "page_1"}, {"id": "page_2"}]}
+        
+        with patch.object(notion_service, '_query_database', new=AsyncMock(return_value=database_results)), \
+             patch.object(notion_service, '_search_pages', new=AsyncMock(return_value=global_results)):
+            result = await notion_service._perform_search("測試")
+        
+        assert [r["id"] for r in result["results"]] == ["page_1", "page_2"]
     
     def test_extract_title_success(self, notion_service):
         """測試成功提取標題"""
@@ -158,16 +545,164 @@ class TestNotionService:
         tags = notion_service._extract_tags(item)
         assert tags == []
     
+    @pytest.mark.asyncio
+    async def test_call_notion_retries_rate_limited(self, notion_service):
+        """測試 429 時依 Retry-After 暫停並重試"""
+        response = httpx.Response(
+            429,
+            headers={"retry-after": "0"},
+            request=httpx.Request("POST", "https://api.notion.com/v1/search")
+        )
+        rate_limited = APIResponseError(response, "rate limited", "rate_limited")
+        func = AsyncMock(side_effect=[rate_limited, {"results": []}])
+        
+        result = await notion_service._call_notion(Priority.INTERACTIVE, func, query="測試")
+        
+        assert result == {"results": []}
+        assert func.await_count == 2
+        assert notion_service.rate_limiter.pauses == 1
+    
+    @pytest.mark.asyncio
+    async def test_call_notion_does_not_retry_client_errors(self, notion_service):
+        """測試非暫時性錯誤不重試"""
+        response = httpx.Response(
+            400,
+            request=httpx.Request("POST", "https://api.notion.com/v1/search")
+        )
+        invalid = APIResponseError(response, "invalid", "validation_error")
+        func = AsyncMock(side_effect=invalid)
+        
+        with pytest.raises(APIResponseError):
+            await notion_service._call_notion(Priority.INTERACTIVE, func)
+        
+        assert func.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_call_notion_hedges_slow_request(self, notion_service):
+        """測試請求超過延遲百分位數時送出對沖請求並採用較快的結果"""
+        notion_service.settings.notion_hedging_enabled = True
+        for _ in range(5):
+            notion_service._latency_tracker("databases.query").observe(0.01)
+        calls = []
+        
+        async def query(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+                return {"results": ["slow"]}
+            return {"results": ["fast"]}
+        
+        result = await notion_service._call_notion(
+            Priority.INTERACTIVE, query, operation="databases.query", database_id="db"
+        )
+        
+        assert result == {"results": ["fast"]}
+        assert calls == [{"database_id": "db"}, {"database_id": "db"}]
+        assert notion_service.hedges == 1
+        assert notion_service.hedge_wins == 1
+    
+    @pytest.mark.asyncio
+    async def test_call_notion_excludes_hedge_wins_from_hedge_percentile(self, notion_service):
+        """測試對沖請求勝出時的延遲不計入決定對沖延遲的統計，原請求先完成時仍會記錄"""
+        notion_service.settings.notion_hedging_enabled = True
+        tracker = notion_service._latency_tracker("databases.query")
+        for _ in range(5):
+            tracker.observe(0.01)
+        calls = []
+        
+        async def query(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+            return {"results": []}
+        
+        await notion_service._call_notion(Priority.INTERACTIVE, query, operation="databases.query")
+        assert notion_service.hedge_wins == 1
+        assert tracker.sample_count == 5
+        
+        async def fast_query(**kwargs):
+            return {"results": []}
+        
+        await notion_service._call_notion(Priority.INTERACTIVE, fast_query, operation="databases.query")
+        assert tracker.sample_count == 6
+    
+    @pytest.mark.asyncio
+    async def test_call_notion_skips_hedge_without_rate_budget(self, notion_service):
+        """測試速率限制沒有餘裕時不送出對沖請求"""
+        notion_service.settings.notion_hedging_enabled = True
+        for _ in range(5):
+            notion_service._latency_tracker("blocks.children.list").observe(0.01)
+        func = AsyncMock(return_value={"results": []})
+        
+        async def slow_list(**kwargs):
+            await asyncio.sleep(0.05)
+            return await func(**kwargs)
+        
+        with patch.object(notion_service.rate_limiter, 'try_acquire', side_effect=[True, False]):
+            await notion_service._call_notion(
+                Priority.HYDRATION, slow_list, operation="blocks.children.list", block_id="page"
+            )
+        
+        assert func.await_count == 1
+        assert notion_service.hedges == 0
+    
+    @pytest.mark.asyncio
+    async def test_call_notion_never_hedges_background(self, notion_service):
+        """測試背景同步的請求不進行對沖"""
+        notion_service.settings.notion_hedging_enabled = True
+        for _ in range(5):
+            notion_service._latency_tracker("databases.query").observe(0.01)
+        
+        assert notion_service._should_hedge(Priority.INTERACTIVE, "databases.query") is True
+        assert notion_service._should_hedge(Priority.BACKGROUND, "databases.query") is False
+        assert notion_service._should_hedge(Priority.INTERACTIVE, "search") is False
+    
     @pytest.mark.asyncio
     async def test_test_connection_success(self, notion_service):
         """測試連線成功"""
-        with patch.object(notion_service.client.databases, 'retrieve', return_value={"id": "test"}):
+        with patch.object(notion_service.client.databases, 'retrieve', new_callable=AsyncMock, return_value={"id": "test"}):
             result = await notion_service.test_connection()
             assert result is True
     
     @pytest.mark.asyncio
     async def test_test_connection_failure(self, notion_service):
         """測試連線失敗"""
-        with patch.object(notion_service.client.databases, 'retrieve', side_effect=Exception("連線錯誤")):
+        with patch.object(notion_service.client.databases, 'retrieve', new_callable=AsyncMock, side_effect=Exception("連線錯誤")):
             result = await notion_service.test_connection()
-            assert result is False
\ No newline at end of file
+            assert result is False
+    
+    @pytest.mark.asyncio
+    async def test_probe_connection_uses_idle_token(self, notion_service):
+        """測試速率限制器有空閒 token 時直接探測 Notion 連線"""
+        with patch.object(notion_service.client.databases, 'retrieve', new_callable=AsyncMock, return_value={"id": "test"}):
+            assert await notion_service.probe_connection() == "ok"
+        
+        with patch.object(notion_service.client.databases, 'retrieve', new_callable=AsyncMock, side_effect=Exception("連線錯誤")):
+            assert await notion_service.probe_connection() == "error"
+    
+    @pytest.mark.asyncio
+    async def test_probe_connection_does_not_queue_behind_searches(self, notion_service):
+        """測試速率限制器有等待中的請求時不呼叫 Notion，立即回報受限狀態"""
+        limiter = PriorityRateLimiter(rate=1.0, burst=1)
+        notion_service.rate_limiter = limiter
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        
+        try:
+            with patch.object(notion_service.client.databases, 'retrieve', new_callable=AsyncMock) as retrieve:
+                assert await notion_service.probe_connection() == "throttled"
+            retrieve.assert_not_called()
+        finally:
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+    
+    @pytest.mark.asyncio
+    async def test_probe_connection_reports_open_circuit(self, notion_service):
+        """測試斷路器開啟時不呼叫 Notion"""
+        for _ in range(3):
+            notion_service.circuit_breaker.record_failure()
+        
+        with patch.object(notion_service.client.databases, 'retrieve', new_callable=AsyncMock) as retrieve:
+            assert await notion_service.probe_connection() == "circuit_open"
+        retrieve.assert_not_called()
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Notion 本地鏡像同步測試
+"""
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.services.notion_sync import NotionSyncService
+
+
+def _page(page_id, title, last_edited_time):
+    """建立範例 Notion 頁面"""
+    return {
+        "id": page_id,
+        "url": f"https://notion.so/{page_id}",
+        "last_edited_time": last_edited_time,
+        "properties": {
+            "Name": {
+                "type": "title",
+                "title": [{"plain_text": title}]
+            }
+        }
+    }
+
+
+@pytest.fixture
+def sync_service(notion_service):
+    """建立 NotionSyncService 實例"""
+    with patch('app.services.notion_sync.get_settings') as mock_sync_settings:
+        mock_sync_settings.return_value.notion_sync_interval = 60
+        mock_sync_settings.return_value.notion_full_sync_interval = 3600
+        
+        return NotionSyncService(notion_service)
+
+
+class TestNotionSyncService:
+    """NotionSyncService 測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_full_sync_pages_with_cursor(self, sync_service):
+        """測試完整同步會依 start_cursor 分頁"""
+        responses = [
+            {"results": [_page("p1", "Python", "2023-01-01T00:00:00.000Z")],
+             "has_more": True, "next_cursor": "cursor_2"},
+            {"results": [_page("p2", "FastAPI", "2023-01-02T00:00:00.000Z")],
+             "has_more": False, "next_cursor": None}
+        ]
+        
+        with patch.object(sync_service.notion_service.client.databases, 'query',
+                          new_callable=AsyncMock, side_effect=responses) as mock_query, \
+             patch.object(sync_service.notion_service, '_fetch_page_text',
+                          new=AsyncMock(return_value="內容")):
+            updated = await sync_service.full_sync()
+        
+        assert updated == 2
+        assert mock_query.call_args_list[1].kwargs["start_cursor"] == "cursor_2"
+        assert sync_service.index.is_ready
+        assert len(sync_service.index) == 2
+    
+    @pytest.mark.asyncio
+    async def test_incremental_sync_only_refetches_changed(self, sync_service):
+        """測試增量同步只重新取得有變動的頁面"""
+        initial = {"results": [
+            _page("p1", "Python", "2023-01-01T00:00:00.000Z"),
+            _page("p2", "FastAPI", "2023-01-02T00:00:00.000Z")
+        ], "has_more": False}
+        changed = {"results": [
+            _page("p2", "FastAPI", "2023-01-02T00:00:00.000Z"),
+            _page("p1", "Python 進階", "2023-01-03T00:00:00.000Z")
+        ], "has_more": False}
+        fetch = AsyncMock(return_value="內容")
+        
+        with patch.object(sync_service.notion_service.client.databases, 'query',
+                          new_callable=AsyncMock, side_effect=[initial, changed]) as mock_query, \
+             patch.object(sync_service.notion_service, '_fetch_page_text', new=fetch):
+            await sync_service.full_sync()
+            fetch.reset_mock()
+            updated = await sync_service.incremental_sync()
+        
+        query_filter = mock_query.call_args_list[1].kwargs["filter"]
+        assert query_filter["last_edited_time"]["on_or_after"] == "2023-01-02T00:00:00.000Z"
+        # p2 與水位同一分鐘仍需重新取得但內容未變，只有 p1 算是更新
+        assert fetch.await_count == 2
+        assert updated == 1
+        assert sync_service.index.get("p1").title == "Python 進階"
+        assert sync_service._watermark == "2023-01-03T00:00:00.000Z"
+    
+    @pytest.mark.asyncio
+    async def test_incremental_sync_without_changes_keeps_search_cache(self, sync_service):
+        """測試沒有變動時增量同步不算更新，也不清除搜尋快取"""
+        response = {"results": [_page("p1", "Python", "2023-01-01T00:00:00.000Z")], "has_more": False}
+        
+        with patch.object(sync_service.notion_service.client.databases, 'query',
+                          new_callable=AsyncMock, return_value=response), \
+             patch.object(sync_service.notion_service, '_fetch_page_text',
+                          new=AsyncMock(return_value="內容")), \
+             patch.object(sync_service.notion_service, 'invalidate_search_cache') as invalidate:
+            await sync_service.full_sync()
+            invalidate.reset_mock()
+            results = [await sync_service.incremental_sync() for _ in range(3)]
+        
+        assert results == [0, 0, 0]
+        invalidate.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_incremental_sync_detects_same_minute_edit(self, sync_service):
+        """測試與水位同一分鐘內的內容修改仍會被更新（不使用內容快取）"""
+        response = {"results": [_page("p1", "Python", "2023-01-01T00:00:00.000Z")], "has_more": False}
+        fetch = AsyncMock(side_effect=["內容", "新內容"])
+        
+        with patch.object(sync_service.notion_service.client.databases, 'query',
+                          new_callable=AsyncMock, return_value=response), \
+             patch.object(sync_service.notion_service, '_fetch_page_text', new=fetch):
+            await sync_service.full_sync()
+            updated = await sync_service.incremental_sync()
+        
+        assert updated == 1
+        assert fetch.call_args.kwargs["last_edited_time"] is None
+        assert sync_service.index.get("p1").content == "新內容"
+    
+    @pytest.mark.asyncio
+    async def test_full_sync_removes_missing_pages(self, sync_service):
+        """測試完整同步移除已不存在的頁面"""
+        first = {"results": [
+            _page("p1", "Python", "2023-01-01T00:00:00.000Z"),
+            _page("p2", "FastAPI", "2023-01-02T00:00:00.000Z")
+        ], "has_more": False}
+        second = {"results": [_page("p1", "Python", "2023-01-01T00:00:00.000Z")], "has_more": False}
+        
+        with patch.object(sync_service.notion_service.client.databases, 'query',
+                          new_callable=AsyncMock, side_effect=[first, second]), \
+             patch.object(sync_service.notion_service, '_fetch_page_text',
+                          new=AsyncMock(return_value="內容")):
+            await sync_service.full_sync()
+            await sync_service.full_sync()
+        
+        assert "p2" not in sync_service.index
+        assert "p1" in sync_service.index
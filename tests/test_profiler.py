@@ -0,0 +1,82 @@
+"""
+請求效能分析工具測試
+"""
+import asyncio
+import pytest
+from app.utils.profiler import RequestProfiler
+
+
+async def _slow_lookup():
+    """模擬耗時的事件處理"""
+    await asyncio.sleep(0)
+    return sum(i * i for i in range(1000))
+
+
+class TestRequestProfiler:
+    """RequestProfiler 測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_run_stores_profile(self):
+        """測試分析結果會被保存且回傳原本的結果"""
+        profiler = RequestProfiler(max_profiles=5, use_pyinstrument=False)
+        
+        result = await profiler.run(_slow_lookup(), label="message", admission="accept")
+        
+        assert result == sum(i * i for i in range(1000))
+        summaries = profiler.list()
+        assert len(summaries) == 1
+        assert summaries[0]["label"] == "message"
+        assert summaries[0]["admission"] == "accept"
+        record = profiler.get(summaries[0]["id"])
+        assert record.media_type == "text/plain"
+        assert "_slow_lookup" in record.content
+    
+    @pytest.mark.asyncio
+    async def test_keeps_latest_profiles(self):
+        """測試只保留最近 max_profiles 份結果"""
+        profiler = RequestProfiler(max_profiles=2, use_pyinstrument=False)
+        
+        for _ in range(3):
+            await profiler.run(_slow_lookup(), label="message")
+        
+        assert [summary["id"] for summary in profiler.list()] == [3, 2]
+        assert profiler.get(1) is None
+        assert profiler.stats()["profiled"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_stores_profile_when_handler_fails(self):
+        """測試處理失敗時仍保存分析結果並拋出原本的例外"""
+        profiler = RequestProfiler(use_pyinstrument=False)
+        
+        async def failing():
+            raise ValueError("處理失敗")
+        
+        with pytest.raises(ValueError):
+            await profiler.run(failing(), label="message")
+        
+        assert len(profiler.list()) == 1
+        assert profiler.stats()["stored"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_skips_concurrent_profile(self):
+        """測試已有事件在分析時，其他事件直接執行不分析"""
+        profiler = RequestProfiler(use_pyinstrument=False)
+        release = asyncio.Event()
+        
+        async def blocked():
+            await release.wait()
+        
+        first = asyncio.create_task(profiler.run(blocked(), label="first"))
+        await asyncio.sleep(0)
+        await profiler.run(_slow_lookup(), label="second")
+        release.set()
+        await first
+        
+        assert [summary["label"] for summary in profiler.list()] == ["first"]
+        assert profiler.skipped_busy == 1
+    
+    def test_should_profile(self):
+        """測試依請求或取樣率決定是否分析"""
+        assert RequestProfiler(sample_rate=0.0).should_profile() is False
+        assert RequestProfiler(sample_rate=0.0).should_profile(requested=True) is True
+        assert RequestProfiler(sample_rate=1.0).should_profile() is True
@@ -0,0 +1,71 @@
+"""
+速率限制器測試
+"""
+import asyncio
+import pytest
+from app.utils.rate_limiter import Priority, PriorityRateLimiter
+
+
+class TestPriorityRateLimiter:
+    """PriorityRateLimiter 測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_burst_then_wait(self):
+        """測試 token 用完後需等待補充"""
+        limiter = PriorityRateLimiter(rate=100, burst=2)
+        
+        assert limiter.try_acquire() is True
+        assert limiter.try_acquire() is True
+        assert limiter.try_acquire() is False
+        
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        assert limiter.granted == 3
+    
+    @pytest.mark.asyncio
+    async def test_higher_priority_served_first(self):
+        """測試高優先等級的請求先取得 token"""
+        limiter = PriorityRateLimiter(rate=50, burst=1)
+        limiter.try_acquire()
+        order = []
+        
+        async def request(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+        
+        background = asyncio.ensure_future(request("background", Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(request("interactive", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        
+        assert limiter.queue_depth == 2
+        assert limiter.queue_depth_by_priority()["background"] == 1
+        
+        await asyncio.wait_for(asyncio.gather(background, interactive), timeout=1)
+        assert order == ["interactive", "background"]
+    
+    @pytest.mark.asyncio
+    async def test_pause_delays_grants(self):
+        """測試暫停期間不分配 token"""
+        limiter = PriorityRateLimiter(rate=1000, burst=5)
+        limiter.pause(0.05)
+        
+        assert limiter.try_acquire() is False
+        
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        assert loop.time() - started >= 0.04
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_is_skipped(self):
+        """測試取消的等待者不會佔用 token"""
+        limiter = PriorityRateLimiter(rate=50, burst=1)
+        limiter.try_acquire()
+        
+        cancelled = asyncio.ensure_future(limiter.acquire(Priority.INTERACTIVE))
+        waiting = asyncio.ensure_future(limiter.acquire(Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        
+        await asyncio.wait_for(waiting, timeout=1)
+        assert limiter.queue_depth == 0
@@ -0,0 +1,86 @@
+"""
+本地倒排索引測試
+"""
+import pytest
+from app.services.search_index import SearchIndex, IndexedPage
+
+
+@pytest.fixture
+def search_index():
+    """建立含範例頁面的索引"""
+    index = SearchIndex()
+    index.upsert(IndexedPage(
+        page_id="page_1",
+        title="Python 基礎教學",
+        tags=["程式語言"],
+        content="Python 是一種高階程式語言",
+        last_edited_time="2023-01-01T00:00:00.000Z"
+    ))
+    index.upsert(IndexedPage(
+        page_id="page_2",
+        title="Web 開發",
+        tags=["Python", "API"],
+        content="使用 FastAPI 建立 Web API",
+        last_edited_time="2023-01-03T00:00:00.000Z"
+    ))
+    index.upsert(IndexedPage(
+        page_id="page_3",
+        title="資料庫設計",
+        tags=["資料庫"],
+        content="關聯式資料庫正規化與 API 設計",
+        last_edited_time="2023-01-02T00:00:00.000Z"
+    ))
+    return index
+
+
+class TestSearchIndex:
+    """SearchIndex 測試類別"""
+    
+    def test_search_ranks_title_before_tags(self, search_index):
+        """測試標題符合排在標籤符合之前"""
+        pages, total = search_index.search("python", 5)
+        
+        assert total == 2
+        assert [page.page_id for page in pages] == ["page_1", "page_2"]
+    
+    def test_search_content_and_full_width_query(self, search_index):
+        """測試內容搜尋與全形查詢正規化"""
+        pages, total = search_index.search("ＡＰＩ  設計", 5)
+        
+        assert total == 1
+        assert pages[0].page_id == "page_3"
+    
+    def test_search_limit_keeps_total_count(self, search_index):
+        """測試限制回傳數量時仍回報總數"""
+        pages, total = search_index.search("api", 1)
+        
+        assert total == 2
+        assert len(pages) == 1
+        assert pages[0].page_id == "page_2"
+    
+    def test_search_single_character(self, search_index):
+        """測試單一字元查詢"""
+        pages, total = search_index.search("庫", 5)
+        
+        assert total == 1
+        assert pages[0].page_id == "page_3"
+    
+    def test_upsert_replaces_and_remove(self, search_index):
+        """測試更新與移除頁面"""
+        search_index.upsert(IndexedPage(page_id="page_1", title="Go 教學"))
+        
+        pages, total = search_index.search("python", 5)
+        assert [page.page_id for page in pages] == ["page_2"]
+        
+        search_index.remove("page_2")
+        pages, total = search_index.search("python", 5)
+        assert total == 0
+        assert "page_2" not in search_index
+    
+    def test_to_search_result_truncates_content(self):
+        """測試轉換搜尋結果時限制內容長度"""
+        page = IndexedPage(page_id="page_4", title="長文", content="a" * 600)
+        
+        result = page.to_search_result()
+        assert len(result.content) == 503
+        assert result.title == "長文"
@@ -0,0 +1,72 @@
+"""
+Webhook 事件去重測試
+"""
+import pytest
+from app.models.line_models import LineEvent
+from app.services.seen_events import InMemorySeenEventStore, SeenEventStore
+
+
+def _event(event_id: str, redelivery: bool = False) -> LineEvent:
+    """建立範例事件"""
+    return LineEvent.model_validate({
+        "type": "message",
+        "mode": "active",
+        "timestamp": 1234567890,
+        "source": {"userId": "test_user", "type": "user"},
+        "replyToken": "test_reply_token",
+        "message": {"type": "text", "text": "Python"},
+        "webhookEventId": event_id,
+        "deliveryContext": {"isRedelivery": redelivery}
+    })
+
+
+class TestInMemorySeenEventStore:
+    """InMemorySeenEventStore 測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_drops_redelivered_event(self):
+        """測試重新傳送的事件會被略過"""
+        store = InMemorySeenEventStore(maxsize=10, ttl=60)
+        
+        assert await store.check_and_mark(_event("01H0001")) is True
+        assert await store.check_and_mark(_event("01H0001", redelivery=True)) is False
+        assert await store.check_and_mark(_event("01H0002", redelivery=True)) is True
+        
+        stats = store.stats()
+        assert stats["duplicates"] == 1
+        assert stats["redeliveries"] == 2
+        assert stats["size"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_events_without_id_are_not_deduplicated(self):
+        """測試沒有 webhookEventId 的事件不會被去重"""
+        store = InMemorySeenEventStore(maxsize=10, ttl=60)
+        event = _event("")
+        
+        assert await store.check_and_mark(event) is True
+        assert await store.check_and_mark(event) is True
+    
+    @pytest.mark.asyncio
+    async def test_store_is_bounded(self):
+        """測試超過容量時淘汰最舊的事件"""
+        store = InMemorySeenEventStore(maxsize=2, ttl=60)
+        for event_id in ["a", "b", "c"]:
+            await store.add(event_id)
+        
+        assert store.stats()["size"] == 2
+        assert await store.add("a") is True
+        assert await store.add("c") is False
+    
+    @pytest.mark.asyncio
+    async def test_unmark_allows_redelivery(self):
+        """測試取消已接收紀錄後，重新傳送的事件會再次被處理"""
+        store = InMemorySeenEventStore(maxsize=10, ttl=60)
+        
+        assert await store.check_and_mark(_event("01H0001")) is True
+        await store.unmark(_event("01H0001"))
+        assert await store.check_and_mark(_event("01H0001", redelivery=True)) is True
+    
+    def test_base_class_requires_add_and_remove(self):
+        """測試儲存區基底類別不能直接建立"""
+        with pytest.raises(TypeError):
+            SeenEventStore()
@@ -0,0 +1,62 @@
+"""
+並行請求合併測試
+"""
+import asyncio
+import pytest
+from app.utils.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """SingleFlight 測試類別"""
+    
+    @pytest.mark.asyncio
+    async def test_shares_result_between_concurrent_calls(self):
+        """測試並行呼叫共用結果"""
+        flights = SingleFlight()
+        calls = 0
+        
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+        
+        results = await asyncio.gather(*(flights.do("key", work) for _ in range(3)))
+        
+        assert results == ["result"] * 3
+        assert calls == 1
+        assert len(flights) == 0
+    
+    @pytest.mark.asyncio
+    async def test_shares_exception(self):
+        """測試例外會傳遞給所有呼叫者，且下次呼叫重新執行"""
+        flights = SingleFlight()
+        
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("失敗")
+        
+        results = await asyncio.gather(flights.do("key", fail), flights.do("key", fail),
+                                       return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        
+        async def succeed():
+            return "ok"
+        
+        assert await flights.do("key", succeed) == "ok"
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """測試單一呼叫者取消不影響其他呼叫者"""
+        flights = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.02)
+            return "result"
+        
+        first = asyncio.ensure_future(flights.do("key", work))
+        second = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        
+        assert await second == "result"